@@ -0,0 +1,2 @@
+# Makes the modules of src importable like in the unittests
+import src
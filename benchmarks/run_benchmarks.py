@@ -0,0 +1,179 @@
+"""Benchmarks the validation, statistics, export and visualization stages on
+synthetic reports of several sizes.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.run_benchmarks --years 1 5 10 --output bench_results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+from benchmarks.synthetic_reports import generate_reports
+from src.report.filehandler import StatsExportFileHandler
+from src.statistics.stats_generator import StatsGenerator
+from src.validation.plausibility_checker import PlausibilityChecker
+
+TARGET_DAILY_WORK_MINUTES = 480
+
+
+def measure(stage: Callable[[], object], repeats: int) -> dict:
+    """Times a stage and measures its peak memory in a separate run
+
+    Args:
+        stage (Callable[[], object]): The stage to measure.
+        repeats (int): The amount of timed runs.
+
+    Returns:
+        dict: The median and minimum seconds and the peak memory in bytes.
+    """
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - start)
+    # Tracing slows down the stage, so memory is measured separately
+    tracemalloc.start()
+    stage()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds_median": sorted(seconds)[len(seconds) // 2],
+        "seconds_min": min(seconds),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def create_stages(reports: list[dict], export_dir: str) -> dict:
+    pc = PlausibilityChecker()
+    efh = StatsExportFileHandler({"paths": {"reports": export_dir}})
+
+    def new_statsgen() -> StatsGenerator:
+        # A new instance per run, so the per-day cache does not hide the work
+        return StatsGenerator(default_break_after_6h=30, default_break_after_9h=15)
+
+    valid_reports = [report for report in reports if pc.validate(report)[0]]
+    df_stats_daily = [
+        new_statsgen().daily_worked_minutes(report, TARGET_DAILY_WORK_MINUTES)
+        for report in valid_reports
+    ]
+    df_stats_export = [
+        new_statsgen().stats_export(report, TARGET_DAILY_WORK_MINUTES)
+        for report in valid_reports
+    ]
+
+    stages = {
+        "validate": lambda: [pc.validate(report) for report in reports],
+        "daily_worked_minutes": lambda: [
+            new_statsgen().daily_worked_minutes(report, TARGET_DAILY_WORK_MINUTES)
+            for report in valid_reports
+        ],
+        "stats_export": lambda: [
+            new_statsgen().stats_export(report, TARGET_DAILY_WORK_MINUTES)
+            for report in valid_reports
+        ],
+        "write_stats_export": lambda: efh.write_stats_export(
+            [df.copy() for df in df_stats_export]
+        ),
+        "stream_stats_export": lambda: efh.stream_stats_export(
+            df for df in df_stats_export
+        ),
+    }
+
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from src.statistics.stats_visualization import StatsVisualization
+
+        cache_dir = os.path.join(export_dir, "charts")
+        statsvis = StatsVisualization(
+            headless=True, cache_dir=cache_dir, cache_size=len(df_stats_daily)
+        )
+
+        def visualize():
+            # Without cached images every chart is rendered
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            for i, df in enumerate(df_stats_daily):
+                statsvis.render_daily_worked_minutes(f"Benchmark {i}", df)
+
+        def visualize_cached():
+            for i, df in enumerate(df_stats_daily):
+                statsvis.render_daily_worked_minutes(f"Benchmark {i}", df)
+
+        stages["visualization"] = visualize
+        stages["visualization_cached"] = visualize_cached
+    except ImportError:
+        print("Skipping visualization, matplotlib/seaborn are not installed")
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--days-per-month", type=int, default=21)
+    parser.add_argument("--breaks-per-day", type=int, default=1)
+    parser.add_argument("--invalid-fraction", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--label", default="", help="e.g. the version benchmarked")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+    # Logging of e.g. validation errors would distort the measurements
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for years in args.years:
+        reports = list(
+            generate_reports(
+                years=years,
+                days_per_month=args.days_per_month,
+                breaks_per_day=args.breaks_per_day,
+                invalid_fraction=args.invalid_fraction,
+                seed=args.seed,
+            ).values()
+        )
+        days = sum(len(report) for report in reports)
+        with tempfile.TemporaryDirectory() as export_dir:
+            for stage_name, stage in create_stages(reports, export_dir).items():
+                result = {
+                    "stage": stage_name,
+                    "years": years,
+                    "days": days,
+                    **measure(stage, args.repeats),
+                }
+                result["days_per_second"] = days / result["seconds_median"]
+                results.append(result)
+                print(
+                    f"{stage_name:>22} {years:>3} years {days:>7} days: "
+                    f"{result['seconds_median'] * 1000:9.1f} ms "
+                    f"{result['days_per_second']:12.0f} days/s "
+                    f"{result['peak_memory_bytes'] / 2**20:8.1f} MiB peak"
+                )
+
+    with open(args.output, "w") as file:
+        file.write(
+            json.dumps(
+                {
+                    "label": args.label,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "parameters": vars(args),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
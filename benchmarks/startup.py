@@ -0,0 +1,84 @@
+"""Measures the import time of the tray in fresh interpreters and checks that
+the analytics stack is not loaded before the icon is shown.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.startup --repeats 10 --output startup_results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+# Modules which must only be loaded on first use or by the background warm up
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "mdutils"]
+MEASURE_CODE = f"""
+import json, sys, time
+start = time.perf_counter()
+import ui.tray_gui
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": seconds,
+    "heavy_modules_loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+STARTUP_LOG_PATTERN = re.compile(r"Startup: (imports took|time to icon) (\d+)ms")
+
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_CODE],
+        cwd=SRC_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def last_logged_startup(log_path: str) -> dict:
+    """Returns the import time and time to icon of the last start logged by app.py"""
+    startup = {}
+    if os.path.exists(log_path):
+        with open(log_path, "r", encoding="utf-8") as file:
+            for line in file:
+                match = STARTUP_LOG_PATTERN.search(line)
+                if match is not None:
+                    key = match.group(1).replace(" ", "_")
+                    startup[f"{key}_ms"] = int(match.group(2))
+    return startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--log", default="output.log", help="log of app.py")
+    parser.add_argument("--label", default="", help="e.g. the version benchmarked")
+    parser.add_argument("--output", default="startup_results.json")
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.repeats)]
+    import_seconds = sorted(run["import_seconds"] for run in runs)
+    result = {
+        "label": args.label,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "import_seconds_median": import_seconds[len(import_seconds) // 2],
+        "import_seconds_min": import_seconds[0],
+        "heavy_modules_loaded": runs[0]["heavy_modules_loaded"],
+        "last_logged_startup": last_logged_startup(args.log),
+    }
+    print(json.dumps(result, indent=2))
+    if len(result["heavy_modules_loaded"]) > 0:
+        print(f"Importing the tray loads {result['heavy_modules_loaded']}")
+    with open(args.output, "w") as file:
+        file.write(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
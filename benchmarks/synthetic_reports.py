@@ -0,0 +1,73 @@
+import random
+from datetime import date, timedelta
+
+
+def _time_str(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_day(rnd: random.Random, breaks_per_day: int, invalid: bool) -> dict:
+    """Generates the data of a single tracked day
+
+    Args:
+        rnd (random.Random): The seeded random generator to use.
+        breaks_per_day (int): The amount of breaks (start and end) of the day.
+        invalid (bool): Whether the day shall fail the validation.
+
+    Returns:
+        dict: The day in the format of the reports.
+    """
+    start = rnd.randint(6 * 60, 9 * 60)
+    end = start + rnd.randint(4 * 60, 10 * 60)
+    breaks = []
+    if breaks_per_day > 0:
+        # Evenly spread, non overlapping breaks between start and end
+        slot = (end - start) // (breaks_per_day + 1)
+        for i in range(breaks_per_day):
+            break_start = start + (i + 1) * slot - slot // 4
+            breaks.extend([break_start, break_start + rnd.randint(5, slot // 4 + 5)])
+    if invalid:
+        # Start after end is caught by the validation, but not by the statistics
+        start, end = end, start
+    return {
+        "start": _time_str(start),
+        "end": _time_str(end),
+        "breaks": [_time_str(b) for b in breaks],
+        "comment": "",
+    }
+
+
+def generate_reports(
+    years: int,
+    days_per_month: int = 21,
+    breaks_per_day: int = 1,
+    invalid_fraction: float = 0.0,
+    seed: int = 42,
+    first_year: int = 2000,
+) -> dict:
+    """Generates synthetic monthly reports
+
+    Args:
+        years (int): The amount of years to generate.
+        days_per_month (int, optional): Tracked days per month (at most the days of the month). Defaults to 21.
+        breaks_per_day (int, optional): Breaks per tracked day. Defaults to 1.
+        invalid_fraction (float, optional): Fraction of days failing the validation. Defaults to 0.0.
+        seed (int, optional): Seed of the random generator. Defaults to 42.
+        first_year (int, optional): The first year to generate. Defaults to 2000.
+
+    Returns:
+        dict: The reports by their filename (e.g. "1_2000.json").
+    """
+    rnd = random.Random(seed)
+    reports = {}
+    for year in range(first_year, first_year + years):
+        for month in range(1, 13):
+            report = {}
+            day = date(year, month, 1)
+            while day.month == month and len(report) < days_per_month:
+                report[day.strftime("%d.%m.%Y")] = generate_day(
+                    rnd, breaks_per_day, rnd.random() < invalid_fraction
+                )
+                day += timedelta(days=1)
+            reports[f"{month}_{year}.json"] = report
+    return reports
@@ -0,0 +1,111 @@
+"""Measures the throughput of the tracking server with many users clicking at once.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.tracking_server --users 20 --clicks 40 --output server_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import tempfile
+import time
+from datetime import datetime
+from src.tracking.tracking_server import TrackingServer
+
+
+async def request(reader, writer, method: str, path: str) -> int:
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    await reader.readexactly(content_length)
+    return status
+
+
+async def client(port: int, user: str, clicks: int) -> list:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    statuses = []
+    for i in range(clicks):
+        # Start, break start, break end, end, ...
+        action = "track" if i % 4 in (0, 3) else "break"
+        statuses.append(
+            await request(reader, writer, "POST", f"/users/{user}/{action}")
+        )
+    writer.close()
+    return statuses
+
+
+async def measure(users: int, clicks: int) -> dict:
+    with tempfile.TemporaryDirectory() as reports_dir:
+        server = TrackingServer(
+            {
+                "work": {
+                    "target_daily_work_minutes": 480,
+                    "default_break_after_6h": 30,
+                    "default_break_after_9h": 15,
+                    "default_break_rules": [],
+                    "allow_overnight_shifts": False,
+                },
+                "paths": {"reports": reports_dir},
+                "storage": {
+                    "journal": False,
+                    "journal_compact_threshold": 50,
+                    "report_cache_size": 24,
+                },
+                "server": {
+                    "host": "127.0.0.1",
+                    "port": 0,
+                    "flush_interval_seconds": 60,
+                },
+                "development": {"devmode": False},
+            }
+        )
+        await server.start()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *[client(server.port, f"user{i}", clicks) for i in range(users)]
+            )
+            click_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            await server.flush()
+            flush_seconds = time.perf_counter() - start
+        finally:
+            await server.stop()
+    return {
+        "clicks_per_second": users * clicks / click_seconds,
+        "flush_seconds": flush_seconds,
+        "failed_clicks": sum(
+            status != 200 for statuses in results for status in statuses
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--clicks", type=int, default=40, help="clicks per user")
+    parser.add_argument("--label", default="", help="e.g. the version benchmarked")
+    parser.add_argument("--output", default="server_results.json")
+    args = parser.parse_args()
+
+    result = {
+        "label": args.label,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "users": args.users,
+        "clicks_per_user": args.clicks,
+        **asyncio.run(measure(args.users, args.clicks)),
+    }
+    print(json.dumps(result, indent=2))
+    with open(args.output, "w") as file:
+        file.write(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # Necessary for unittests to discover import successfully (especially VSCode Test Explorer)
+# Prepended like the script directory when running app.py, so e.g. "statistics" is this
+# package instead of the standard library module in the tests as well
 import pathlib, sys
 
-sys.path.append(str(pathlib.Path(__file__).parent))
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
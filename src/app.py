@@ -1,6 +1,15 @@
+import time
+
+# Start of the process, to measure the import time and the time to icon
+STARTUP_TIME = time.perf_counter()
+
 import logging
+import multiprocessing
 import tomllib
 from ui.tray_gui import TrayGui
+from util.metrics import metrics
+
+IMPORT_SECONDS = time.perf_counter() - STARTUP_TIME
 
 
 def main():
@@ -18,9 +27,16 @@ def main():
         filename="output.log",
         encoding="utf-8",
     )
-    ui = TrayGui(config)
+    logging.getLogger(__name__).info(
+        f"Startup: imports took {IMPORT_SECONDS * 1000:.0f}ms"
+    )
+    metrics.configure(config["metrics"]["enabled"], config["metrics"]["path"])
+    ui = TrayGui(config, startup_time=STARTUP_TIME)
     ui.start()
+    metrics.write_summary()
 
 
 if __name__ == "__main__":
+    # Required for the process pool of the statistics export in frozen executables
+    multiprocessing.freeze_support()
     main()
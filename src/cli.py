@@ -0,0 +1,226 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tomllib
+from datetime import date
+from typing import TYPE_CHECKING
+from report.filehandler import MonthlyFileHandler
+from report.storage_backend import (
+    JsonStorageBackend,
+    SqliteStorageBackend,
+    create_storage_backend,
+    migrate,
+)
+from util.datetimehandler import DateTimeHandler
+from util.metrics import metrics
+from validation.plausibility_checker import PlausibilityChecker
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+def import_reports(config: dict, args: argparse.Namespace) -> int:
+    from report.report_importer import ReportImporter
+
+    pc = PlausibilityChecker(
+        allow_overnight_shifts=config["work"]["allow_overnight_shifts"]
+    )
+    importer = ReportImporter(config, MonthlyFileHandler(config), pc)
+    try:
+        summary = importer.import_file(args.file, args.format, args.overwrite)
+    except (FileNotFoundError, ValueError) as e:
+        # e.g. a missing file, an unknown format or missing CSV columns
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=4))
+    return 0
+
+
+def date_arg(value: str) -> date:
+    """Parses a date argument as "01.02.2023" or as ISO "2023-02-01" """
+    try:
+        return date.fromordinal(DateTimeHandler().any_date_str_to_ordinal(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{value}" is not a date like 01.02.2023')
+
+
+def format_stats(df_stats: "DataFrame", output_format: str) -> str:
+    """Formats the result of StatsQuery.daily_stats as "csv", "json" or "table" """
+    df_output = df_stats.copy()
+    minute_columns = [column for column in df_output.columns if column != "day"]
+    df_output[minute_columns] = df_output[minute_columns].astype(int)
+    df_output["day"] = df_output["day"].dt.strftime(DateTimeHandler.DATE_FORMAT)
+    if output_format == "csv":
+        return df_output.to_csv(index=False)
+    totals = {
+        column: int(df_output[column].sum())
+        for column in (
+            "total_work_without_break",
+            "total_break_minutes",
+            "overtime_minutes",
+        )
+    }
+    if output_format == "json":
+        return json.dumps(
+            {"days": df_output.to_dict(orient="records"), "totals": totals}, indent=4
+        )
+
+    def hours(minutes: int) -> str:
+        sign = "-" if minutes < 0 else ""
+        return f"{sign}{abs(minutes) // 60}:{abs(minutes) % 60:02d}"
+
+    df_table = df_output[["day"]].copy()
+    df_table["work"] = df_output["total_work_without_break"].map(hours)
+    df_table["breaks"] = df_output["total_break_minutes"].map(hours)
+    df_table["overtime"] = df_output["overtime_minutes"].map(hours)
+    return (
+        f"{df_table.to_string(index=False)}\n\n"
+        f"{len(df_table)} day(s), worked {hours(totals['total_work_without_break'])}h, "
+        f"breaks {hours(totals['total_break_minutes'])}h, "
+        f"overtime {hours(totals['overtime_minutes'])}h"
+    )
+
+
+def query_stats(config: dict, args: argparse.Namespace) -> int:
+    from statistics.stats_generator import StatsGenerator
+    from statistics.stats_query import StatsQuery
+
+    statsgen = StatsGenerator(
+        config["work"]["default_break_after_6h"],
+        config["work"]["default_break_after_9h"],
+        config["work"]["default_break_rules"],
+        config["storage"]["report_cache_size"],
+    )
+    pc = PlausibilityChecker(
+        allow_overnight_shifts=config["work"]["allow_overnight_shifts"]
+    )
+    # Only reads, so neither the current report nor compacted journals are written
+    fh = MonthlyFileHandler(config, prepare_current_report=False)
+    storage = create_storage_backend(config, fh)
+    query = StatsQuery(config, storage, pc, statsgen)
+    errors = []
+    try:
+        df_stats = query.daily_stats(args.first_day, args.last_day, errors)
+    except (ValueError, AssertionError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+    if len(errors) > 0:
+        print(
+            f"No statistics, the range has {len(errors)} invalid day(s):",
+            file=sys.stderr,
+        )
+        for error in errors:
+            print(f"{error['day']}: {error['error']}", file=sys.stderr)
+        return 1
+    print(format_stats(df_stats, args.format))
+    return 0
+
+
+def migrate_storage(config: dict, args: argparse.Namespace) -> int:
+    fh = MonthlyFileHandler(config)
+    json_storage = JsonStorageBackend(fh)
+    sqlite_storage = SqliteStorageBackend(
+        os.path.join(fh.get_report_path(), config["storage"]["sqlite_path"])
+    )
+    source, target = (
+        (json_storage, sqlite_storage)
+        if args.target == "sqlite"
+        else (sqlite_storage, json_storage)
+    )
+    try:
+        summary = migrate(source, target)
+    finally:
+        sqlite_storage.close()
+    print(json.dumps(summary, indent=4))
+    return 0
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pytimetrack", description="Command line tools of PyTimeTrack"
+    )
+    parser.add_argument(
+        "--config", default="config.toml", help="The config TOML to use"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import", help="Imports days of a CSV or iCalendar file into the reports"
+    )
+    import_parser.add_argument("file", help="The CSV or iCalendar (.ics) file")
+    import_parser.add_argument(
+        "--format",
+        choices=("csv", "ics"),
+        help="The format of the file (by file extension if not given)",
+    )
+    import_parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace days that already exist in the reports",
+    )
+    import_parser.set_defaults(run=import_reports)
+
+    today = date.today()
+    stats_parser = commands.add_parser(
+        "stats", help="Shows the daily statistics of a date range"
+    )
+    stats_parser.add_argument(
+        "--from",
+        dest="first_day",
+        type=date_arg,
+        default=today.replace(day=1),
+        help="The first day (e.g. 01.03.2022), defaults to the first day of the current month",
+    )
+    stats_parser.add_argument(
+        "--to",
+        dest="last_day",
+        type=date_arg,
+        default=today,
+        help="The last day (inclusive), defaults to today",
+    )
+    stats_parser.add_argument(
+        "--format", choices=("csv", "json", "table"), default="table"
+    )
+    stats_parser.set_defaults(run=query_stats)
+
+    migrate_parser = commands.add_parser(
+        "migrate",
+        help="Copies all days between the JSON reports and the SQLite database",
+    )
+    migrate_parser.add_argument(
+        "--to",
+        dest="target",
+        choices=("sqlite", "json"),
+        required=True,
+        help="The backend to copy to, from the other one",
+    )
+    migrate_parser.set_defaults(run=migrate_storage)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = create_parser().parse_args(argv)
+    with open(
+        args.config,
+        "rb",
+    ) as config_file:
+        config = tomllib.load(config_file)
+
+    # Initialize logging (applies to all module level loggers)
+    logging.basicConfig(
+        level=config["development"]["logging_level"],
+        # https://docs.python.org/2/library/logging.html#logrecord-attributes
+        format=f"%(asctime)s -- %(module)s -- (%(levelname)s): %(message)s",
+    )
+    metrics.configure(config["metrics"]["enabled"], config["metrics"]["path"])
+    exit_code = args.run(config, args)
+    metrics.write_summary()
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+from array import array
+from typing import Final, Iterator, Tuple
+from model.parsed_day import ParsedDay
+from util.datetimehandler import DateTimeHandler
+
+# Value of start and end while they are not tracked yet ("" in the JSON)
+NOT_TRACKED: Final[int] = -1
+KEYS: Final[tuple] = ("start", "end", "breaks", "comment")
+
+
+class DayRecord:
+    """A tracked day with integer minutes of the day instead of strings"""
+
+    __slots__ = ("ordinal", "start", "end", "breaks", "comment")
+
+    def __init__(
+        self, ordinal: int, start: int, end: int, breaks: array, comment: str
+    ) -> None:
+        self.ordinal = ordinal
+        self.start = start
+        self.end = end
+        self.breaks = breaks
+        self.comment = comment
+
+    @classmethod
+    def from_dict(cls, day: str, data: dict, dth: DateTimeHandler) -> "DayRecord":
+        """Converts a day of a report
+
+        Args:
+            day (str): The day (e.g. "01.02.2023").
+            data (dict): The data tracked for the day.
+            dth (DateTimeHandler): The handler to parse with.
+
+        Raises:
+            ValueError: If the day can not be converted losslessly (e.g. "7:11" instead of "07:11").
+
+        Returns:
+            DayRecord: The record of the day.
+        """
+        if not isinstance(data, dict) or tuple(data.keys()) != KEYS:
+            raise ValueError(f"Day {day} does not have the keys {KEYS}")
+        record = cls(
+            ordinal=dth.date_str_to_ordinal(day),
+            start=cls.__parse_time(data["start"], dth),
+            end=cls.__parse_time(data["end"], dth),
+            breaks=array("h", [dth.time_str_to_minutes(b) for b in data["breaks"]]),
+            comment=data["comment"],
+        )
+        if record.to_dict(dth) != (day, data):
+            raise ValueError(f"Day {day} can not be converted losslessly: {data}")
+        return record
+
+    @staticmethod
+    def __parse_time(time_str: str, dth: DateTimeHandler) -> int:
+        return NOT_TRACKED if time_str == "" else dth.time_str_to_minutes(time_str)
+
+    @staticmethod
+    def __format_time(minutes: int, dth: DateTimeHandler) -> str:
+        return "" if minutes == NOT_TRACKED else dth.minutes_to_time_str(minutes)
+
+    def to_dict(self, dth: DateTimeHandler) -> Tuple[str, dict]:
+        """Converts the record back into a day of a report
+
+        Returns:
+            Tuple[str, dict]: The day and the data tracked for it.
+        """
+        return dth.ordinal_to_date_str(self.ordinal), {
+            "start": self.__format_time(self.start, dth),
+            "end": self.__format_time(self.end, dth),
+            "breaks": [dth.minutes_to_time_str(b) for b in self.breaks],
+            "comment": self.comment,
+        }
+
+    def to_parsed_day(self, dth: DateTimeHandler) -> ParsedDay:
+        return ParsedDay(
+            day=dth.ordinal_to_date_str(self.ordinal),
+            ordinal=self.ordinal,
+            start=None if self.start == NOT_TRACKED else self.start,
+            end=None if self.end == NOT_TRACKED else self.end,
+            breaks=tuple(self.breaks),
+        )
+
+
+class MonthReport:
+    """A report backed by arrays of integer minutes instead of nested dicts of strings.
+
+    It can be used like the report dict (e.g. report[day], report[day] = data,
+    report.keys()), converts losslessly from and to it and is accepted by
+    TimeTracker, PlausibilityChecker and StatsGenerator. Days that can not be
+    stored as integers (e.g. manually edited "7:11") are kept as they are.
+    Read one with MonthlyFileHandler.read_report(..., as_month_report=True), as
+    the TrackingServer does for the reports it keeps in memory.
+    """
+
+    def __init__(self) -> None:
+        self.dth = DateTimeHandler()
+        # Columns of all days stored as integers, breaks of day i are
+        # breaks[break_offsets[i]:break_offsets[i + 1]]
+        self.ordinals = array("i")
+        self.starts = array("h")
+        self.ends = array("h")
+        self.break_offsets = array("i", [0])
+        self.breaks = array("h")
+        self.comments = []
+        # Position of every day in the report to keep the order of the JSON
+        self.positions = array("i")
+        # Days that can not be stored as integers by their position
+        self.raw_days = {}
+        self.__next_position = 0
+
+    @classmethod
+    def from_report(cls, report: dict) -> "MonthReport":
+        month_report = cls()
+        for day, data in report.items():
+            month_report[day] = data
+        return month_report
+
+    def to_report(self) -> dict:
+        return dict(self.items())
+
+    def __len__(self) -> int:
+        return len(self.ordinals) + len(self.raw_days)
+
+    def __index(self, day: str) -> int | None:
+        """Returns the index of a day stored as integers"""
+        try:
+            return self.ordinals.index(self.dth.date_str_to_ordinal(day))
+        except ValueError:
+            return None
+
+    def __raw_position(self, day: str) -> int | None:
+        for position, (raw_day, _) in self.raw_days.items():
+            if raw_day == day:
+                return position
+        return None
+
+    def __contains__(self, day: str) -> bool:
+        return self.__index(day) is not None or self.__raw_position(day) is not None
+
+    def keys(self) -> list[str]:
+        return [day for day, _ in self.items()]
+
+    def record(self, index: int) -> DayRecord:
+        return DayRecord(
+            ordinal=self.ordinals[index],
+            start=self.starts[index],
+            end=self.ends[index],
+            breaks=self.breaks[
+                self.break_offsets[index] : self.break_offsets[index + 1]
+            ],
+            comment=self.comments[index],
+        )
+
+    def __getitem__(self, day: str) -> dict:
+        """Returns a copy of the data of a day, assign it again to apply changes"""
+        index = self.__index(day)
+        if index is not None:
+            return self.record(index).to_dict(self.dth)[1]
+        position = self.__raw_position(day)
+        if position is None:
+            raise KeyError(day)
+        return self.raw_days[position][1]
+
+    def __setitem__(self, day: str, data: dict) -> None:
+        index = self.__index(day)
+        position = self.__raw_position(day)
+        if position is None:
+            position = (
+                self.positions[index] if index is not None else self.__next_position
+            )
+        self.__next_position = max(self.__next_position, position + 1)
+        try:
+            record = DayRecord.from_dict(day, data, self.dth)
+        except ValueError:
+            if index is not None:
+                self.__remove(index)
+            self.raw_days[position] = (day, data)
+            return
+        self.raw_days.pop(position, None)
+        if index is None:
+            self.__append(record, position)
+        else:
+            self.__replace(index, record)
+
+    def __append(self, record: DayRecord, position: int) -> None:
+        self.ordinals.append(record.ordinal)
+        self.starts.append(record.start)
+        self.ends.append(record.end)
+        self.breaks.extend(record.breaks)
+        self.break_offsets.append(len(self.breaks))
+        # Empty comments are shared instead of stored per day
+        self.comments.append(record.comment or "")
+        self.positions.append(position)
+
+    def __replace(self, index: int, record: DayRecord) -> None:
+        self.starts[index] = record.start
+        self.ends[index] = record.end
+        self.comments[index] = record.comment or ""
+        old_breaks_length = self.break_offsets[index + 1] - self.break_offsets[index]
+        # Only the offsets of the following days move (usually today is the last day)
+        self.breaks[self.break_offsets[index] : self.break_offsets[index + 1]] = (
+            record.breaks
+        )
+        shift = len(record.breaks) - old_breaks_length
+        for i in range(index + 1, len(self.break_offsets)):
+            self.break_offsets[i] += shift
+
+    def __remove(self, index: int) -> None:
+        breaks_length = self.break_offsets[index + 1] - self.break_offsets[index]
+        del self.breaks[self.break_offsets[index] : self.break_offsets[index + 1]]
+        del self.break_offsets[index + 1]
+        for i in range(index + 1, len(self.break_offsets)):
+            self.break_offsets[i] -= breaks_length
+        del self.ordinals[index]
+        del self.starts[index]
+        del self.ends[index]
+        del self.comments[index]
+        del self.positions[index]
+
+    def __ordered(self) -> Iterator[Tuple[int, int | None, Tuple[str, dict] | None]]:
+        """Iterates (position, index of the integer day or None, raw day or None) in order"""
+        entries = [
+            (position, index, None) for index, position in enumerate(self.positions)
+        ]
+        entries.extend(
+            (position, None, raw_day) for position, raw_day in self.raw_days.items()
+        )
+        return iter(sorted(entries, key=lambda entry: entry[0]))
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        for _, index, raw_day in self.__ordered():
+            yield self.record(index).to_dict(self.dth) if index is not None else raw_day
+
+    def parsed_days(self) -> Iterator[ParsedDay]:
+        """Iterates all days parsed (see ParsedDay) in the order of the report"""
+        for _, index, raw_day in self.__ordered():
+            if index is not None:
+                yield self.record(index).to_parsed_day(self.dth)
+            else:
+                yield ParsedDay.parse(raw_day[0], raw_day[1], self.dth)
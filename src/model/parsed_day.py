@@ -0,0 +1,43 @@
+from typing import NamedTuple
+from util.datetimehandler import DateTimeHandler
+
+
+class ParsedDay(NamedTuple):
+    """A day of a report, parsed once into integer minutes of the day.
+    Values that can not be parsed (e.g. an empty end while working) are None."""
+
+    day: str
+    ordinal: int | None
+    start: int | None
+    end: int | None
+    # Start and end of every break (a break that is still running has no end)
+    breaks: tuple
+
+    @classmethod
+    def parse(cls, day: str, data: dict, dth: DateTimeHandler) -> "ParsedDay":
+        """Parses a day of a report
+
+        Args:
+            day (str): The day (e.g. "01.02.2023").
+            data (dict): The data tracked for the day.
+            dth (DateTimeHandler): The handler to parse with.
+
+        Returns:
+            ParsedDay: The parsed day.
+        """
+        return cls(
+            day=day,
+            ordinal=cls.__try_parse(dth.date_str_to_ordinal, day),
+            start=cls.__try_parse(dth.time_str_to_minutes, data["start"]),
+            end=cls.__try_parse(dth.time_str_to_minutes, data["end"]),
+            breaks=tuple(
+                cls.__try_parse(dth.time_str_to_minutes, b) for b in data["breaks"]
+            ),
+        )
+
+    @staticmethod
+    def __try_parse(parse, value: str) -> int | None:
+        try:
+            return parse(value)
+        except ValueError:
+            return None
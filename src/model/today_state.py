@@ -0,0 +1,136 @@
+import threading
+from typing import Tuple
+from model.parsed_day import ParsedDay
+from util.datetimehandler import DateTimeHandler
+
+
+class TodayState:
+    """The tracking of today as integer minutes of the day, kept in memory and
+    updated in O(1) by every tracking (see TimeTracker), so the running work time
+    can be shown at any time without reading or parsing the report.
+    """
+
+    def __init__(self, allow_overnight_shifts: bool = False) -> None:
+        """
+        Args:
+            allow_overnight_shifts (bool, optional): Keep reporting a shift still
+                running after midnight on the next day. Defaults to False.
+        """
+        self.dth = DateTimeHandler()
+        self.allow_overnight_shifts = allow_overnight_shifts
+        # Read by e.g. a timer while a tracking updates it
+        self.__lock = threading.Lock()
+        self.__clear(None)
+
+    def __clear(self, day: str | None) -> None:
+        self.day = day
+        # As tracked, to notice changes of the report made elsewhere
+        self.start_str = ""
+        self.end_str = ""
+        self.break_count = 0
+        self.start: int | None = None
+        self.end: int | None = None
+        # Sum of all ended breaks and the start of a running one
+        self.break_minutes = 0
+        self.break_start: int | None = None
+
+    def is_synced(self, day: str, data: dict) -> bool:
+        """Returns whether the state still matches the tracked data of a day"""
+        return (
+            self.day == day
+            and self.start_str == data["start"]
+            and self.end_str == data["end"]
+            and self.break_count == len(data["breaks"])
+        )
+
+    def reset(self, day: str, data: dict | None) -> None:
+        """Replaces the state by the tracked data of a day (e.g. on startup)
+
+        Args:
+            day (str): The day (e.g. "01.02.2023").
+            data (dict | None): The data tracked for the day or None if not tracked.
+        """
+        with self.__lock:
+            self.__clear(day)
+            if data is None:
+                return
+            parsed_day = ParsedDay.parse(day, data, self.dth)
+            self.start_str = data["start"]
+            self.end_str = data["end"]
+            self.break_count = len(data["breaks"])
+            self.start = parsed_day.start
+            self.end = parsed_day.end
+            for i in range(0, len(parsed_day.breaks), 2):
+                break_start = parsed_day.breaks[i]
+                break_end = (
+                    parsed_day.breaks[i + 1] if i + 1 < len(parsed_day.breaks) else None
+                )
+                if break_start is None:
+                    continue
+                if break_end is None:
+                    self.break_start = break_start
+                else:
+                    self.break_minutes += (
+                        break_end - break_start
+                    ) % self.dth.MINUTES_PER_DAY
+
+    def track_start(self, time_str: str) -> None:
+        with self.__lock:
+            self.start_str = time_str
+            self.start = self.dth.time_str_to_minutes(time_str)
+
+    def track_end(self, time_str: str) -> None:
+        with self.__lock:
+            self.end_str = time_str
+            self.end = self.dth.time_str_to_minutes(time_str)
+
+    def track_break(self, time_str: str) -> None:
+        with self.__lock:
+            minutes = self.dth.time_str_to_minutes(time_str)
+            self.break_count += 1
+            if self.break_count % 2 == 1:
+                self.break_start = minutes
+            else:
+                if self.break_start is not None:
+                    self.break_minutes += (
+                        minutes - self.break_start
+                    ) % self.dth.MINUTES_PER_DAY
+                self.break_start = None
+
+    def __is_running_overnight(self, day: str) -> bool:
+        """Whether the shift of the state is still running on the day after it"""
+        return (
+            self.allow_overnight_shifts
+            and self.day is not None
+            and self.end is None
+            and self.dth.date_str_to_ordinal(day)
+            == self.dth.date_str_to_ordinal(self.day) + 1
+        )
+
+    def status(self, day: str, now_minutes: int) -> Tuple[int | None, int | None]:
+        """Returns the work of a day so far
+
+        Args:
+            day (str): The day asked for, usually today.
+            now_minutes (int): The current minute of the day.
+
+        Returns:
+            Tuple[int | None, int | None]: The work minutes without breaks (None if
+                the work was not started on the day) and the start of the running
+                break (None if there is none). With overnight shifts allowed, a
+                shift of the day before that is still running is reported instead.
+        """
+        with self.__lock:
+            if (
+                self.day != day and not self.__is_running_overnight(day)
+            ) or self.start is None:
+                return None, None
+            until = self.end if self.end is not None else now_minutes
+            break_minutes = self.break_minutes
+            if self.break_start is not None:
+                break_minutes += (until - self.break_start) % self.dth.MINUTES_PER_DAY
+            work_minutes = (until - self.start) % self.dth.MINUTES_PER_DAY
+            return (
+                max(work_minutes - break_minutes, 0),
+                self.break_start if self.end is None else None,
+            )
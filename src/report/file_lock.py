@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from typing import Final
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Exclusive lock of a file shared by all processes (e.g. two trays or a script
+    writing the same report), held on a separate "{path}.lock" file as reports
+    are replaced atomically when written.
+
+    The lock is reentrant within a thread and shared by all instances of a process
+    (see for_path), so nested read-modify-writes do not deadlock.
+    """
+
+    logger = logging.getLogger(__name__)
+    LOCK_EXTENSION: Final[str] = ".lock"
+    __instances: dict = {}
+    __instances_lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock_path = f"{path}{self.LOCK_EXTENSION}"
+        self.__thread_lock = threading.RLock()
+        self.__depth = 0
+        self.__fd: int = None
+
+    @classmethod
+    def for_path(cls, path: str) -> "FileLock":
+        """Returns the lock of a file, the same instance for the whole process
+
+        Args:
+            path (str): The path of the file to lock (not of the lock file).
+
+        Returns:
+            FileLock: The lock, use as "with FileLock.for_path(path):".
+        """
+        key = os.path.abspath(path)
+        with cls.__instances_lock:
+            lock = cls.__instances.get(key)
+            if lock is None:
+                lock = cls(path)
+                cls.__instances[key] = lock
+            return lock
+
+    def __lock_file(self) -> None:
+        self.__fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == "nt":
+                while True:
+                    try:
+                        # Retries for 10 seconds before raising
+                        msvcrt.locking(self.__fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        self.logger.warning(f"Still waiting for {self.lock_path}")
+            else:
+                fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(self.__fd)
+            self.__fd = None
+            raise
+
+    def __unlock_file(self) -> None:
+        try:
+            if os.name == "nt":
+                os.lseek(self.__fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.__fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self.__fd)
+            self.__fd = None
+
+    def acquire(self) -> None:
+        self.__thread_lock.acquire()
+        if self.__depth == 0:
+            try:
+                self.__lock_file()
+            except BaseException:
+                self.__thread_lock.release()
+                raise
+        self.__depth += 1
+
+    def release(self) -> None:
+        self.__depth -= 1
+        try:
+            if self.__depth == 0:
+                self.__unlock_file()
+        finally:
+            self.__thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
@@ -1,27 +1,71 @@
 import json
 import os
 import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Final, Iterable, Tuple
+from model.month_report import MonthReport
+from report.file_lock import FileLock
 from util.datetimehandler import DateTimeHandler
+from util.metrics import metrics
 from glob import glob
-from mdutils.mdutils import MdUtils
-from pandas import DataFrame, Timestamp
+
+# pandas and mdutils are only imported when exporting, to keep the tracking startup fast
+if TYPE_CHECKING:
+    from pandas import DataFrame, Timestamp
 
 
 class MonthlyFileHandler:
     EMPTY_FILESTRUCTURE = {}
+    JOURNAL_EXTENSION: Final[str] = ".journal"
+    REPORT_FILENAME_PATTERN: Final[re.Pattern] = re.compile(
+        r"^(?:DEV_)?(\d{1,2})_(\d{4})\.json$"
+    )
     logger = logging.getLogger(__name__)
 
-    def __init__(self, config: dict) -> None:
+    def __init__(self, config: dict, prepare_current_report: bool = True) -> None:
+        """
+        Args:
+            config (dict): The config.
+            prepare_current_report (bool, optional): Create the report of the current
+                month and compact the journals, False if the days are tracked
+                elsewhere (e.g. the "sqlite" storage backend). Defaults to True.
+        """
         self.config = config
         self.dth = DateTimeHandler()
-        self.__create_monthly_file()
+        self.journal = self.config["storage"]["journal"]
+        self.journal_compact_threshold = self.config["storage"][
+            "journal_compact_threshold"
+        ]
+        # Serialized days as persisted (JSON + journal) and journal length per report
+        # path, only kept with the journal enabled
+        self.__persisted_days = {}
+        self.__journal_lengths = {}
+        # JSON of the reports by path (least recently used first) with their file
+        # signatures, parsed again on every hit so callers get their own copy
+        self.report_cache_size = self.config["storage"]["report_cache_size"]
+        self.__report_cache = OrderedDict()
+        self.__report_cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Called with (report_path, report) after every write (e.g. by ReportManifest)
+        self.write_listeners: list[Callable[[str, dict], None]] = []
+        if prepare_current_report:
+            self.__create_monthly_file()
+            # Fold all journals (e.g. of closed months) into their monthly JSON
+            self.compact_journals()
+        self.__last_report_filename = self.current_report_filename()
 
     def current_report_filename(self) -> str:
         today = self.dth.today()
+        return self.report_filename(today.year, today.month)
+
+    def report_filename(self, year: int, month: int) -> str:
         return (
-            f"{today.month}_{today.year}.json"
+            f"{month}_{year}.json"
             if not self.config["development"]["devmode"]
-            else f"DEV_{today.month}_{today.year}.json"
+            else f"DEV_{month}_{year}.json"
         )
 
     def report_path_by_filename(self, report_name: str) -> str:
@@ -30,39 +74,324 @@ class MonthlyFileHandler:
     def get_report_path(self) -> str:
         return f"{self.config['paths']['reports']}"
 
+    def journal_path(self, report_path: str) -> str:
+        return f"{os.path.splitext(report_path)[0]}{self.JOURNAL_EXTENSION}"
+
     def list_reports_paths(self) -> list[str]:
         paths = glob(f"{self.get_report_path()}/*.json")
         return paths
 
-    def read_report(self, report_path: str):
+    def report_month(self, report_path: str) -> Tuple[int, int] | None:
+        """Returns the (year, month) of a report based on its filename only
+
+        Args:
+            report_path (str): The path of the report.
+
+        Returns:
+            Tuple[int, int] | None: (year, month) or None if the filename has no month.
+        """
+        match = self.REPORT_FILENAME_PATTERN.match(os.path.basename(report_path))
+        if match is None:
+            return None
+        return int(match.group(2)), int(match.group(1))
+
+    def sort_reports_paths(self, reports_paths: list[str]) -> list[str]:
+        """Sorts reports chronologically (reports without month in their filename last)"""
+        return sorted(
+            reports_paths,
+            key=lambda path: (self.report_month(path) or (float("inf"), 0), path),
+        )
+
+    def read_report(self, report_path: str, as_month_report: bool = False):
+        """Reads a report (including its journal), from the cache if unchanged
+
+        Args:
+            report_path (str): The path of the report.
+            as_month_report (bool, optional): Return a compact MonthReport instead
+                of the dict, e.g. for reports kept in memory. Defaults to False.
+
+        Returns:
+            dict | MonthReport: The report.
+        """
+        with metrics.timer("read_report"):
+            report = self.__read_report(report_path)
+        return MonthReport.from_report(report) if as_month_report else report
+
+    def __read_report(self, report_path: str):
+        signature = self.file_signature(report_path)
+        with self.__report_cache_lock:
+            cached = self.__report_cache.get(report_path)
+            if cached is not None and cached[0] == signature:
+                self.__report_cache.move_to_end(report_path)
+                self.cache_hits += 1
+                metrics.count("report_cache_hits")
+                content = cached[1]
+            else:
+                content = None
+                self.cache_misses += 1
+        if content is not None:
+            # Faster than a deep copy, callers are free to modify the report
+            return json.loads(content)
+
         with open(report_path, "r") as file:
-            return json.load(file)
+            content = file.read()
+        report = json.loads(content)
+        metrics.count("files_read")
+        metrics.count("bytes_read", signature[0][1])
+        if signature[1] is not None:
+            self.__fold_journal(report, self.journal_path(report_path))
+            metrics.count("files_read")
+            metrics.count("bytes_read", signature[1][1])
+            # The report differs from the file now
+            content = None
+        self.__remember_persisted(report_path, report)
+        self.__cache_report(report_path, report, signature, content)
+        return report
 
     def read_current_report(self) -> dict:
         return self.read_report(
             self.report_path_by_filename(self.current_report_filename())
         )
 
+    def lock_report(self, report_path: str) -> FileLock:
+        """Returns the lock of a report shared with all other processes. Hold it
+        around every read-modify-write, e.g.:
+
+            with fh.lock_report(report_path):
+                report = fh.read_report(report_path)
+                ...
+                fh.write_report(report_path, report)
+
+        Args:
+            report_path (str): The path of the report.
+
+        Returns:
+            FileLock: The reentrant lock of the report.
+        """
+        return FileLock.for_path(report_path)
+
+    def lock_current_report(self) -> FileLock:
+        return self.lock_report(
+            self.report_path_by_filename(self.current_report_filename())
+        )
+
     def write_current_report(self, report: dict) -> None:
-        with open(
-            self.report_path_by_filename(self.current_report_filename()), "w"
-        ) as file:
-            file.write(json.dumps(report, indent=2))
+        self.write_report(
+            self.report_path_by_filename(self.current_report_filename()), report
+        )
+
+    def write_report(self, report_path: str, report: dict | MonthReport) -> None:
+        """Writes a report, using the journal for the current month if enabled
+
+        Args:
+            report_path (str): The path of the report.
+            report (dict | MonthReport): The report to write.
+        """
+        if isinstance(report, MonthReport):
+            report = report.to_report()
+        with metrics.timer("write_report"), self.lock_report(report_path):
+            self.__write_report(report_path, report)
+        for listener in self.write_listeners:
+            listener(report_path, report)
+
+    def __write_report(self, report_path: str, report: dict) -> None:
+        report_filename = self.current_report_filename()
+        if not self.journal or report_path != self.report_path_by_filename(
+            report_filename
+        ):
+            self.__write_report_file(report_path, report)
+        else:
+            if report_filename != self.__last_report_filename:
+                # A new month started, so the journal of the last month is complete
+                self.compact_journals()
+                self.__last_report_filename = report_filename
+            self.__append_journal(report_path, report)
+            if self.__journal_lengths[report_path] >= self.journal_compact_threshold:
+                self.compact_journal(report_path)
+
+    def compact_journal(self, report_path: str) -> None:
+        """Folds the journal of a report into its monthly JSON and removes the journal
+
+        Args:
+            report_path (str): The path of the report (not of the journal).
+        """
+        journal_path = self.journal_path(report_path)
+        if not os.path.exists(journal_path):
+            return
+        with self.lock_report(report_path):
+            if not os.path.exists(journal_path):
+                # Compacted by another process in the meantime
+                return
+            self.logger.info(f"Compacting journal {journal_path}")
+            report = self.read_report(report_path)
+            self.__write_report_file(report_path, report)
+            # Replaying the journal is idempotent, so crashing before this is safe
+            os.remove(journal_path)
+            self.__journal_lengths[report_path] = 0
+            self.__cache_report(report_path, report)
+
+    def compact_journals(self) -> None:
+        """Folds all journals in the reports folder into their monthly JSON"""
+        for journal_path in glob(f"{self.get_report_path()}/*{self.JOURNAL_EXTENSION}"):
+            report_path = f"{os.path.splitext(journal_path)[0]}.json"
+            if os.path.exists(report_path):
+                self.compact_journal(report_path)
+            else:
+                self.logger.warning(
+                    f'Ignoring journal "{journal_path}" without report file.'
+                )
+
+    def __write_report_file(self, report_path: str, report: dict) -> None:
+        content = json.dumps(report, indent=2)
+        if self.__file_has_content(report_path, content):
+            metrics.count("writes_skipped")
+        else:
+            self.__replace_file(report_path, content)
+            metrics.count("files_written")
+            metrics.count("bytes_written", len(content))
+        self.__remember_persisted(report_path, report)
+        self.__cache_report(report_path, report, content=content)
+
+    def __file_has_content(self, path: str, content: str) -> bool:
+        """Whether the file already contains exactly the content (e.g. nothing changed)"""
+        data = content.encode()
+        try:
+            if os.stat(path).st_size != len(data):
+                return False
+            with open(path, "rb") as file:
+                return file.read() == data
+        except FileNotFoundError:
+            return False
+
+    def __replace_file(self, path: str, content: str) -> None:
+        """Writes a file atomically: a crash leaves either the old or the new content, never a truncated file"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(content.encode())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if os.name != "nt":
+            # Persist the rename itself (not possible for directories on Windows)
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def file_signature(self, report_path: str) -> tuple:
+        """Identifies the state of a report and its journal on disk without reading them,
+        so manual edits of the files invalidate the cache.
+
+        Returns:
+            tuple: (mtime, size, inode) of the report and of the journal (None if there is no journal)
+        """
+        signature = []
+        for path in (report_path, self.journal_path(report_path)):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def __cache_report(
+        self,
+        report_path: str,
+        report: dict,
+        signature: tuple = None,
+        content: str = None,
+    ) -> None:
+        if self.report_cache_size <= 0:
+            return
+        if signature is None:
+            signature = self.file_signature(report_path)
+        if content is None:
+            content = json.dumps(report)
+        with self.__report_cache_lock:
+            self.__report_cache[report_path] = (signature, content)
+            self.__report_cache.move_to_end(report_path)
+            while len(self.__report_cache) > self.report_cache_size:
+                self.__report_cache.popitem(last=False)
+
+    def __remember_persisted(self, report_path: str, report: dict) -> None:
+        # Only the journal appends the days that changed since
+        if not self.journal:
+            return
+        self.__persisted_days[report_path] = {
+            day: json.dumps(data) for day, data in report.items()
+        }
+
+    def __fold_journal(self, report: dict, journal_path: str) -> None:
+        """Applies all events of a journal on the report (the last event of a day wins)"""
+        length = 0
+        with open(journal_path, "r") as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the last event can be torn by a crash while appending
+                    self.logger.warning(
+                        f'Skipping broken event in journal "{journal_path}": {line}'
+                    )
+                    continue
+                if event["data"] is None:
+                    report.pop(event["day"], None)
+                else:
+                    report[event["day"]] = event["data"]
+                length += 1
+        report_path = f"{os.path.splitext(journal_path)[0]}.json"
+        self.__journal_lengths[report_path] = length
+
+    def __append_journal(self, report_path: str, report: dict) -> None:
+        """Appends an event to the journal for every day that changed since the last read/write"""
+        if report_path not in self.__persisted_days:
+            self.read_report(report_path)
+        persisted_days = self.__persisted_days[report_path]
+
+        events = []
+        serialized_days = {}
+        for day, data in report.items():
+            serialized_days[day] = json.dumps(data)
+            if persisted_days.get(day) != serialized_days[day]:
+                events.append(
+                    f'{{"day": {json.dumps(day)}, "data": {serialized_days[day]}}}\n'
+                )
+        for day in persisted_days.keys() - report.keys():
+            events.append(f'{{"day": {json.dumps(day)}, "data": null}}\n')
+        if len(events) == 0:
+            return
+
+        content = "".join(events)
+        with open(self.journal_path(report_path), "a") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        metrics.count("files_written")
+        metrics.count("bytes_written", len(content))
+        self.__persisted_days[report_path] = serialized_days
+        self.__journal_lengths[report_path] = self.__journal_lengths.get(
+            report_path, 0
+        ) + len(events)
+        self.__cache_report(report_path, report)
 
     def __create_monthly_file(self):
         """Creates a monthly report file if non exists"""
-        if os.path.exists(self.report_path_by_filename(self.current_report_filename())):
-            self.logger.info(
-                f'Monthly report file "{self.report_path_by_filename(self.current_report_filename())}" already exists.'
-            )
-        else:
-            self.logger.info(
-                f'Creating report file "{self.report_path_by_filename(self.current_report_filename())}".'
-            )
-            with open(
-                self.report_path_by_filename(self.current_report_filename()), "w"
-            ) as file:
-                file.write(json.dumps(self.EMPTY_FILESTRUCTURE, indent=2))
+        report_path = self.report_path_by_filename(self.current_report_filename())
+        # Another process could create and fill it at the same time
+        with self.lock_report(report_path):
+            if os.path.exists(report_path):
+                self.logger.info(f'Monthly report file "{report_path}" already exists.')
+            else:
+                self.logger.info(f'Creating report file "{report_path}".')
+                self.__replace_file(
+                    report_path, json.dumps(self.EMPTY_FILESTRUCTURE, indent=2)
+                )
 
 
 class StatsExportFileHandler:
@@ -75,7 +404,9 @@ class StatsExportFileHandler:
     def get_report_path(self) -> str:
         return f"{self.config['paths']['reports']}"
 
-    def write_stats_export(self, reports_df_stats: list[DataFrame]):
+    def write_stats_export(self, reports_df_stats: list["DataFrame"]):
+        from mdutils.mdutils import MdUtils
+
         filename = f"{self.get_report_path()}/{self.dth.now_datetime_file_str()}_PyTimeTrack_Report"
         mdFile = MdUtils(
             author="PyTimeTrack",
@@ -96,7 +427,7 @@ class StatsExportFileHandler:
             table_days = ["Day", "Work", "Break"]
             counter = 0
             for index, row in df_stats.iterrows():
-                day: Timestamp = row["day"]
+                day: "Timestamp" = row["day"]
                 work = f"{row['total_work_without_break_h']}h {row['total_work_without_break_min']}min"
                 breaks = f"{row['total_break_h']}h {row['total_break_min']}min"
                 table_days.extend([day.strftime(self.dth.DATE_FORMAT), work, breaks])
@@ -120,3 +451,77 @@ class StatsExportFileHandler:
         mdFile.new_table_of_contents(table_title="Months", depth=1)
         self.logger.info(f"Writing report to {filename}.md")
         mdFile.create_md_file()
+
+    def __markdown_anchor(self, title: str) -> str:
+        return title.lower().replace(" ", "-")
+
+    def __markdown_month_section(self, df_stats: "DataFrame") -> Tuple[str, str]:
+        """Formats the section of a month with all rows of its table at once
+
+        Args:
+            df_stats (DataFrame): The statistics export of the month.
+
+        Returns:
+            Tuple[str, str]: The title and the Markdown of the section.
+        """
+        df_stats = df_stats.sort_values(by=["day"])
+        first_day_in_report = df_stats["day"].iloc[0]
+        title = f"{first_day_in_report.month_name()} {first_day_in_report.year}"
+        rows = (
+            "|"
+            + df_stats["day"].dt.strftime(self.dth.DATE_FORMAT)
+            + "|"
+            + df_stats["total_work_without_break_h"].astype(str)
+            + "h "
+            + df_stats["total_work_without_break_min"].astype(str)
+            + "min|"
+            + df_stats["total_break_h"].astype(str)
+            + "h "
+            + df_stats["total_break_min"].astype(str)
+            + "min|"
+        )
+        table_rows = "\n".join(rows)
+        total_work_in_month_mins = df_stats["total_work_without_break"].sum()
+        section = (
+            f"\n# {title}\n  \n\n"
+            "|Day|Work|Break|\n"
+            "| :---: | :---: | :---: |\n"
+            f"{table_rows}\n  \n"
+            f"Total work: {self.dth.minutes_to_full_hours(total_work_in_month_mins)}h {self.dth.minutes_mod_hour(total_work_in_month_mins)}min"
+        )
+        return title, section
+
+    def stream_stats_export(self, reports_df_stats: Iterable["DataFrame"]) -> str:
+        """Writes the statistics export while the months are produced, so only one month
+        is held in memory. The table of contents is appended after the last month.
+
+        Args:
+            reports_df_stats (Iterable[DataFrame]): The statistics export of every month
+                (e.g. a generator like ExportPipeline.stream).
+
+        Returns:
+            str: The path of the written report.
+        """
+        report_path = f"{self.get_report_path()}/{self.dth.now_datetime_file_str()}_PyTimeTrack_Report.md"
+        self.logger.info(f"Writing report to {report_path}")
+        titles = []
+        with open(report_path, "w", encoding="utf-8") as file:
+            file.write("\nPyTimeTrack Report\n==================\n")
+            for df_stats in reports_df_stats:
+                # Only the writing, producing the months is measured by their own stages
+                with metrics.timer("write_stats_export_month"):
+                    title, section = self.__markdown_month_section(df_stats)
+                    titles.append(title)
+                    file.write(section)
+                    # Finished months are on disk, even if a later one fails
+                    file.flush()
+                metrics.count("bytes_written", len(section))
+            file.write("\n\nMonths\n======\n\n")
+            file.write(
+                "".join(
+                    f"* [{title}](#{self.__markdown_anchor(title)})\n"
+                    for title in titles
+                )
+            )
+        metrics.count("files_written")
+        return report_path
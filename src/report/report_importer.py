@@ -0,0 +1,354 @@
+import csv
+import logging
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Final, Iterator, Tuple
+from report.filehandler import MonthlyFileHandler
+from util.datetimehandler import DateTimeHandler
+from util.intervals import MINUTES_PER_DAY, unwrap
+from util.metrics import metrics
+from validation.plausibility_checker import PlausibilityChecker
+
+# An imported row: date ordinal, start, end, breaks (minutes of the day) and comment
+ImportRow = Tuple[int, int, int, tuple, str]
+
+
+class ReportImporter:
+    """Imports days from other systems (CSV or iCalendar files) into the monthly reports.
+
+    The input is streamed: rows are grouped by month into temporary spill files
+    in chunks of chunk_rows, then every month is merged, validated and written
+    with a single write. Memory is bounded by the chunk and the largest month,
+    not by the size of the input.
+
+    Several rows (or events) of the same day become one day from the first start
+    to the last end, with the gaps between them as breaks.
+    """
+
+    logger = logging.getLogger(__name__)
+    FORMATS: Final[tuple] = ("csv", "ics")
+    # Amount of broken rows reported in detail (all of them are counted)
+    MAX_REPORTED_ERRORS: Final[int] = 20
+    BREAK_PATTERN: Final[re.Pattern] = re.compile(
+        r"(\d{1,2}:\d{2})(?::\d{2})?\s*-\s*(\d{1,2}:\d{2})(?::\d{2})?"
+    )
+
+    def __init__(
+        self, config: dict, fh: MonthlyFileHandler, pc: PlausibilityChecker
+    ) -> None:
+        self.config = config
+        self.chunk_rows = self.config["importer"]["chunk_rows"]
+        self.fh = fh
+        self.pc = pc
+        self.dth = DateTimeHandler()
+
+    def __parse_time(self, time_str: str) -> int:
+        time_str = time_str.strip()
+        # "HH:MM:SS" exports, seconds are not tracked
+        if time_str.count(":") == 2:
+            time_str = time_str.rsplit(":", 1)[0]
+        return self.dth.time_str_to_minutes(time_str)
+
+    def __add_error(self, errors: list, line_number: int, error: str) -> None:
+        # The same {"day", "error"} as the validation, the day of a broken row is unknown
+        if len(errors) < self.MAX_REPORTED_ERRORS:
+            errors.append({"day": None, "error": f"Line {line_number}: {error}"})
+
+    def read_csv(self, path: str, errors: list) -> Iterator[ImportRow | None]:
+        """Streams the rows of a CSV file with the columns "date" (DD.MM.YYYY or
+        YYYY-MM-DD), "start", "end" (HH:MM) and optionally "breaks" (e.g.
+        "12:00-12:30 15:00-15:10") and "comment". The delimiter is detected.
+
+        Args:
+            path (str): The path of the CSV file.
+            errors (list): Receives the errors of broken rows.
+
+        Yields:
+            Iterator[ImportRow | None]: Every row or None if it is broken.
+        """
+        with open(path, "r", newline="", encoding="utf-8-sig") as file:
+            try:
+                dialect = csv.Sniffer().sniff(file.read(4096), delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            file.seek(0)
+            reader = csv.DictReader(file, dialect=dialect)
+            fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            missing_columns = {"date", "start", "end"} - set(fieldnames)
+            if len(missing_columns) > 0:
+                raise ValueError(
+                    f"{path} is missing the columns {sorted(missing_columns)}"
+                )
+            reader.fieldnames = fieldnames
+            for row in reader:
+                try:
+                    breaks = []
+                    for break_start, break_end in self.BREAK_PATTERN.findall(
+                        row.get("breaks") or ""
+                    ):
+                        breaks.extend(
+                            (
+                                self.__parse_time(break_start),
+                                self.__parse_time(break_end),
+                            )
+                        )
+                    yield (
+                        self.dth.any_date_str_to_ordinal(row["date"]),
+                        self.__parse_time(row["start"]),
+                        self.__parse_time(row["end"]),
+                        tuple(breaks),
+                        (row.get("comment") or "").strip(),
+                    )
+                except (ValueError, AttributeError) as e:
+                    self.__add_error(errors, reader.line_num, str(e))
+                    yield None
+
+    def __parse_ics_datetime(self, value: str) -> datetime:
+        if value.endswith("Z"):
+            # UTC, shown in local time like tracked times
+            return (
+                datetime.strptime(value, "%Y%m%dT%H%M%SZ")
+                .replace(tzinfo=timezone.utc)
+                .astimezone()
+            )
+        # Local or TZID time, taken as wall clock time
+        return datetime.strptime(value, "%Y%m%dT%H%M%S")
+
+    def __ics_event_row(self, event: dict) -> ImportRow:
+        if "DTSTART" not in event or "DTEND" not in event:
+            raise ValueError("Event without DTSTART and DTEND")
+        start = self.__parse_ics_datetime(event["DTSTART"])
+        end = self.__parse_ics_datetime(event["DTEND"])
+        summary = (
+            event.get("SUMMARY", "")
+            .replace("\\n", " ")
+            .replace("\\,", ",")
+            .replace("\\;", ";")
+            .replace("\\\\", "\\")
+        )
+        return (
+            start.toordinal(),
+            start.hour * 60 + start.minute,
+            end.hour * 60 + end.minute,
+            (),
+            summary.strip(),
+        )
+
+    def read_ics(self, path: str, errors: list) -> Iterator[ImportRow | None]:
+        """Streams the events (VEVENT with DTSTART and DTEND) of an iCalendar file.
+        The SUMMARY becomes the comment, all-day events are skipped as broken.
+
+        Args:
+            path (str): The path of the iCalendar file.
+            errors (list): Receives the errors of broken events.
+
+        Yields:
+            Iterator[ImportRow | None]: Every event or None if it is broken.
+        """
+
+        def unfolded_lines(file) -> Iterator[Tuple[int, str]]:
+            # Long lines continue on the next line starting with a space or tab
+            line_number, previous = 0, None
+            for line_number, line in enumerate(file, start=1):
+                line = line.rstrip("\r\n")
+                if line[:1] in (" ", "\t") and previous is not None:
+                    previous += line[1:]
+                    continue
+                if previous is not None:
+                    yield line_number - 1, previous
+                previous = line
+            if previous is not None:
+                yield line_number, previous
+
+        event = None
+        with open(path, "r", encoding="utf-8-sig") as file:
+            for line_number, line in unfolded_lines(file):
+                if line == "BEGIN:VEVENT":
+                    event = {}
+                elif line == "END:VEVENT" and event is not None:
+                    try:
+                        yield self.__ics_event_row(event)
+                    except ValueError as e:
+                        self.__add_error(errors, line_number, str(e))
+                        yield None
+                    event = None
+                elif event is not None:
+                    name_and_parameters, _, value = line.partition(":")
+                    event[name_and_parameters.split(";")[0].upper()] = value
+
+    def __spill(
+        self, rows: Iterator[ImportRow | None], spill_dir: str
+    ) -> Tuple[int, int, dict]:
+        """Groups the rows by month into spill files, holding at most chunk_rows in memory
+
+        Returns:
+            Tuple[int, int, dict]: The amount of rows, of broken rows and the spill file by (year, month).
+        """
+        spill_paths = {}
+        buffers = {}
+        buffered_rows = 0
+        row_count = 0
+        broken_rows = 0
+
+        def flush() -> None:
+            for month, lines in buffers.items():
+                with open(spill_paths[month], "a", encoding="utf-8") as file:
+                    file.write("".join(lines))
+            buffers.clear()
+
+        for row in rows:
+            row_count += 1
+            if row is None:
+                broken_rows += 1
+                continue
+            day = date.fromordinal(row[0])
+            month = (day.year, day.month)
+            if month not in spill_paths:
+                spill_paths[month] = os.path.join(
+                    spill_dir, f"{day.year}_{day.month}.tsv"
+                )
+            ordinal, start, end, breaks, comment = row
+            # Tab separated, which is much cheaper than JSON for millions of rows
+            comment = comment.replace("\t", " ").replace("\n", " ").replace("\r", "")
+            buffers.setdefault(month, []).append(
+                f"{ordinal}\t{start}\t{end}\t{' '.join(map(str, breaks))}\t{comment}\n"
+            )
+            buffered_rows += 1
+            if buffered_rows >= self.chunk_rows:
+                flush()
+                buffered_rows = 0
+        flush()
+        return row_count, broken_rows, spill_paths
+
+    def __imported_days(self, spill_path: str) -> dict:
+        """Merges all rows of a month into days of a report"""
+        rows_by_day = {}
+        with open(spill_path, "r", encoding="utf-8") as file:
+            for line in file:
+                ordinal, start, end, breaks, comment = line.rstrip("\n").split("\t")
+                rows_by_day.setdefault(int(ordinal), []).append(
+                    (int(start), int(end), [int(b) for b in breaks.split()], comment)
+                )
+
+        days = {}
+        for ordinal in sorted(rows_by_day):
+            rows = sorted(rows_by_day[ordinal])
+            breaks = []
+            last_end = None
+            for start, end, row_breaks, _ in rows:
+                # Unwrapped, so a row ending after midnight (e.g. 22:00-02:00) ends after its start
+                end = unwrap(start, end)
+                # A gap between two rows of the same day is a break
+                if last_end is not None and start > last_end:
+                    breaks.extend((last_end % MINUTES_PER_DAY, start))
+                breaks.extend(row_breaks)
+                last_end = end if last_end is None else max(last_end, end)
+            comments = dict.fromkeys(row[3] for row in rows if row[3] != "")
+            days[self.dth.ordinal_to_date_str(ordinal)] = {
+                "start": self.dth.minutes_to_time_str(rows[0][0]),
+                "end": self.dth.minutes_to_time_str(last_end % MINUTES_PER_DAY),
+                "breaks": [self.dth.minutes_to_time_str(b) for b in breaks],
+                "comment": "; ".join(comments),
+            }
+        return days
+
+    def __day_order(self, day: str) -> Tuple[int, str]:
+        try:
+            return self.dth.date_str_to_ordinal(day), day
+        except ValueError:
+            # Keep (broken) days that are not dates at the end
+            return date.max.toordinal() + 1, day
+
+    def import_file(
+        self, path: str, file_format: str = None, overwrite: bool = False
+    ) -> dict:
+        """Imports a CSV or iCalendar file into the monthly reports
+
+        Args:
+            path (str): The file to import.
+            file_format (str, optional): "csv" or "ics". Defaults to None (by file extension).
+            overwrite (bool, optional): Replace days that already exist in a report. Defaults to False (keep them).
+
+        Returns:
+            dict: The summary with the amount of "rows", "broken_rows", "days",
+                "invalid_days", "conflicting_days", "months" (written), "seconds",
+                "rows_per_second" and the first "errors", each as {"day", "error"}.
+        """
+        file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in self.FORMATS:
+            raise ValueError(
+                f'Unknown import format "{file_format}", use one of {self.FORMATS}.'
+            )
+        start = time.perf_counter()
+        errors = []
+        rows = (
+            self.read_csv(path, errors)
+            if file_format == "csv"
+            else self.read_ics(path, errors)
+        )
+        summary = {
+            "days": 0,
+            "invalid_days": 0,
+            "conflicting_days": 0,
+            "months": 0,
+        }
+        with metrics.timer("import"), tempfile.TemporaryDirectory() as spill_dir:
+            row_count, broken_rows, spill_paths = self.__spill(rows, spill_dir)
+            for (year, month), spill_path in sorted(spill_paths.items()):
+                days = self.__imported_days(spill_path)
+                # Days that are not plausible are skipped, the others are imported
+                _, day_errors = self.pc.validate(days)
+                invalid_days = {error["day"] for error in day_errors}
+                errors.extend(day_errors[: self.MAX_REPORTED_ERRORS])
+                report_path = self.fh.report_path_by_filename(
+                    self.fh.report_filename(year, month)
+                )
+                # Tracking of another process must not get lost between read and write
+                with self.fh.lock_report(report_path):
+                    report = (
+                        self.fh.read_report(report_path)
+                        if os.path.exists(report_path)
+                        else {}
+                    )
+                    changed = False
+                    for day, data in days.items():
+                        if day in invalid_days:
+                            continue
+                        if day in report:
+                            summary["conflicting_days"] += 1
+                            if not overwrite or report[day] == data:
+                                continue
+                        report[day] = data
+                        summary["days"] += 1
+                        changed = True
+                    summary["invalid_days"] += len(invalid_days)
+                    if changed:
+                        # One write per month, in chronological order of the days
+                        self.fh.write_report(
+                            report_path,
+                            dict(
+                                sorted(
+                                    report.items(),
+                                    key=lambda item: self.__day_order(item[0]),
+                                )
+                            ),
+                        )
+                        summary["months"] += 1
+        seconds = time.perf_counter() - start
+        metrics.count("import_rows", row_count)
+        summary.update(
+            {
+                "rows": row_count,
+                "broken_rows": broken_rows,
+                "seconds": seconds,
+                "rows_per_second": row_count / seconds if seconds > 0 else 0.0,
+                "errors": errors[: self.MAX_REPORTED_ERRORS],
+            }
+        )
+        self.logger.info(
+            f"Imported {summary['days']} days of {row_count} rows from {path} into {summary['months']} month(s) ({summary['rows_per_second']:.0f} rows/s)"
+        )
+        return summary
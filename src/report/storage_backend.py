@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from calendar import monthrange
+from datetime import date
+from typing import ContextManager, Final, Iterator, Tuple
+from report.file_lock import FileLock
+from report.filehandler import MonthlyFileHandler
+from util.datetimehandler import DateTimeHandler
+from util.metrics import metrics
+
+
+def months_between(first_day: date, last_day: date) -> list[Tuple[int, int]]:
+    """Returns every (year, month) from the month of first_day to the one of last_day"""
+    first_month = first_day.year * 12 + first_day.month - 1
+    last_month = last_day.year * 12 + last_day.month - 1
+    return [
+        (month // 12, month % 12 + 1) for month in range(first_month, last_month + 1)
+    ]
+
+
+class StorageBackend(ABC):
+    """Persistence of the tracked days (e.g. "01.02.2023" with its start, end,
+    breaks and comment), independent of how they are stored.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self) -> None:
+        self.dth = DateTimeHandler()
+
+    @abstractmethod
+    def read_day(self, day: str) -> dict | None:
+        """Returns the data of a day or None if it was not tracked"""
+
+    @abstractmethod
+    def upsert_day(self, day: str, data: dict) -> None:
+        """Inserts or replaces a single day"""
+
+    @abstractmethod
+    def upsert_days(self, days: dict) -> None:
+        """Inserts or replaces many days (e.g. of a migration) in as few writes as possible"""
+
+    @abstractmethod
+    def days_in_range(
+        self, first_day: date, last_day: date
+    ) -> Iterator[Tuple[str, dict]]:
+        """Yields (day, data) of every tracked day of the range (inclusive) in chronological order"""
+
+    @abstractmethod
+    def months(self) -> list[Tuple[int, int]]:
+        """Returns (year, month) of every month with tracked days in chronological order"""
+
+    @abstractmethod
+    def lock(self, day: str) -> ContextManager:
+        """Returns a lock shared with other processes to hold around a
+        read-modify-write of the month of a day"""
+
+    def read_month(self, year: int, month: int) -> dict:
+        """Returns all days of a month as report (see MonthlyFileHandler.read_report)"""
+        return dict(
+            self.days_in_range(
+                date(year, month, 1), date(year, month, monthrange(year, month)[1])
+            )
+        )
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStorageBackend(StorageBackend):
+    """The monthly "{month}_{year}.json" reports of a MonthlyFileHandler (default)"""
+
+    def __init__(self, fh: MonthlyFileHandler) -> None:
+        super().__init__()
+        self.fh = fh
+
+    def __report_path(self, year: int, month: int) -> str:
+        return self.fh.report_path_by_filename(self.fh.report_filename(year, month))
+
+    def __day_report_path(self, day: str) -> str:
+        day_date = date.fromordinal(self.dth.date_str_to_ordinal(day))
+        return self.__report_path(day_date.year, day_date.month)
+
+    def read_day(self, day: str) -> dict | None:
+        report_path = self.__day_report_path(day)
+        if not os.path.exists(report_path):
+            return None
+        return self.fh.read_report(report_path).get(day)
+
+    def upsert_day(self, day: str, data: dict) -> None:
+        self.upsert_days({day: data})
+
+    def upsert_days(self, days: dict) -> None:
+        days_by_path = {}
+        for day, data in days.items():
+            days_by_path.setdefault(self.__day_report_path(day), {})[day] = data
+        # One write per month
+        for report_path, month_days in days_by_path.items():
+            with self.fh.lock_report(report_path):
+                report = (
+                    self.fh.read_report(report_path)
+                    if os.path.exists(report_path)
+                    else {}
+                )
+                report.update(month_days)
+                self.fh.write_report(report_path, report)
+
+    def read_month(self, year: int, month: int) -> dict:
+        # All days as stored, including the ones that are not valid dates
+        report_path = self.__report_path(year, month)
+        if not os.path.exists(report_path):
+            return {}
+        return self.fh.read_report(report_path)
+
+    def days_in_range(
+        self, first_day: date, last_day: date
+    ) -> Iterator[Tuple[str, dict]]:
+        first, last = first_day.toordinal(), last_day.toordinal()
+        # Only the reports of the months in the range are read
+        for year, month in months_between(first_day, last_day):
+            days = []
+            for day, data in self.read_month(year, month).items():
+                try:
+                    ordinal = self.dth.date_str_to_ordinal(day)
+                except ValueError:
+                    continue
+                if first <= ordinal <= last:
+                    days.append((ordinal, day, data))
+            for _, day, data in sorted(days, key=lambda item: item[0]):
+                yield day, data
+
+    def months(self) -> list[Tuple[int, int]]:
+        months = (
+            self.fh.report_month(report_path)
+            for report_path in self.fh.list_reports_paths()
+        )
+        return sorted(month for month in months if month is not None)
+
+    def lock(self, day: str) -> ContextManager:
+        return self.fh.lock_report(self.__day_report_path(day))
+
+
+class SqliteStorageBackend(StorageBackend):
+    """A SQLite database with one row per day, indexed by the date (ordinal) and
+    the month, in WAL mode so reads do not block the tracking.
+    """
+
+    SCHEMA: Final[str] = """
+        CREATE TABLE IF NOT EXISTS days (
+            ordinal INTEGER PRIMARY KEY,
+            month INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            start TEXT NOT NULL,
+            end TEXT NOT NULL,
+            breaks TEXT NOT NULL,
+            comment TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS days_month ON days (month);
+    """
+    UPSERT: Final[str] = """
+        INSERT INTO days (ordinal, month, day, start, end, breaks, comment)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ordinal) DO UPDATE SET
+            day = excluded.day,
+            start = excluded.start,
+            end = excluded.end,
+            breaks = excluded.breaks,
+            comment = excluded.comment
+    """
+    COLUMNS: Final[str] = "day, start, end, breaks, comment"
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        # Shared by the threads of the tray (e.g. tracking and background jobs)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute("PRAGMA busy_timeout=5000")
+        with self.__connection:
+            self.__connection.executescript(self.SCHEMA)
+
+    def __row(self, day: str, data: dict) -> tuple:
+        ordinal = self.dth.date_str_to_ordinal(day)
+        day_date = date.fromordinal(ordinal)
+        return (
+            ordinal,
+            day_date.year * 12 + day_date.month - 1,
+            day,
+            data["start"],
+            data["end"],
+            json.dumps(data["breaks"]),
+            data["comment"],
+        )
+
+    def __data(self, row: tuple) -> Tuple[str, dict]:
+        day, start, end, breaks, comment = row
+        return day, {
+            "start": start,
+            "end": end,
+            "breaks": json.loads(breaks),
+            "comment": comment,
+        }
+
+    def read_day(self, day: str) -> dict | None:
+        with self.__lock:
+            row = self.__connection.execute(
+                f"SELECT {self.COLUMNS} FROM days WHERE ordinal = ?",
+                (self.dth.date_str_to_ordinal(day),),
+            ).fetchone()
+        return None if row is None else self.__data(row)[1]
+
+    def upsert_day(self, day: str, data: dict) -> None:
+        self.upsert_days({day: data})
+
+    def upsert_days(self, days: dict) -> None:
+        rows = [self.__row(day, data) for day, data in days.items()]
+        with metrics.timer("upsert_days"), self.__lock:
+            # A single transaction for all days
+            with self.__connection:
+                self.__connection.executemany(self.UPSERT, rows)
+        metrics.count("rows_written", len(rows))
+
+    def days_in_range(
+        self, first_day: date, last_day: date
+    ) -> Iterator[Tuple[str, dict]]:
+        with self.__lock:
+            rows = self.__connection.execute(
+                f"SELECT {self.COLUMNS} FROM days WHERE ordinal BETWEEN ? AND ? ORDER BY ordinal",
+                (first_day.toordinal(), last_day.toordinal()),
+            ).fetchall()
+        for row in rows:
+            yield self.__data(row)
+
+    def months(self) -> list[Tuple[int, int]]:
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT DISTINCT month FROM days ORDER BY month"
+            ).fetchall()
+        return [(month // 12, month % 12 + 1) for (month,) in rows]
+
+    def lock(self, day: str) -> ContextManager:
+        # Other processes using the database wait until the day is written
+        return FileLock.for_path(self.path)
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+
+def create_storage_backend(config: dict, fh: MonthlyFileHandler) -> StorageBackend:
+    """Creates the configured storage backend (storage.backend "json" or "sqlite")
+
+    Args:
+        config (dict): The config.
+        fh (MonthlyFileHandler): The handler of the reports (also used by "json").
+
+    Returns:
+        StorageBackend: The backend.
+    """
+    backend = config["storage"]["backend"]
+    if backend == "json":
+        return JsonStorageBackend(fh)
+    if backend == "sqlite":
+        return SqliteStorageBackend(
+            os.path.join(fh.get_report_path(), config["storage"]["sqlite_path"])
+        )
+    raise ValueError(f'Unknown storage backend "{backend}", use "json" or "sqlite".')
+
+
+def migrate(source: StorageBackend, target: StorageBackend) -> dict:
+    """Copies all days from one backend to another, one month per batch
+
+    Args:
+        source (StorageBackend): The backend to read.
+        target (StorageBackend): The backend to write, existing days are replaced.
+
+    Returns:
+        dict: The amount of "months" and "days" copied and the "skipped_days"
+            that are not valid dates (e.g. a manual typo).
+    """
+    dth = DateTimeHandler()
+    summary = {"months": 0, "days": 0, "skipped_days": []}
+    for year, month in source.months():
+        days = {}
+        for day, data in source.read_month(year, month).items():
+            try:
+                dth.date_str_to_ordinal(day)
+            except ValueError:
+                summary["skipped_days"].append(day)
+                continue
+            days[day] = data
+        target.upsert_days(days)
+        summary["months"] += 1
+        summary["days"] += len(days)
+    StorageBackend.logger.info(
+        f"Migrated {summary['days']} days of {summary['months']} months, skipped {len(summary['skipped_days'])}"
+    )
+    return summary
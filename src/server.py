@@ -0,0 +1,33 @@
+import asyncio
+import logging
+import tomllib
+from tracking.tracking_server import TrackingServer
+from util.metrics import metrics
+
+
+def main():
+    with open(
+        "config.toml",
+        "rb",
+    ) as config_file:
+        config = tomllib.load(config_file)
+
+    # Initialize logging (applies to all module level loggers)
+    logging.basicConfig(
+        level=config["development"]["logging_level"],
+        # https://docs.python.org/2/library/logging.html#logrecord-attributes
+        format=f"%(asctime)s -- %(module)s -- (%(levelname)s): %(message)s",
+        filename="server.log",
+        encoding="utf-8",
+    )
+    metrics.configure(config["metrics"]["enabled"], config["metrics"]["path"])
+    server = TrackingServer(config)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    metrics.write_summary()
+
+
+if __name__ == "__main__":
+    main()
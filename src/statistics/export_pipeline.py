@@ -0,0 +1,290 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Callable, Final, Iterable, Iterator, Tuple
+from pandas import DataFrame
+from report.filehandler import MonthlyFileHandler
+from report.storage_backend import JsonStorageBackend, StorageBackend
+from statistics.report_archive import ReportArchive, load_archive_columns
+from statistics.report_manifest import ReportManifest
+from statistics.stats_generator import StatsGenerator
+from validation.plausibility_checker import PlausibilityChecker
+
+# Per process instances of the validation and statistics stages (process executor only)
+_worker_pc: PlausibilityChecker = None
+_worker_statsgen: StatsGenerator = None
+
+
+def _init_worker(
+    default_break_after_6h: int,
+    default_break_after_9h: int,
+    default_break_rules: list[dict],
+    allow_overnight_shifts: bool,
+) -> None:
+    global _worker_pc, _worker_statsgen
+    _worker_pc = PlausibilityChecker(allow_overnight_shifts=allow_overnight_shifts)
+    _worker_statsgen = StatsGenerator(
+        default_break_after_6h=default_break_after_6h,
+        default_break_after_9h=default_break_after_9h,
+        default_break_rules=default_break_rules,
+    )
+
+
+def _validate_and_export(
+    source: dict | str,
+    target_daily_work_minutes: int,
+    pc: PlausibilityChecker,
+    statsgen: StatsGenerator,
+) -> Tuple[DataFrame | None, list]:
+    """Validates a report and creates its statistics export
+
+    Args:
+        source (dict | str): The report or the path of its archive.
+        target_daily_work_minutes (int): The amount of minutes of daily target work
+        pc (PlausibilityChecker): The validation stage.
+        statsgen (StatsGenerator): The statistics stage.
+
+    Returns:
+        Tuple[DataFrame | None, list]: The statistics (None if invalid) and the validation errors.
+    """
+    if isinstance(source, str):
+        # Archives are only created for valid reports
+        return (
+            statsgen.stats_export_from_columns(
+                load_archive_columns(source), target_daily_work_minutes
+            ),
+            [],
+        )
+    # Every day is parsed once and passed from the validation to the statistics
+    report_is_valid, errors, parsed_days = pc.parse_and_validate(
+        source, check_start_end=False
+    )
+    if not report_is_valid:
+        return None, errors
+    return (
+        statsgen.stats_export_from_columns(
+            statsgen.parsed_columns(parsed_days), target_daily_work_minutes
+        ),
+        errors,
+    )
+
+
+def _validate_and_export_in_worker(
+    source: dict | str, target_daily_work_minutes: int
+) -> Tuple[DataFrame | None, list]:
+    return _validate_and_export(
+        source, target_daily_work_minutes, _worker_pc, _worker_statsgen
+    )
+
+
+class ExportPipeline:
+    """Runs the read, validate and statistics stages of the statistics export
+    for all reports in parallel, while keeping the order of the reports."""
+
+    logger = logging.getLogger(__name__)
+    EXECUTOR_THREAD: Final[str] = "thread"
+    EXECUTOR_PROCESS: Final[str] = "process"
+
+    def __init__(
+        self,
+        config: dict,
+        fh: MonthlyFileHandler,
+        pc: PlausibilityChecker,
+        statsgen: StatsGenerator,
+    ) -> None:
+        self.config = config
+        self.fh = fh
+        self.pc = pc
+        self.statsgen = statsgen
+        self.archive = ReportArchive(self.config, self.fh, self.pc, self.statsgen)
+        self.manifest = ReportManifest(self.config, self.fh, self.pc, self.statsgen)
+        self.executor = self.config["export"]["executor"]
+        # 0 lets the executor choose the amount of workers
+        self.max_workers = self.config["export"]["max_workers"] or None
+        self.target_daily_work_minutes = self.config["work"][
+            "target_daily_work_minutes"
+        ]
+
+    def __create_executor(self) -> Executor:
+        if self.executor == self.EXECUTOR_PROCESS:
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.statsgen.default_break_after_6h,
+                    self.statsgen.default_break_after_9h,
+                    self.statsgen.default_break_rules,
+                    self.pc.allow_overnight_shifts,
+                ),
+            )
+        if self.executor == self.EXECUTOR_THREAD:
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        raise ValueError(
+            f'Unknown export executor "{self.executor}", use "{self.EXECUTOR_THREAD}" or "{self.EXECUTOR_PROCESS}".'
+        )
+
+    def __read(self, report_path: str) -> Tuple[dict | str | None, list]:
+        """Returns the archive of a closed month or otherwise the report itself,
+        or None with the errors of a closed month found invalid while archiving"""
+        archive_path, errors = self.archive.archive_path(report_path)
+        if archive_path is not None or len(errors) > 0:
+            return archive_path, errors
+        self.logger.info(f"Validating report {report_path}")
+        return self.fh.read_report(report_path), []
+
+    def __read_validate_and_export(
+        self, report_path: str
+    ) -> Tuple[DataFrame | None, list]:
+        source, errors = self.__read(report_path)
+        if source is None:
+            return None, errors
+        return _validate_and_export(
+            source,
+            self.target_daily_work_minutes,
+            self.pc,
+            self.statsgen,
+        )
+
+    def __submit(self, executor: Executor, report_path: str) -> Future:
+        entry = self.manifest.fresh_entry(report_path)
+        if entry is not None and (not entry["valid"] or entry["tracked_days"] == 0):
+            # Unchanged invalid or empty reports are answered by the manifest
+            return self.__done(None, entry["errors"])
+        if self.executor == self.EXECUTOR_PROCESS:
+            # Reports are read here to share the cache and journals of the file handler,
+            # archives are memory mapped by the workers
+            source, errors = self.__read(report_path)
+            if source is None:
+                return self.__done(None, errors)
+            return executor.submit(
+                _validate_and_export_in_worker,
+                source,
+                self.target_daily_work_minutes,
+            )
+        return executor.submit(self.__read_validate_and_export, report_path)
+
+    def __done(self, df_stats: DataFrame | None, errors: list) -> Future:
+        future = Future()
+        future.set_result((df_stats, errors))
+        return future
+
+    def __read_month(self, storage: StorageBackend, report_name: str) -> dict:
+        return storage.read_month(*self.fh.report_month(report_name))
+
+    def __submit_month(
+        self, executor: Executor, storage: StorageBackend, report_name: str
+    ) -> Future:
+        if self.executor == self.EXECUTOR_PROCESS:
+            return executor.submit(
+                _validate_and_export_in_worker,
+                self.__read_month(storage, report_name),
+                self.target_daily_work_minutes,
+            )
+        return executor.submit(
+            lambda: _validate_and_export(
+                self.__read_month(storage, report_name),
+                self.target_daily_work_minutes,
+                self.pc,
+                self.statsgen,
+            )
+        )
+
+    def __stream(
+        self,
+        reports: Iterable[str],
+        submit: Callable[[Executor, str], Future],
+        reports_errors: list[dict],
+    ) -> Iterator[DataFrame]:
+        """Submits the reports in order, a few per worker ahead of the oldest one"""
+        window = 2 * (self.max_workers or os.cpu_count() or 1)
+        with self.__create_executor() as executor:
+            remaining_reports = iter(reports)
+            pending = deque()
+            for report in remaining_reports:
+                pending.append((report, submit(executor, report)))
+                if len(pending) >= window:
+                    break
+            while len(pending) > 0:
+                # Waiting for the oldest one keeps the order, regardless of which finished first
+                report, future = pending.popleft()
+                df_stats, errors = future.result()
+                next_report = next(remaining_reports, None)
+                if next_report is not None:
+                    pending.append((next_report, submit(executor, next_report)))
+                if len(errors) > 0:
+                    reports_errors.append({"report": report, "errors": errors})
+                # Reports without any finished day (e.g. a new month) have no statistics
+                if df_stats is not None and not df_stats.empty:
+                    yield df_stats
+
+    def stream(
+        self, reports_paths: list[str], reports_errors: list[dict]
+    ) -> Iterator[DataFrame]:
+        """Yields the statistics export of all valid reports in the given order as soon
+        as they are ready. Only a few reports per worker are processed ahead, so the
+        export of all reports is never held in memory at once.
+
+        Args:
+            reports_paths (list[str]): The reports to export (in the order of the export).
+            reports_errors (list[dict]): Receives the validation errors of all invalid
+                reports (each as {"report", "errors"}) while iterating.
+
+        Yields:
+            Iterator[DataFrame]: The statistics of every valid report.
+        """
+        # Summarizes new and changed reports, so unchanged invalid or empty ones are
+        # answered by the manifest (see __submit)
+        self.manifest.refresh()
+        yield from self.__stream(reports_paths, self.__submit, reports_errors)
+
+    def stream_storage(
+        self, storage: StorageBackend, reports_errors: list[dict]
+    ) -> Iterator[DataFrame]:
+        """Yields the statistics export of every month of a storage backend in
+        chronological order (see stream). The JSON reports use their archives and
+        the manifest, the months of other backends (e.g. "sqlite") are read and
+        validated every time.
+
+        Args:
+            storage (StorageBackend): The backend of the tracked days.
+            reports_errors (list[dict]): Receives the validation errors of all invalid
+                months (each as {"report", "errors"}, the report named like the
+                monthly JSON) while iterating.
+
+        Yields:
+            Iterator[DataFrame]: The statistics of every valid month.
+        """
+        if isinstance(storage, JsonStorageBackend):
+            yield from self.stream(
+                self.fh.sort_reports_paths(self.fh.list_reports_paths()),
+                reports_errors,
+            )
+            return
+        yield from self.__stream(
+            [self.fh.report_filename(year, month) for year, month in storage.months()],
+            lambda executor, report_name: self.__submit_month(
+                executor, storage, report_name
+            ),
+            reports_errors,
+        )
+
+    def run(self, reports_paths: list[str]) -> Tuple[list[DataFrame], list[dict]]:
+        """Creates the statistics export of all given reports.
+
+        Args:
+            reports_paths (list[str]): The reports to export (in the order of the export).
+
+        Returns:
+            Tuple[list[DataFrame], list[dict]]: The statistics of all valid reports in the
+                given order and the validation errors of all invalid reports
+                (each as {"report", "errors"}).
+        """
+        reports_errors = []
+        reports_df_stats = list(self.stream(reports_paths, reports_errors))
+        return reports_df_stats, reports_errors
@@ -0,0 +1,303 @@
+import json
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Callable, Final, Iterator, Tuple
+import numpy as np
+from report.filehandler import MonthlyFileHandler
+from report.storage_backend import JsonStorageBackend, StorageBackend
+from statistics.report_archive import ReportArchive, load_archive_columns
+from statistics.stats_generator import StatsGenerator
+from validation.plausibility_checker import PlausibilityChecker
+
+
+class OvertimeLedger:
+    """Overtime balance (work without breaks minus the target work) of every
+    calendar day across all reports, stored as prefix sums.
+
+    The balance of any range of days is the difference of two prefix sums, so
+    queries cost O(1) (rollups O(1) per period). A written report is only marked
+    stale (see update), on the next refresh only the prefix sums from its first
+    changed day on are recomputed. Days without tracking (e.g. weekends) and the
+    open day (not ended yet) have a balance of 0.
+    """
+
+    logger = logging.getLogger(__name__)
+    # Days to step from the start of a period into the next one
+    PERIOD_STEPS: Final[dict] = {"week": 7, "month": 31, "year": 366}
+
+    def __init__(
+        self,
+        config: dict,
+        fh: MonthlyFileHandler,
+        pc: PlausibilityChecker,
+        statsgen: StatsGenerator,
+        storage: StorageBackend = None,
+    ) -> None:
+        """
+        Args:
+            config (dict): The config.
+            fh (MonthlyFileHandler): The handler of the JSON reports.
+            pc (PlausibilityChecker): The validation.
+            statsgen (StatsGenerator): The statistics.
+            storage (StorageBackend, optional): The backend of the tracked days, the
+                JSON reports of fh (with their archives) if None or "json".
+        """
+        self.config = config
+        self.fh = fh
+        # Months of other backends (e.g. "sqlite") are read through the backend
+        self.storage = None if isinstance(storage, JsonStorageBackend) else storage
+        self.pc = pc
+        self.statsgen = statsgen
+        self.archive = ReportArchive(self.config, self.fh, self.pc, self.statsgen)
+        self.target_daily_work_minutes = self.config["work"][
+            "target_daily_work_minutes"
+        ]
+        # daily[i] is the balance of the day first_ordinal + i,
+        # prefix[i] the sum of all days before it
+        self.__first_ordinal: int = None
+        self.__daily = np.zeros(0, dtype=np.int64)
+        self.__prefix = np.zeros(1, dtype=np.int64)
+        # Day ordinals and balances contributed by every report and its file signature
+        self.__contributions = {}
+        self.__signatures = {}
+        self.__lock = threading.RLock()
+        # Reports written since their balances were read, kept apart from the lock
+        # above so a write (e.g. a tracking) never waits for a refresh
+        self.__stale_reports = set()
+        self.__stale_lock = threading.Lock()
+        self.invalid_reports: set[str] = set()
+        # The errors of every invalid report, each as {"day", "error"}
+        self.report_errors: dict[str, list] = {}
+        # Amount of prefix sums recomputed by the last change
+        self.last_recomputed_days = 0
+        if self.storage is None:
+            # The months of other backends are compared by their content on refresh
+            self.fh.write_listeners.append(self.update)
+
+    def __report_balances(
+        self, report_path: str, report: dict = None
+    ) -> Tuple[Tuple[np.ndarray, np.ndarray] | None, list]:
+        """Returns the day ordinals and balances of a report (None if it is invalid)
+        and its errors"""
+        try:
+            return self.__parse_report_balances(report_path, report)
+        except ValueError as e:
+            # e.g. a report that is no JSON or a day that can not be parsed
+            self.logger.exception(f"Failed reading report {report_path}")
+            return None, [{"day": None, "error": str(e)}]
+
+    def __parse_report_balances(
+        self, report_path: str, report: dict | None
+    ) -> Tuple[Tuple[np.ndarray, np.ndarray] | None, list]:
+        if report is None:
+            archive_path, errors = self.archive.archive_path(report_path)
+            if len(errors) > 0:
+                return None, errors
+            if archive_path is not None:
+                columns = load_archive_columns(archive_path)
+                return (
+                    columns["day"],
+                    self.statsgen.daily_balance_from_columns(
+                        columns, self.target_daily_work_minutes
+                    ),
+                ), []
+            report = self.fh.read_report(report_path)
+        # The open day (e.g. during a running break) is not finished yet
+        report = {day: data for day, data in report.items() if data["end"] != ""}
+        report_is_valid, errors, parsed_days = self.pc.parse_and_validate(
+            report, check_start_end=False
+        )
+        if not report_is_valid:
+            return None, errors
+        columns = self.statsgen.parsed_columns(parsed_days)
+        return (
+            columns["day"],
+            self.statsgen.daily_balance_from_columns(
+                columns, self.target_daily_work_minutes
+            ),
+        ), []
+
+    def __ensure_range(self, ordinals: np.ndarray) -> None:
+        if len(ordinals) == 0:
+            return
+        first, last = int(ordinals.min()), int(ordinals.max())
+        if self.__first_ordinal is None:
+            self.__first_ordinal = first
+        if first < self.__first_ordinal:
+            # Days before all others have no balance yet, so the prefix sums just move
+            days = self.__first_ordinal - first
+            self.__daily = np.concatenate([np.zeros(days, np.int64), self.__daily])
+            self.__prefix = np.concatenate([np.zeros(days, np.int64), self.__prefix])
+            self.__first_ordinal = first
+        days = last - self.__first_ordinal + 1 - len(self.__daily)
+        if days > 0:
+            self.__daily = np.concatenate([self.__daily, np.zeros(days, np.int64)])
+            self.__prefix = np.concatenate(
+                [self.__prefix, np.full(days, self.__prefix[-1], np.int64)]
+            )
+
+    def __apply(
+        self,
+        report_path: str,
+        balances: Tuple[np.ndarray, np.ndarray] | None,
+        errors: list = None,
+    ) -> None:
+        """Replaces the contribution of a report and recomputes the prefix sums
+        from its first changed day on"""
+        if errors:
+            self.logger.warning(
+                f"Ignoring invalid report {report_path} in the overtime"
+            )
+            self.invalid_reports.add(report_path)
+            self.report_errors[report_path] = errors
+        else:
+            self.invalid_reports.discard(report_path)
+            self.report_errors.pop(report_path, None)
+        empty = (np.zeros(0, np.int64), np.zeros(0, np.int64))
+        ordinals, day_balances = (
+            tuple(np.asarray(column, dtype=np.int64) for column in balances)
+            if balances is not None
+            else empty
+        )
+        old_ordinals, old_balances = self.__contributions.get(report_path, empty)
+        self.__contributions[report_path] = (ordinals, day_balances)
+        self.last_recomputed_days = 0
+        if len(ordinals) == 0 and len(old_ordinals) == 0:
+            return
+        self.__ensure_range(ordinals)
+
+        indices = ordinals - self.__first_ordinal
+        old_indices = old_ordinals - self.__first_ordinal
+        touched = np.union1d(old_indices, indices)
+        before = self.__daily[touched].copy()
+        np.subtract.at(self.__daily, old_indices, old_balances)
+        np.add.at(self.__daily, indices, day_balances)
+        changed = touched[self.__daily[touched] != before]
+        if len(changed) == 0:
+            return
+        first_changed = int(changed.min())
+        self.__prefix[first_changed + 1 :] = self.__prefix[first_changed] + np.cumsum(
+            self.__daily[first_changed:]
+        )
+        self.last_recomputed_days = len(self.__daily) - first_changed
+
+    def update(self, report_path: str, report: dict) -> None:
+        """Marks a report that was just written (see MonthlyFileHandler.write_listeners)
+        as stale in O(1). Its balances are read again on the next refresh, so a write
+        never validates the month or recomputes the prefix sums.
+
+        Args:
+            report_path (str): The path of the report.
+            report (dict): The written report.
+        """
+        with self.__stale_lock:
+            self.__stale_reports.add(report_path)
+
+    def __take_stale(self, report_path: str) -> bool:
+        with self.__stale_lock:
+            if report_path not in self.__stale_reports:
+                return False
+            self.__stale_reports.discard(report_path)
+            return True
+
+    def __reports(self) -> Iterator[Tuple[str, object, Callable[[], dict | None]]]:
+        """Yields every report (its path, or its filename with a storage backend),
+        its signature and how to read it (None to read the JSON or its archive)"""
+        if self.storage is None:
+            for report_path in self.fh.list_reports_paths():
+                yield report_path, self.fh.file_signature(report_path), lambda: None
+            return
+        for year, month in self.storage.months():
+            # Without files to stat, a month is compared by its content
+            report = self.storage.read_month(year, month)
+            yield self.fh.report_filename(year, month), hash(
+                json.dumps(report, sort_keys=True)
+            ), lambda: report
+
+    def refresh(self) -> None:
+        """Reads all reports that are written, new or changed (e.g. edited manually)
+        since the last refresh and drops removed ones. Queries do not refresh on their own.
+        """
+        with self.__lock:
+            reports_paths = set()
+            for report_path, signature, read in self.__reports():
+                reports_paths.add(report_path)
+                # The signature may not change on coarse file times (e.g. two writes in a second)
+                stale = self.__take_stale(report_path)
+                if not stale and self.__signatures.get(report_path) == signature:
+                    continue
+                self.__apply(report_path, *self.__report_balances(report_path, read()))
+                self.__signatures[report_path] = signature
+            for report_path in self.__signatures.keys() - reports_paths:
+                self.__apply(report_path, None)
+                del self.__signatures[report_path]
+                del self.__contributions[report_path]
+
+    def __prefix_at(self, ordinal: int) -> int:
+        """Sum of the balances of all days before the given one"""
+        if self.__first_ordinal is None:
+            return 0
+        index = min(max(ordinal - self.__first_ordinal, 0), len(self.__daily))
+        return int(self.__prefix[index])
+
+    def balance(self, first_day: date, last_day: date) -> int:
+        """Returns the overtime of a range of days in O(1)
+
+        Args:
+            first_day (date): The first day of the range.
+            last_day (date): The last day of the range (inclusive).
+
+        Returns:
+            int: The overtime in minutes (negative for undertime).
+        """
+        if last_day < first_day:
+            return 0
+        return self.__prefix_at(last_day.toordinal() + 1) - self.__prefix_at(
+            first_day.toordinal()
+        )
+
+    def total(self) -> int:
+        """Returns the overtime of all days"""
+        return int(self.__prefix[-1])
+
+    def period_start(self, day: date, period: str) -> date:
+        """Returns the first day of the week (Monday), month or year of a day"""
+        if period == "week":
+            return day - timedelta(days=day.weekday())
+        if period == "month":
+            return day.replace(day=1)
+        if period == "year":
+            return day.replace(month=1, day=1)
+        raise ValueError(
+            f'Unknown period "{period}", use one of {tuple(self.PERIOD_STEPS)}.'
+        )
+
+    def to_date(self, day: date, period: str) -> int:
+        """Returns the overtime from the start of the period (e.g. week-to-date) until the day"""
+        return self.balance(self.period_start(day, period), day)
+
+    def rollup(self, period: str) -> list[Tuple[date, int]]:
+        """Returns the overtime of every week, month or year from the first to the last tracked day
+
+        Args:
+            period (str): "week", "month" or "year".
+
+        Returns:
+            list[Tuple[date, int]]: The first day of every period and its overtime.
+        """
+        if self.__first_ordinal is None:
+            return []
+        first_day = date.fromordinal(self.__first_ordinal)
+        last_day = date.fromordinal(self.__first_ordinal + len(self.__daily) - 1)
+        starts = [self.period_start(first_day, period)]
+        while starts[-1] <= last_day:
+            next_day = starts[-1] + timedelta(days=self.PERIOD_STEPS[period])
+            starts.append(self.period_start(next_day, period))
+        bounds = np.clip(
+            np.array([start.toordinal() for start in starts]) - self.__first_ordinal,
+            0,
+            len(self.__daily),
+        )
+        balances = np.diff(self.__prefix[bounds])
+        return [(start, int(balance)) for start, balance in zip(starts, balances)]
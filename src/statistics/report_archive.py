@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+from glob import escape, glob
+from typing import Final, Tuple
+import numpy as np
+from report.filehandler import MonthlyFileHandler
+from statistics.stats_generator import StatsGenerator
+from util.datetimehandler import DateTimeHandler
+from validation.plausibility_checker import PlausibilityChecker
+
+# Fixed width columns of an archive (see StatsGenerator.report_columns)
+ARCHIVE_DTYPE: Final[np.dtype] = np.dtype(
+    [
+        ("day", np.int32),
+        ("start", np.int32),
+        ("end", np.int32),
+        ("break", np.int32),
+        ("default_break", np.int32),
+    ]
+)
+
+
+def load_archive_columns(archive_path: str) -> dict:
+    """Memory maps an archive and returns its columns for StatsGenerator
+
+    Args:
+        archive_path (str): The path of the archive.
+
+    Returns:
+        dict: The columns "day", "start", "end", "break" and "default_break" of the archive.
+    """
+    records = np.load(archive_path, mmap_mode="r")
+    return {name: records[name] for name in ARCHIVE_DTYPE.names}
+
+
+class ReportArchive:
+    """Keeps a compact binary copy of the columns of every closed month next to
+    its JSON. The JSON stays the source of truth: an archive is named after the
+    hash of the JSON it was created from (plus the archive format and the settings
+    of the validation and the default breaks) and regenerated as soon as any of
+    them changes."""
+
+    logger = logging.getLogger(__name__)
+    ARCHIVE_EXTENSION: Final[str] = ".npy"
+    # Increase whenever the columns of an archive change
+    VERSION: Final[int] = 2
+
+    def __init__(
+        self,
+        config: dict,
+        fh: MonthlyFileHandler,
+        pc: PlausibilityChecker,
+        statsgen: StatsGenerator,
+    ) -> None:
+        self.config = config
+        self.enabled = self.config["storage"]["archive_closed_months"]
+        self.fh = fh
+        self.pc = pc
+        self.statsgen = statsgen
+        self.dth = DateTimeHandler()
+        # Hash of every report by path, valid as long as its file signature is unchanged
+        self.__report_hashes = {}
+        self.__settings_hash = hashlib.sha256(
+            json.dumps(
+                {
+                    "version": self.VERSION,
+                    # Decides whether the month was valid when archived
+                    "allow_overnight_shifts": self.pc.allow_overnight_shifts,
+                    # Decide the default break column
+                    "default_break_rules": self.statsgen.default_break_rules,
+                },
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()[:8]
+
+    def is_closed(self, report_path: str) -> bool:
+        """Closed months are all months before the current one (that have no journal)"""
+        report_month = self.fh.report_month(report_path)
+        today = self.dth.today()
+        return (
+            report_month is not None
+            and report_month < (today.year, today.month)
+            and not os.path.exists(self.fh.journal_path(report_path))
+        )
+
+    def __report_hash(self, report_path: str) -> str:
+        signature = self.fh.file_signature(report_path)
+        cached = self.__report_hashes.get(report_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(report_path, "rb") as file:
+            report_hash = hashlib.sha256(file.read()).hexdigest()[:16]
+        self.__report_hashes[report_path] = (signature, report_hash)
+        return report_hash
+
+    def __archive_path_by_hash(self, report_path: str, report_hash: str) -> str:
+        # Archives of another format or other settings are never reused
+        return f"{os.path.splitext(report_path)[0]}.{report_hash}-{self.__settings_hash}{self.ARCHIVE_EXTENSION}"
+
+    def __remove_archives(self, report_path: str) -> None:
+        for archive_path in glob(
+            f"{escape(os.path.splitext(report_path)[0])}.*{self.ARCHIVE_EXTENSION}"
+        ):
+            os.remove(archive_path)
+
+    def archive_path(self, report_path: str) -> Tuple[str | None, list]:
+        """Returns the up to date archive of a closed month, (re)generating it if
+        the JSON changed since the archive was created.
+
+        Args:
+            report_path (str): The path of the report.
+
+        Returns:
+            Tuple[str | None, list]: The path of the archive (None if the month is
+                not closed or the report is invalid, use the JSON in that case) and
+                the errors of an invalid report, which was validated to archive
+                it, so callers do not have to validate it again.
+        """
+        if not self.enabled or not self.is_closed(report_path):
+            return None, []
+        archive_path = self.__archive_path_by_hash(
+            report_path, self.__report_hash(report_path)
+        )
+        if os.path.exists(archive_path):
+            return archive_path, []
+
+        self.__remove_archives(report_path)
+        report = self.fh.read_report(report_path)
+        report_is_valid, errors, parsed_days = self.pc.parse_and_validate(
+            report, check_start_end=False
+        )
+        if not report_is_valid:
+            return None, errors
+        self.logger.info(f"Archiving report {report_path} to {archive_path}")
+        columns = self.statsgen.parsed_columns(parsed_days)
+        columns["default_break"] = self.statsgen.default_break_column(columns)
+        records = np.empty(len(columns["day"]), dtype=ARCHIVE_DTYPE)
+        for name in ARCHIVE_DTYPE.names:
+            records[name] = columns[name]
+        tmp_archive_path = f"{archive_path}.tmp"
+        with open(tmp_archive_path, "wb") as file:
+            np.save(file, records)
+        os.replace(tmp_archive_path, archive_path)
+        return archive_path, []
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Final, Tuple
+from report.filehandler import MonthlyFileHandler
+from statistics.stats_generator import StatsGenerator
+from validation.plausibility_checker import PlausibilityChecker
+
+
+class ReportManifest:
+    """Index of all reports with a summary of every month, stored as
+    "pytimetrack.manifest" in the reports folder.
+
+    An entry is up to date as long as the file signature (mtime, size, inode) of
+    its report and journal is unchanged, so questions like "which months exist"
+    or "how much was worked in total" are answered without opening unchanged
+    reports. Entries are marked outdated on every write of the file handler and
+    rebuilt from the reports on the next read if they are outdated, stale, missing
+    or the manifest is broken.
+    """
+
+    logger = logging.getLogger(__name__)
+    MANIFEST_FILENAME: Final[str] = "pytimetrack.manifest"
+    VERSION: Final[int] = 1
+
+    def __init__(
+        self,
+        config: dict,
+        fh: MonthlyFileHandler,
+        pc: PlausibilityChecker,
+        statsgen: StatsGenerator,
+    ) -> None:
+        self.config = config
+        # Without persisting, the manifest only lives as long as the process
+        self.persist = self.config["storage"]["manifest"]
+        self.fh = fh
+        self.pc = pc
+        self.statsgen = statsgen
+        self.manifest_path = os.path.join(
+            self.fh.get_report_path(), self.MANIFEST_FILENAME
+        )
+        self.__entries: dict = None
+        self.__lock = threading.RLock()
+        # Reports written since their entry was summarized, kept apart from the lock
+        # above so a write (e.g. a tracking) never waits for a refresh
+        self.__written_filenames = set()
+        self.__written_lock = threading.Lock()
+        # Amount of reports read during the last refresh
+        self.last_summarized_reports = 0
+        self.fh.write_listeners.append(self.update)
+
+    def __load(self) -> dict:
+        if self.__entries is not None:
+            return self.__entries
+        self.__entries = {}
+        if self.persist and os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r") as file:
+                    manifest = json.load(file)
+                # Validity and totals of other settings are outdated
+                if (
+                    manifest.get("version") == self.VERSION
+                    and manifest.get("allow_overnight_shifts")
+                    == self.pc.allow_overnight_shifts
+                    and manifest.get("default_break_rules")
+                    == self.statsgen.default_break_rules
+                ):
+                    self.__entries = manifest["reports"]
+                else:
+                    self.logger.info(
+                        f"Rebuilding outdated manifest {self.manifest_path}"
+                    )
+            except (json.JSONDecodeError, KeyError, AttributeError):
+                self.logger.warning(f"Rebuilding broken manifest {self.manifest_path}")
+        return self.__entries
+
+    def __save(self) -> None:
+        if not self.persist:
+            return
+        tmp_manifest_path = f"{self.manifest_path}.tmp"
+        with open(tmp_manifest_path, "w") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "version": self.VERSION,
+                        "allow_overnight_shifts": self.pc.allow_overnight_shifts,
+                        "default_break_rules": self.statsgen.default_break_rules,
+                        "reports": self.__entries,
+                    },
+                    indent=2,
+                )
+            )
+        os.replace(tmp_manifest_path, self.manifest_path)
+
+    def __signature(self, report_path: str) -> list:
+        # As stored in JSON (lists instead of tuples) to be comparable
+        return json.loads(json.dumps(self.fh.file_signature(report_path)))
+
+    def __report_hash(self, report_path: str) -> str:
+        """Hash of the report and its journal (if any)"""
+        report_hash = hashlib.sha256()
+        for path in (report_path, self.fh.journal_path(report_path)):
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    report_hash.update(file.read())
+        return report_hash.hexdigest()[:16]
+
+    def __summarize(self, report_path: str, report: dict) -> dict:
+        try:
+            report_is_valid, errors, parsed_days = self.pc.parse_and_validate(
+                report, check_start_end=False
+            )
+        except ValueError as e:
+            report_is_valid, errors, parsed_days = (
+                False,
+                [{"day": None, "error": str(e)}],
+                [],
+            )
+        total_work_minutes, total_break_minutes, tracked_days = 0, 0, 0
+        if report_is_valid:
+            columns = self.statsgen.parsed_columns(parsed_days)
+            total_work_minutes, total_break_minutes = self.statsgen.totals_from_columns(
+                columns
+            )
+            tracked_days = len(columns["day"])
+        return {
+            "path": report_path,
+            "hash": self.__report_hash(report_path),
+            "signature": self.__signature(report_path),
+            "days": len(report),
+            "tracked_days": tracked_days,
+            "total_work_minutes": total_work_minutes,
+            "total_break_minutes": total_break_minutes,
+            "valid": report_is_valid,
+            "errors": errors,
+        }
+
+    def update(self, report_path: str, report: dict) -> None:
+        """Marks the entry of a report that was just written (see
+        MonthlyFileHandler.write_listeners) as outdated in O(1). It is summarized
+        again when the manifest is read next (see refresh), so a write never
+        summarizes the month or writes the manifest.
+
+        Args:
+            report_path (str): The path of the report.
+            report (dict): The written report.
+        """
+        with self.__written_lock:
+            self.__written_filenames.add(os.path.basename(report_path))
+
+    def __take_written(self, filename: str) -> bool:
+        with self.__written_lock:
+            if filename not in self.__written_filenames:
+                return False
+            self.__written_filenames.discard(filename)
+            return True
+
+    def __is_written(self, filename: str) -> bool:
+        with self.__written_lock:
+            return filename in self.__written_filenames
+
+    def __refresh_entry(self, report_path: str) -> Tuple[dict, bool]:
+        """Returns the up to date entry of a report and whether it changed"""
+        entries = self.__load()
+        filename = os.path.basename(report_path)
+        entry = entries.get(filename)
+        if self.__take_written(filename):
+            # The signature may not change on coarse file times (e.g. two writes in a second)
+            entry = None
+        signature = self.__signature(report_path)
+        if entry is not None and entry["signature"] == signature:
+            return entry, False
+        if entry is not None and entry["hash"] == self.__report_hash(report_path):
+            # Touched or compacted, but the content is the same
+            entry["signature"] = signature
+            return entry, True
+        self.logger.info(f"Summarizing report {report_path}")
+        entry = self.__summarize(report_path, self.fh.read_report(report_path))
+        entries[filename] = entry
+        self.last_summarized_reports += 1
+        return entry, True
+
+    def fresh_entry(self, report_path: str) -> dict | None:
+        """Returns the entry of a report only if it is up to date, without reading the report
+
+        Args:
+            report_path (str): The path of the report.
+
+        Returns:
+            dict | None: The entry or None if it is missing or stale.
+        """
+        with self.__lock:
+            filename = os.path.basename(report_path)
+            entry = self.__load().get(filename)
+            if (
+                entry is None
+                or self.__is_written(filename)
+                or entry["signature"] != self.__signature(report_path)
+            ):
+                return None
+            return entry
+
+    def refresh(self) -> list[dict]:
+        """Brings the manifest up to date with the reports folder, reading only
+        new and changed reports.
+
+        Returns:
+            list[dict]: The entries of all reports in chronological order, each with
+                "path", "hash", "signature", "days", "tracked_days", "total_work_minutes",
+                "total_break_minutes", "valid" and "errors".
+        """
+        with self.__lock:
+            self.last_summarized_reports = 0
+            entries = self.__load()
+            reports_paths = self.fh.sort_reports_paths(self.fh.list_reports_paths())
+            changed = False
+            for report_path in reports_paths:
+                changed |= self.__refresh_entry(report_path)[1]
+            filenames = {os.path.basename(path) for path in reports_paths}
+            for filename in entries.keys() - filenames:
+                del entries[filename]
+                changed = True
+            if changed or not os.path.exists(self.manifest_path):
+                self.__save()
+            return [entries[os.path.basename(path)] for path in reports_paths]
+
+    def totals(self) -> Tuple[int, int]:
+        """Returns the total work without breaks and the total breaks in minutes
+        of all valid reports"""
+        entries = [entry for entry in self.refresh() if entry["valid"]]
+        return (
+            sum(entry["total_work_minutes"] for entry in entries),
+            sum(entry["total_break_minutes"] for entry in entries),
+        )
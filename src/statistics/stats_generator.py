@@ -1,146 +1,458 @@
 import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Final, Tuple
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
+from model.month_report import NOT_TRACKED, MonthReport
+from model.parsed_day import ParsedDay
 from util.datetimehandler import DateTimeHandler
+from util.intervals import merged_break_minutes
+from util.metrics import metrics
 
 
 class StatsGenerator:
     logger = logging.getLogger(__name__)
+    ORDINAL_UNIX_EPOCH: Final[int] = date(1970, 1, 1).toordinal()
+    WEEKDAYS: Final[tuple] = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+    MAX_DAYS_PER_MONTH: Final[int] = 31
 
     def __init__(
         self,
         default_break_after_6h: int,
         default_break_after_9h: int,
+        default_break_rules: list[dict] = None,
+        cache_months: int = 24,
     ) -> None:
+        """
+        Args:
+            default_break_after_6h (int): Minutes of break after 6h of work.
+            default_break_after_9h (int): Additional minutes of break after 9h of work.
+            default_break_rules (list[dict], optional): Minimum breaks replacing the
+                two above if not empty, each with "after_minutes" of work, the
+                "break_minutes" and optionally the "weekdays" (e.g. ["sat", "sun"])
+                it applies to.
+            cache_months (int, optional): Amount of months whose parsed days are
+                cached (see storage.report_cache_size), 0 to deactivate. Defaults to 24.
+        """
         self.default_break_after_6h = default_break_after_6h
         self.default_break_after_9h = default_break_after_9h
+        if not default_break_rules:
+            default_break_rules = [
+                {"after_minutes": 360, "break_minutes": default_break_after_6h},
+                {
+                    "after_minutes": 540,
+                    "break_minutes": default_break_after_6h + default_break_after_9h,
+                },
+            ]
+        self.default_break_rules = default_break_rules
+        self.__break_thresholds, self.__break_table = self.__default_break_table(
+            default_break_rules
+        )
         self.dth = DateTimeHandler()
+        # Parsed rows per day (least recently used first) with its content, shared by
+        # the threads of the ExportPipeline
+        self.__day_cache = OrderedDict()
+        self.__day_cache_lock = threading.Lock()
+        self.day_cache_size = cache_months * self.MAX_DAYS_PER_MONTH
+        self.last_recomputed_days = 0
+
+    def __ordinals_to_datetime64(self, ordinals: np.ndarray) -> np.ndarray:
+        return (
+            (ordinals - self.ORDINAL_UNIX_EPOCH)
+            .astype("datetime64[D]")
+            .astype("datetime64[ns]")
+        )
+
+    def __default_break_table(self, rules: list[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the sorted thresholds of all rules and per weekday the minimum
+        break of work reaching none (first column) or up to each of the thresholds.
+        """
+        thresholds = np.unique(
+            np.array([rule["after_minutes"] for rule in rules], dtype=np.int64)
+        )
+        table = np.zeros((len(self.WEEKDAYS), len(thresholds) + 1), dtype=np.int64)
+        for rule in rules:
+            weekdays = rule.get("weekdays", self.WEEKDAYS)
+            unknown_weekdays = set(weekdays) - set(self.WEEKDAYS)
+            if len(unknown_weekdays) > 0:
+                raise ValueError(
+                    f"Unknown weekdays {sorted(unknown_weekdays)} of default break rule {rule}, use {list(self.WEEKDAYS)}"
+                )
+            if rule["after_minutes"] < 0 or rule["break_minutes"] < 0:
+                raise ValueError(f"Negative minutes in default break rule {rule}")
+            rows = [self.WEEKDAYS.index(weekday) for weekday in weekdays]
+            column = np.searchsorted(thresholds, rule["after_minutes"]) + 1
+            table[rows, column] = np.maximum(table[rows, column], rule["break_minutes"])
+        # More work never requires less break
+        table = np.maximum.accumulate(table, axis=1)
+        if np.all(table == table[0]):
+            # The same rules every weekday
+            table = table[:1]
+        return thresholds.astype(np.float64), table
+
+    def clear_cache(self) -> None:
+        """Drops all cached per-day rows"""
+        with self.__day_cache_lock:
+            self.__day_cache.clear()
 
-    def __apply_calc_default_breaks(self, row) -> int:
-        """Calculates the default breaks for the time worked
+    def __row(self, parsed_day: ParsedDay) -> Tuple[int, int, int, tuple] | None:
+        """Returns the values of a parsed day needed for the statistics.
 
         Args:
-            row: A row of the DataFrame
+            parsed_day (ParsedDay): The parsed day.
 
         Returns:
-            int: The amount of default breaks in minutes
+            Tuple[int, int, int, tuple] | None: The date ordinal, start, end and the
+                breaks of the day or None if the day can not be parsed.
         """
-        default_break = 0
-        if row["total_work_minutes"] >= 360 and row["total_work_minutes"] < 540:
-            default_break += self.default_break_after_6h
-        if row["total_work_minutes"] >= 540:
-            default_break += self.default_break_after_6h + self.default_break_after_9h
-        return default_break
+        if parsed_day.start is None or parsed_day.end is None:
+            self.logger.info(f"Skipping day {parsed_day.day}: {parsed_day}")
+            return None
+        if (len(parsed_day.breaks) % 2) != 0:
+            err_msg = "There was an uneven number of breaks, meaning a break was started but not ended. Can not create statistics."
+            self.logger.warning(err_msg)
+            raise AssertionError(err_msg)
+        if parsed_day.ordinal is None or None in parsed_day.breaks:
+            self.logger.info(f"Skipping day {parsed_day.day}: {parsed_day}")
+            return None
+        return parsed_day.ordinal, parsed_day.start, parsed_day.end, parsed_day.breaks
+
+    def __rows_to_columns(self, rows: list) -> dict:
+        days = []
+        starts = []
+        ends = []
+        break_owners = []
+        break_bounds = []
+        for day_ordinal, start, end, day_breaks in rows:
+            # Every pair of break values (start and stop of break) belongs to this day
+            break_owners.extend([len(days)] * (len(day_breaks) // 2))
+            break_bounds.extend(day_breaks)
+            days.append(day_ordinal)
+            starts.append(start)
+            ends.append(end)
+
+        bounds = np.array(break_bounds, dtype=np.int64).reshape(-1, 2)
+        starts = np.array(starts, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        return {
+            "day": np.array(days, dtype=np.int64),
+            "start": starts,
+            "end": ends,
+            "break": merged_break_minutes(
+                np.array(break_owners, dtype=np.intp),
+                bounds[:, 0],
+                bounds[:, 1],
+                starts,
+                ends,
+            ),
+        }
+
+    def report_columns(self, report: dict | MonthReport) -> dict:
+        """Flattens a report in one pass into columns of integer minutes of the day.
+        Days that can not be parsed (e.g. not finished yet) are skipped.
+        Parsed days are cached by their content, so only new or changed days
+        are parsed again (see last_recomputed_days).
+
+        Args:
+            report (dict | MonthReport): The report to use.
+
+        Returns:
+            dict: The columns "day" (date ordinals), "start", "end" and "break"
+                (all breaks within start and end, overlaps counted once) in minutes
+                as numpy arrays.
+        """
+        with metrics.timer("report_columns"):
+            if isinstance(report, MonthReport):
+                return self.__month_report_columns(report)
+            return self.__report_columns(report)
+
+    def __report_columns(self, report: dict) -> dict:
+        rows = []
+        recomputed_days = 0
+        for day, data in report.items():
+            content = (data["start"], data["end"], tuple(data["breaks"]))
+            cached, row = self.__cached_day(day, content)
+            if not cached:
+                row = self.__row(ParsedDay.parse(day, data, self.dth))
+                self.__cache_day(day, content, row)
+                recomputed_days += 1
+            if row is not None:
+                rows.append(row)
+        self.last_recomputed_days = recomputed_days
+        self.logger.debug(
+            f"Recomputed {recomputed_days} of {len(report)} days, the others were cached"
+        )
+        return self.__rows_to_columns(rows)
+
+    def __cached_day(
+        self, day: str, content: tuple
+    ) -> Tuple[bool, Tuple[int, int, int, tuple] | None]:
+        """Returns whether the row of a day with the same content is cached and the row"""
+        with self.__day_cache_lock:
+            cached = self.__day_cache.get(day)
+            if cached is None or cached[0] != content:
+                return False, None
+            self.__day_cache.move_to_end(day)
+            return True, cached[1]
+
+    def __cache_day(
+        self, day: str, content: tuple, row: Tuple[int, int, int, tuple] | None
+    ) -> None:
+        if self.day_cache_size <= 0:
+            return
+        with self.__day_cache_lock:
+            self.__day_cache[day] = (content, row)
+            self.__day_cache.move_to_end(day)
+            while len(self.__day_cache) > self.day_cache_size:
+                self.__day_cache.popitem(last=False)
+
+    def __month_report_columns(self, report: MonthReport) -> dict:
+        """Creates the columns directly from the arrays of a MonthReport"""
+        ordinals = np.asarray(report.ordinals, dtype=np.int64)
+        starts = np.asarray(report.starts, dtype=np.int64)
+        ends = np.asarray(report.ends, dtype=np.int64)
+        offsets = np.asarray(report.break_offsets, dtype=np.int64)
+        breaks = np.asarray(report.breaks, dtype=np.int64)
+
+        break_counts = np.diff(offsets)
+        tracked = (starts != NOT_TRACKED) & (ends != NOT_TRACKED)
+        if np.any(break_counts[tracked] % 2 != 0):
+            err_msg = "There was an uneven number of breaks, meaning a break was started but not ended. Can not create statistics."
+            self.logger.warning(err_msg)
+            raise AssertionError(err_msg)
+        # Breaks of tracked days only, so (start, end) pairs can not span two days
+        break_owners = np.repeat(np.arange(len(ordinals)), break_counts)
+        tracked_breaks = tracked[break_owners]
+        bounds = breaks[tracked_breaks].reshape(-1, 2)
+        break_minutes = merged_break_minutes(
+            break_owners[tracked_breaks][::2], bounds[:, 0], bounds[:, 1], starts, ends
+        )
+
+        # Days that are not stored as integers are parsed
+        raw_rows = []
+        raw_positions = []
+        for position, (day, data) in report.raw_days.items():
+            row = self.__row(ParsedDay.parse(day, data, self.dth))
+            if row is not None:
+                raw_rows.append(row)
+                raw_positions.append(position)
+        raw_columns = self.__rows_to_columns(raw_rows)
+
+        # Keep the order of the report
+        positions = np.concatenate(
+            [
+                np.asarray(report.positions, dtype=np.int64)[tracked],
+                np.array(raw_positions, dtype=np.int64),
+            ]
+        )
+        order = np.argsort(positions, kind="stable")
+        return {
+            "day": np.concatenate([ordinals[tracked], raw_columns["day"]])[order],
+            "start": np.concatenate([starts[tracked], raw_columns["start"]])[order],
+            "end": np.concatenate([ends[tracked], raw_columns["end"]])[order],
+            "break": np.concatenate([break_minutes[tracked], raw_columns["break"]])[
+                order
+            ],
+        }
 
-    def __apply_default_breaks(self, row):
-        """Applies the default breaks on the col total_break_minutes if necessary
+    def parsed_columns(self, parsed_days: list[ParsedDay]) -> dict:
+        """Flattens days parsed during the validation (see
+        PlausibilityChecker.parse_and_validate) into columns without parsing them again.
+        The per-day cache of report_columns is not used: it only saves the parsing,
+        which the validation already did once for every day.
 
         Args:
-            row: A row of the DataFrame
+            parsed_days (list[ParsedDay]): The parsed days of a report.
 
         Returns:
-            int: The adapted break minutes
+            dict: The columns like report_columns.
         """
-        if row["total_break_minutes"] < row["default_break_minutes"]:
-            return row["default_break_minutes"]
+        with metrics.timer("parsed_columns"):
+            rows = [self.__row(parsed_day) for parsed_day in parsed_days]
+            return self.__rows_to_columns([row for row in rows if row is not None])
+
+    def __daily_minutes(
+        self, columns: dict
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the total work, total break and default break minutes of every day"""
+        # Times are minutes of the day, so a negative difference wraps around midnight
+        total_work_minutes = (
+            (columns["end"] - columns["start"]) % self.dth.MINUTES_PER_DAY
+        ).astype(np.float64)
+        if "default_break" in columns:
+            # Computed before (e.g. stored in an archive, see ReportArchive)
+            default_break_minutes = np.asarray(columns["default_break"], np.int64)
         else:
-            return row["total_break_minutes"]
+            default_break_minutes = self.__default_break_minutes(
+                columns["day"], total_work_minutes
+            )
+        # Adapt the total_breaks if they are not high enough
+        total_break_minutes = np.maximum(
+            columns["break"].astype(np.float64), default_break_minutes
+        )
+        return total_work_minutes, total_break_minutes, default_break_minutes
+
+    def __default_break_minutes(
+        self, ordinals: np.ndarray, total_work_minutes: np.ndarray
+    ) -> np.ndarray:
+        """Returns the default break (e.g. given by working time laws) of the highest
+        threshold reached, date ordinal 1 (01.01.0001) was a monday"""
+        reached_thresholds = np.searchsorted(
+            self.__break_thresholds, total_work_minutes, side="right"
+        )
+        if len(self.__break_table) == 1:
+            return self.__break_table[0][reached_thresholds]
+        weekdays = (ordinals - 1) % len(self.WEEKDAYS)
+        return self.__break_table[weekdays, reached_thresholds]
+
+    def default_break_column(self, columns: dict) -> np.ndarray:
+        """Returns the default break of every day of the columns of a report (see
+        report_columns), e.g. to store it as column "default_break"
+
+        Args:
+            columns (dict): The columns of the report.
+
+        Returns:
+            np.ndarray: The default break minutes per day.
+        """
+        return self.__daily_minutes(columns)[2]
+
+    def totals_from_columns(self, columns: dict) -> Tuple[int, int]:
+        """Sums up the work and breaks of the columns of a report (see report_columns)
+        without creating a DataFrame.
+
+        Args:
+            columns (dict): The columns of the report.
+
+        Returns:
+            Tuple[int, int]: The total work without breaks and the total breaks in minutes.
+        """
+        total_work_minutes, total_break_minutes, _ = self.__daily_minutes(columns)
+        return (
+            int((total_work_minutes - total_break_minutes).sum()),
+            int(total_break_minutes.sum()),
+        )
+
+    def daily_balance_from_columns(
+        self, columns: dict, target_daily_work_minutes: int
+    ) -> np.ndarray:
+        """Calculates the overtime (or undertime if negative) of every day of the
+        columns of a report (see report_columns).
+
+        Args:
+            columns (dict): The columns of the report.
+            target_daily_work_minutes (int): The amount of minutes of daily target work
+
+        Returns:
+            np.ndarray: The work without breaks minus the target work in minutes per day.
+        """
+        total_work_minutes, total_break_minutes, _ = self.__daily_minutes(columns)
+        return (total_work_minutes - total_break_minutes).astype(
+            np.int64
+        ) - target_daily_work_minutes
+
+    def daily_worked_minutes_from_columns(
+        self,
+        columns: dict,
+        target_daily_work_minutes: int,
+    ) -> DataFrame:
+        """Calculates the daily worked minutes from the columns of a report
+        (see report_columns) using vectorized operations.
+
+        Args:
+            columns (dict): The columns of the report.
+            target_daily_work_minutes (int): The amount of minutes of daily target work
+
+        Returns:
+            pandas.DataFrame: Daily worked hours with subtracted breaks.
+        """
+        with metrics.timer("daily_worked_minutes"):
+            total_work_minutes, total_break_minutes, default_break_minutes = (
+                self.__daily_minutes(columns)
+            )
+            df_result = pd.DataFrame(
+                {
+                    "day": self.__ordinals_to_datetime64(columns["day"]),
+                    "total_work_minutes": total_work_minutes,
+                    "total_break_minutes": total_break_minutes,
+                    "default_break_minutes": default_break_minutes,
+                    # Calculate the pure working time
+                    "total_work_without_break": total_work_minutes
+                    - total_break_minutes,
+                }
+            )
+
+            # Include the target working hours from config
+            df_result["target_work_minutes"] = target_daily_work_minutes
+
+        return df_result
 
     def daily_worked_minutes(
         self,
-        report: dict,
+        report: dict | MonthReport,
         target_daily_work_minutes: int,
     ) -> DataFrame:
         """Calculates the daily worked minutes by subtracting
         the breaks based on the data in the given report.
 
         Args:
-            report (dict): The report to use.
+            report (dict | MonthReport): The report to use.
             target_daily_work_minutes (int): The amount of minutes of daily target work
 
         Returns:
             pandas.DataFrame: Daily worked hours with subtracted breaks.
         """
-        row_days = []
-        row_work_times = []
-        row_break_times = []
-        for day in report.keys():
-            try:
-                dt_start = self.dth.datetime_str_to_datetime(
-                    f"{day} {report[day]['start']}"
-                )
-                dt_end = self.dth.datetime_str_to_datetime(
-                    f"{day} {report[day]['end']}"
-                )
-                total_work_time = self.dth.datetime_diff_in_minutes(dt_start, dt_end)
-                row_work_times.append(total_work_time)
-                total_break_time = 0.0
-                breaks = report[day]["breaks"]
-                if (len(breaks) % 2) != 0:
-                    err_msg = "There was an uneven number of breaks, meaning a break was started but not ended. Can not create statistics."
-                    self.logger.warn(err_msg)
-                    raise AssertionError(err_msg)
-                # Split into chunks of two values (start and stop of break)
-                for i in range(0, len(breaks), 2):
-                    breaks_chunk = breaks[i : i + 2]
-                    dt_break_start = self.dth.datetime_str_to_datetime(
-                        f"{day} {breaks_chunk[0]}"
-                    )
-                    dt_break_end = self.dth.datetime_str_to_datetime(
-                        f"{day} {breaks_chunk[1]}"
-                    )
-                    break_time = self.dth.datetime_diff_in_minutes(
-                        dt_break_start, dt_break_end
-                    )
-                    total_break_time += break_time
-                row_break_times.append(total_break_time)
-                row_days.append(self.dth.date_str_to_datetime(day))
-            except ValueError:
-                self.logger.info(f"Skipping day {day}: {report[day]}")
-
-        df_result = pd.DataFrame(
-            {
-                "day": row_days,
-                "total_work_minutes": row_work_times,
-                "total_break_minutes": row_break_times,
-            }
-        )
-        # Include default breaks (e.g. given by working time laws)
-        df_result["default_break_minutes"] = df_result.apply(
-            self.__apply_calc_default_breaks, axis=1
-        )
-        # Adapt the total_breaks if they are not high enough
-        df_result["total_break_minutes"] = df_result.apply(
-            self.__apply_default_breaks, axis=1
+        return self.daily_worked_minutes_from_columns(
+            self.report_columns(report), target_daily_work_minutes
         )
 
-        # Calculate the pure working time
-        df_result["total_work_without_break"] = (
-            df_result["total_work_minutes"] - df_result["total_break_minutes"]
-        )
+    def stats_export(
+        self,
+        report: dict | MonthReport,
+        target_daily_work_minutes: int,
+    ) -> DataFrame:
+        """Calculates the statistics export.
 
-        # Include the target working hours from config
-        df_result["target_work_minutes"] = target_daily_work_minutes
+        Args:
+            report (dict | MonthReport): The report to use.
+            target_daily_work_minutes (int): The amount of minutes of daily target work
 
-        return df_result
+        Returns:
+            pandas.DataFrame: Statistics export.
+        """
+        return self.stats_export_from_columns(
+            self.report_columns(report), target_daily_work_minutes
+        )
 
-    def stats_export(
+    def stats_export_from_columns(
         self,
-        report: dict,
+        columns: dict,
         target_daily_work_minutes: int,
     ) -> DataFrame:
-        """Calculates the statistics export.
+        """Calculates the statistics export from the columns of a report
+        (see report_columns).
 
         Args:
-            report (dict): The report to use.
+            columns (dict): The columns of the report.
             target_daily_work_minutes (int): The amount of minutes of daily target work
 
         Returns:
             pandas.DataFrame: Statistics export.
         """
         self.logger.info("Creating stats export")
-        df_daily_worked_minutes = self.daily_worked_minutes(
-            report, target_daily_work_minutes
+        with metrics.timer("stats_export"):
+            return self.__stats_export_from_columns(columns, target_daily_work_minutes)
+
+    def __stats_export_from_columns(
+        self,
+        columns: dict,
+        target_daily_work_minutes: int,
+    ) -> DataFrame:
+        df_daily_worked_minutes = self.daily_worked_minutes_from_columns(
+            columns, target_daily_work_minutes
         )
         df_stats_export = df_daily_worked_minutes.copy(deep=True)
 
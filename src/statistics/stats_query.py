@@ -0,0 +1,96 @@
+import logging
+from datetime import date
+from typing import Final
+import pandas as pd
+from pandas import DataFrame
+from report.storage_backend import StorageBackend
+from statistics.stats_generator import StatsGenerator
+from util.metrics import metrics
+from validation.plausibility_checker import PlausibilityChecker
+
+
+class StatsQuery:
+    """Daily statistics of a date range (e.g. one week of a ten year archive).
+
+    Only the days of the range are read from the storage backend: the JSON
+    backend derives the reports covering the range from the "{month}_{year}.json"
+    naming scheme, the SQLite backend queries its date index. Like the statistics
+    export, the days are validated first and a range with invalid days has no
+    statistics.
+    """
+
+    logger = logging.getLogger(__name__)
+    COLUMNS: Final[tuple] = (
+        "day",
+        "total_work_minutes",
+        "total_break_minutes",
+        "default_break_minutes",
+        "total_work_without_break",
+        "target_work_minutes",
+        "overtime_minutes",
+    )
+
+    def __init__(
+        self,
+        config: dict,
+        storage: StorageBackend,
+        pc: PlausibilityChecker,
+        statsgen: StatsGenerator,
+    ) -> None:
+        self.config = config
+        self.storage = storage
+        self.pc = pc
+        self.statsgen = statsgen
+
+    def __empty_stats(self) -> DataFrame:
+        return pd.DataFrame(
+            {
+                column: pd.Series(
+                    dtype="datetime64[ns]" if column == "day" else "float64"
+                )
+                for column in self.COLUMNS
+            }
+        )
+
+    def daily_stats(
+        self, first_day: date, last_day: date, errors: list = None
+    ) -> DataFrame:
+        """Calculates the daily worked minutes of every finished tracked day of the range
+
+        Args:
+            first_day (date): The first day of the range.
+            last_day (date): The last day of the range (inclusive).
+            errors (list, optional): Collects the errors of invalid days, each as
+                {"day", "error"}.
+
+        Returns:
+            DataFrame: The COLUMNS, one row per tracked day (none if a day is invalid).
+        """
+        if first_day > last_day:
+            raise ValueError(
+                f"The range starts ({first_day}) after it ends ({last_day})"
+            )
+        with metrics.timer("stats_query"):
+            # The open day (e.g. during a running break) is not finished yet
+            report = {
+                day: data
+                for day, data in self.storage.days_in_range(first_day, last_day)
+                if data["end"] != ""
+            }
+            self.logger.info(f"Read {len(report)} day(s) for {first_day} to {last_day}")
+            if len(report) == 0:
+                return self.__empty_stats()
+            report_is_valid, report_errors, _ = self.pc.parse_and_validate(
+                report, check_start_end=False
+            )
+            if not report_is_valid:
+                if errors is not None:
+                    errors.extend(report_errors)
+                return self.__empty_stats()
+            df_stats = self.statsgen.daily_worked_minutes(
+                report, self.config["work"]["target_daily_work_minutes"]
+            )
+            df_stats["overtime_minutes"] = (
+                df_stats["total_work_without_break"] - df_stats["target_work_minutes"]
+            )
+            return df_stats[list(self.COLUMNS)]
@@ -1,12 +1,26 @@
+import hashlib
+import json
+import logging
+import os
+import threading
 from typing import Final
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+import pandas as pd
 import seaborn as sns
+from matplotlib.figure import Figure
 from pandas import DataFrame
 from util.datetimehandler import DateTimeHandler
+from util.metrics import metrics
+
+# The seaborn theme is global, so it is set once per process
+_theme_lock = threading.Lock()
+_theme_applied = False
 
 
 class StatsVisualization:
+    logger = logging.getLogger(__name__)
+    IMAGE_FORMATS: Final[tuple] = ("png", "svg")
     STYLE_PALETTE: Final[str] = "pastel"
     # Values can be checked in sns.axes_style()
     STYLE_THEME: Final[dict] = {
@@ -20,13 +34,122 @@ class StatsVisualization:
         "figure.facecolor": "#022f40",
     }
 
-    def __init__(self) -> None:
+    def __init__(
+        self, headless: bool = False, cache_dir: str = None, cache_size: int = 32
+    ) -> None:
+        """
+        Args:
+            headless (bool, optional): Render charts into image files (Agg backend)
+                instead of showing them in a window. Defaults to False.
+            cache_dir (str, optional): Folder of the rendered images (see
+                render_daily_worked_minutes). Defaults to None.
+            cache_size (int, optional): Amount of rendered images kept. Defaults to 32.
+        """
         self.dth = DateTimeHandler()
-        # Seaborn style
-        sns.set_theme(
-            style="whitegrid",
-            rc=self.STYLE_THEME,
+        self.headless = headless
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        if self.headless:
+            plt.switch_backend("Agg")
+        self.__apply_theme()
+
+    def __apply_theme(self) -> None:
+        global _theme_applied
+        with _theme_lock:
+            if _theme_applied:
+                return
+            # Seaborn style
+            sns.set_theme(
+                style="whitegrid",
+                rc=self.STYLE_THEME,
+            )
+            _theme_applied = True
+
+    def __theme_key(self) -> str:
+        return json.dumps(
+            {"palette": self.STYLE_PALETTE, "theme": self.STYLE_THEME}, sort_keys=True
+        )
+
+    def image_key(self, title: str, stats: DataFrame, image_format: str) -> str:
+        """Identifies a rendered chart by the content of the statistics, the theme
+        and everything else that changes the image (e.g. the shown month).
+
+        Returns:
+            str: A hash usable as filename.
+        """
+        image_hash = hashlib.sha256()
+        image_hash.update(
+            pd.util.hash_pandas_object(stats, index=True).values.tobytes()
+        )
+        image_hash.update(
+            json.dumps(
+                [
+                    title,
+                    image_format,
+                    list(stats.columns),
+                    self.__theme_key(),
+                    self.dth.last_day_of_previous_month().strftime(
+                        self.dth.DATE_FORMAT
+                    ),
+                ]
+            ).encode("utf-8")
+        )
+        return image_hash.hexdigest()[:32]
+
+    def render_daily_worked_minutes(
+        self, title: str, stats: DataFrame, image_format: str = "png"
+    ) -> str:
+        """Renders the chart of bar_daily_worked_minutes into an image file without
+        showing it. Unchanged statistics return the already rendered image.
+
+        Args:
+            title (str): The title of the chart.
+            stats (DataFrame): Statistics holding information about daily worked minutes and breaks.
+            image_format (str, optional): "png" or "svg". Defaults to "png".
+
+        Returns:
+            str: The path of the image.
+        """
+        if image_format not in self.IMAGE_FORMATS:
+            raise ValueError(
+                f'Unknown image format "{image_format}", use one of {self.IMAGE_FORMATS}.'
+            )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        image_path = os.path.join(
+            self.cache_dir,
+            f"{self.image_key(title, stats, image_format)}.{image_format}",
         )
+        if os.path.exists(image_path):
+            self.logger.info(f"Using cached chart {image_path}")
+            metrics.count("render_cache_hits")
+            # Keeps recently shown images in the cache (see __prune_cache)
+            os.utime(image_path)
+            return image_path
+
+        with metrics.timer("render"):
+            fig = self.__plot_daily_worked_minutes(title, stats)
+            tmp_image_path = f"{image_path}.tmp"
+            try:
+                fig.savefig(tmp_image_path, format=image_format)
+            finally:
+                plt.close(fig)
+        os.replace(tmp_image_path, image_path)
+        self.logger.info(f"Rendered chart {image_path}")
+        self.__prune_cache()
+        return image_path
+
+    def __prune_cache(self) -> None:
+        """Removes the least recently used images beyond cache_size"""
+        image_paths = sorted(
+            (
+                os.path.join(self.cache_dir, filename)
+                for filename in os.listdir(self.cache_dir)
+                if filename.endswith(self.IMAGE_FORMATS)
+            ),
+            key=os.path.getmtime,
+        )
+        for image_path in image_paths[: -self.cache_size]:
+            os.remove(image_path)
 
     def bar_daily_worked_minutes(self, title: str, stats: DataFrame):
         """Creates a bar chart showing the daily worked minutes, breaks and the daily target line.
@@ -34,7 +157,10 @@ class StatsVisualization:
         Args:
             stats (DataFrame): Statistics holding information about daily worked minutes and breaks.
         """
+        self.__plot_daily_worked_minutes(title, stats)
+        plt.show()
 
+    def __plot_daily_worked_minutes(self, title: str, stats: DataFrame) -> Figure:
         fig, ax = plt.subplots(num="PyTimeTrack")
 
         # Transform data from wide to long format for visualization
@@ -73,7 +199,7 @@ class StatsVisualization:
         ax.xaxis.set_major_formatter(xfmt)
         ax.set_xlabel("day")
         ax.set_ylabel("minutes")
-        plt.grid()
+        ax.grid()
 
         sns.lineplot(
             data=df_stats_vis,
@@ -86,5 +212,4 @@ class StatsVisualization:
             dashes=True,
             palette=self.STYLE_PALETTE,
         )
-
-        plt.show()
+        return fig
@@ -1,5 +1,7 @@
 import logging
 from typing import Final, Tuple
+from model.month_report import MonthReport
+from model.today_state import TodayState
 from util.datetimehandler import DateTimeHandler
 
 
@@ -10,17 +12,27 @@ class TimeTracker:
     KEY_WORKBREAKS: Final[str] = "breaks"
     KEY_COMMENT: Final[str] = "comment"
 
-    def __init__(self) -> None:
+    def __init__(self, today_state: TodayState = None) -> None:
         self.dth = DateTimeHandler()
-
-    def track(self, report: dict) -> Tuple[dict, str]:
+        # Optionally kept up to date with every tracking of today
+        self.today_state = today_state
+
+    def __sync_today_state(self, today_str: str, today_data: dict) -> None:
+        # Only read again if the report was changed elsewhere (e.g. manual edits)
+        if self.today_state is not None and not self.today_state.is_synced(
+            today_str, today_data
+        ):
+            self.logger.debug(f"Resetting state of {today_str}")
+            self.today_state.reset(today_str, today_data)
+
+    def track(self, report: dict | MonthReport) -> Tuple[dict | MonthReport, str]:
         """Tracks start or stop of working
 
         Args:
-            report (dict): The report to use
+            report (dict | MonthReport): The report to use
 
         Returns:
-            Tuple[dict, str]: The updated report and a message what was updated
+            Tuple[dict | MonthReport, str]: The updated report and a message what was updated
         """
         today_str = self.dth.today_str()
         today_time_track = {
@@ -32,56 +44,69 @@ class TimeTracker:
 
         result_msg = ""
 
-        if not (today_str in report.keys()):
+        if today_str not in report:
             # Create empty time track
             self.logger.info("Creating empty time track")
             report[today_str] = today_time_track
 
-        if report[today_str]:
+        # A MonthReport returns a copy of the day, so it is assigned again below
+        today_data = report[today_str]
+        self.__sync_today_state(today_str, today_data)
+        if today_data:
             # There was no start time yet
-            if report[today_str][self.KEY_START] == "":
+            if today_data[self.KEY_START] == "":
                 start_time = self.dth.now_time_str()
                 result_msg = f"Tracked work start time: {start_time}"
                 self.logger.info(result_msg)
-                report[today_str][self.KEY_START] = start_time
+                today_data[self.KEY_START] = start_time
+                if self.today_state is not None:
+                    self.today_state.track_start(start_time)
 
             # There was no end time yet
-            elif report[today_str][self.KEY_START] != "":
+            elif today_data[self.KEY_START] != "":
                 end_time = self.dth.now_time_str()
                 result_msg = f"Tracked work end time: {end_time}"
                 self.logger.info(result_msg)
-                report[today_str][self.KEY_END] = end_time
+                today_data[self.KEY_END] = end_time
+                if self.today_state is not None:
+                    self.today_state.track_end(end_time)
+            report[today_str] = today_data
 
         return (report, result_msg)
 
-    def work_break(self, report: dict) -> Tuple[dict, str]:
+    def work_break(self, report: dict | MonthReport) -> Tuple[dict | MonthReport, str]:
         """Tracks start or stop of a working break
 
         Args:
-            report (dict): The report to use
+            report (dict | MonthReport): The report to use
 
         Returns:
-            Tuple[dict, str]: The updated report and a message what was updated
+            Tuple[dict | MonthReport, str]: The updated report and a message what was updated
         """
         today_str = self.dth.today_str()
         break_time = self.dth.now_time_str()
-        report[today_str][self.KEY_WORKBREAKS].append(break_time)
+        today_data = report[today_str]
+        self.__sync_today_state(today_str, today_data)
+        today_data[self.KEY_WORKBREAKS].append(break_time)
+        if self.today_state is not None:
+            self.today_state.track_break(break_time)
+        report[today_str] = today_data
         result_msg = f"Tracked break start time: {break_time}"
-        if len(report[today_str][self.KEY_WORKBREAKS]) % 2 == 0:
+        if len(today_data[self.KEY_WORKBREAKS]) % 2 == 0:
             result_msg = f"Tracked break end time: {break_time}"
         self.logger.info(result_msg)
         return (report, result_msg)
 
-    def get_today(self, report: dict) -> Tuple[str, dict]:
+    def get_today(self, report: dict | MonthReport) -> Tuple[str, dict]:
         """Returns the data of today
 
         Args:
-            report (dict): The report to extract the data of today from
+            report (dict | MonthReport): The report to extract the data of today from
 
         Returns:
             Tuple[str, dict]: Tuple of the day and the data
         """
         today_str = self.dth.today_str()
-        if today_str in report.keys():
+        if today_str in report:
             return today_str, report[today_str]
         return today_str, None
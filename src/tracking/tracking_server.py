@@ -0,0 +1,272 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import re
+from typing import Final, Tuple
+from urllib.parse import urlsplit
+from report.filehandler import MonthlyFileHandler
+from statistics.stats_generator import StatsGenerator
+from tracking.tracker import TimeTracker
+from util.metrics import metrics
+from validation.plausibility_checker import PlausibilityChecker
+
+
+class UserState:
+    """In-memory state of the current month of a single user"""
+
+    __slots__ = ("fh", "report_path", "report")
+
+    def __init__(self, fh: MonthlyFileHandler) -> None:
+        self.fh = fh
+        self.report_path = fh.report_path_by_filename(fh.current_report_filename())
+        # Compact, as the reports of all users stay in memory
+        self.report = fh.read_report(self.report_path, as_month_report=True)
+
+
+class TrackingServer:
+    """Small JSON API around TimeTracker and StatsGenerator for multiple users.
+
+    Reports of every user are kept in memory (as MonthReport) and stored in "{reports}/{user}"
+    by a MonthlyFileHandler. Changed reports are written in batches every
+    flush_interval_seconds instead of on every click.
+    """
+
+    logger = logging.getLogger(__name__)
+    ROUTE_PATTERN: Final[re.Pattern] = re.compile(
+        r"^/users/(?P<user>[A-Za-z0-9_-]{1,64})/(?P<action>track|break|today|stats)$"
+    )
+    STATUS_REASONS: Final[dict] = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        405: "Method Not Allowed",
+        409: "Conflict",
+        422: "Unprocessable Entity",
+        500: "Internal Server Error",
+    }
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+        self.host = self.config["server"]["host"]
+        self.port = self.config["server"]["port"]
+        self.flush_interval_seconds = self.config["server"]["flush_interval_seconds"]
+        self.tt = TimeTracker()
+        self.pc = PlausibilityChecker(
+            allow_overnight_shifts=self.config["work"]["allow_overnight_shifts"]
+        )
+        self.statsgen = StatsGenerator(
+            default_break_after_6h=self.config["work"]["default_break_after_6h"],
+            default_break_after_9h=self.config["work"]["default_break_after_9h"],
+            default_break_rules=self.config["work"]["default_break_rules"],
+            cache_months=self.config["storage"]["report_cache_size"],
+        )
+        self.__users = {}
+        self.__dirty_users = set()
+        self.__server: asyncio.Server = None
+        self.__flush_task: asyncio.Task = None
+        self.requests_handled = 0
+
+    def __user_state(self, user: str) -> UserState:
+        state = self.__users.get(user)
+        if state is None:
+            user_config = copy.deepcopy(self.config)
+            user_config["paths"]["reports"] = os.path.join(
+                self.config["paths"]["reports"], user
+            )
+            os.makedirs(user_config["paths"]["reports"], exist_ok=True)
+            state = UserState(MonthlyFileHandler(user_config))
+            self.__users[user] = state
+        elif state.report_path != state.fh.report_path_by_filename(
+            state.fh.current_report_filename()
+        ):
+            # A new month started, the last one is written before switching
+            if user in self.__dirty_users:
+                state.fh.write_report(state.report_path, state.report)
+                self.__dirty_users.discard(user)
+            state = UserState(state.fh)
+            self.__users[user] = state
+        return state
+
+    def track(self, user: str) -> Tuple[int, dict]:
+        state = self.__user_state(user)
+        report_is_valid, errors = self.pc.validate(state.report)
+        if not report_is_valid:
+            return 422, {"errors": errors}
+        state.report, result_msg = self.tt.track(state.report)
+        self.__dirty_users.add(user)
+        return 200, {"message": result_msg}
+
+    def work_break(self, user: str) -> Tuple[int, dict]:
+        state = self.__user_state(user)
+        today_str, today_data = self.tt.get_today(state.report)
+        if today_data is None:
+            return 409, {
+                "errors": [{"day": today_str, "error": "Start tracking first."}]
+            }
+        report_is_valid, errors = self.pc.validate(state.report, check_breaks=False)
+        if not report_is_valid:
+            return 422, {"errors": errors}
+        state.report, result_msg = self.tt.work_break(state.report)
+        self.__dirty_users.add(user)
+        return 200, {"message": result_msg}
+
+    def get_today(self, user: str) -> Tuple[int, dict]:
+        today_str, today_data = self.tt.get_today(self.__user_state(user).report)
+        return 200, {"day": today_str, "data": today_data}
+
+    def stats(self, user: str) -> Tuple[int, dict]:
+        report = self.__user_state(user).report
+        report_is_valid, errors, parsed_days = self.pc.parse_and_validate(
+            report, check_start_end=False
+        )
+        if not report_is_valid:
+            return 422, {"errors": errors}
+        df_stats = self.statsgen.daily_worked_minutes_from_columns(
+            self.statsgen.parsed_columns(parsed_days),
+            target_daily_work_minutes=self.config["work"]["target_daily_work_minutes"],
+        )
+        df_stats["day"] = df_stats["day"].dt.strftime(self.statsgen.dth.DATE_FORMAT)
+        return 200, {"days": df_stats.to_dict(orient="records")}
+
+    def __dispatch(self, method: str, path: str) -> Tuple[int, dict]:
+        match = self.ROUTE_PATTERN.match(path)
+        if match is None:
+            return 404, {"errors": [f"Unknown path {path}"]}
+        handlers = {
+            ("POST", "track"): self.track,
+            ("POST", "break"): self.work_break,
+            ("GET", "today"): self.get_today,
+            ("GET", "stats"): self.stats,
+        }
+        handler = handlers.get((method, match.group("action")))
+        if handler is None:
+            return 405, {"errors": [f"Method {method} not allowed for {path}"]}
+        try:
+            with metrics.timer(f"request:{match.group('action')}"):
+                return handler(match.group("user"))
+        except Exception as e:
+            self.logger.exception(f"Failed handling {method} {path}")
+            return 500, {"errors": [str(e)]}
+
+    def __response(self, status: int, body: dict, keep_alive: bool) -> bytes:
+        content = json.dumps(body).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {self.STATUS_REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode("latin-1") + content
+
+    async def __handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    content_length = int(headers.get("content-length", 0))
+                except ValueError:
+                    writer.write(
+                        self.__response(400, {"errors": ["Malformed request"]}, False)
+                    )
+                    break
+                if content_length > 0:
+                    # The API has no request bodies
+                    await reader.readexactly(content_length)
+
+                status, body = self.__dispatch(method, urlsplit(target).path)
+                self.requests_handled += 1
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                writer.write(self.__response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def __write_reports(self, writes: list) -> list:
+        """Writes the reports and returns the users whose report could not be written"""
+        failed_users = []
+        for user, fh, report_path, report in writes:
+            try:
+                fh.write_report(report_path, report)
+            except (OSError, ValueError):
+                self.logger.exception(f"Failed writing report {report_path} of {user}")
+                failed_users.append(user)
+        return failed_users
+
+    async def flush(self) -> list:
+        """Writes the reports of all users changed since the last flush
+
+        Returns:
+            list: The users whose report could not be written, they are written
+                again with the next flush.
+        """
+        if len(self.__dirty_users) == 0:
+            return []
+        dirty_users, self.__dirty_users = self.__dirty_users, set()
+        # Snapshots, as the reports keep changing while being written in another thread
+        writes = [
+            (
+                user,
+                self.__users[user].fh,
+                self.__users[user].report_path,
+                self.__users[user].report.to_report(),
+            )
+            for user in dirty_users
+        ]
+        self.logger.info(f"Writing reports of {len(writes)} user(s)")
+        failed_users = await asyncio.to_thread(self.__write_reports, writes)
+        # Their clicks are kept in memory until a write succeeds
+        self.__dirty_users.update(failed_users)
+        return failed_users
+
+    async def __flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                # Keeps flushing, the dirty users are written with the next flush
+                self.logger.exception("Failed flushing reports")
+
+    async def start(self) -> None:
+        self.__server = await asyncio.start_server(
+            self.__handle_connection, self.host, self.port
+        )
+        # The configured port may be 0 to choose a free one
+        self.port = self.__server.sockets[0].getsockname()[1]
+        self.__flush_task = asyncio.create_task(self.__flush_periodically())
+        self.logger.info(f"Serving on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        self.__flush_task.cancel()
+        self.__server.close()
+        await self.__server.wait_closed()
+        await self.flush()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.stop()
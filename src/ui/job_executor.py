@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Final
+from util.metrics import metrics
+
+
+class JobExecutor:
+    """Runs the actions of the tray menu in the background, so the menu stays
+    responsive.
+
+    Jobs run in one of two lanes: the fast lane (e.g. tracking) runs jobs one
+    after another in the order of the clicks, the slow lane (e.g. exports) runs
+    them on its own workers, so a fast job never waits for a slow one. A job that
+    is submitted again while the same job is still queued or running is coalesced
+    into the pending one instead of running twice.
+    """
+
+    logger = logging.getLogger(__name__)
+    LANE_FAST: Final[str] = "fast"
+    LANE_SLOW: Final[str] = "slow"
+
+    def __init__(self, slow_workers: int, notify: Callable[[str], None]) -> None:
+        """
+        Args:
+            slow_workers (int): The amount of workers of the slow lane.
+            notify (Callable[[str], None]): Shows a notification to the user.
+        """
+        self.notify = notify
+        self.__executors = {
+            self.LANE_FAST: ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="job-fast"
+            ),
+            self.LANE_SLOW: ThreadPoolExecutor(
+                max_workers=slow_workers, thread_name_prefix="job-slow"
+            ),
+        }
+        # Queued or running coalescing jobs by their name
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.coalesced_jobs = 0
+
+    def submit(
+        self,
+        name: str,
+        job: Callable[[], None],
+        lane: str = LANE_SLOW,
+        coalesce: bool = True,
+        announce: bool = False,
+    ) -> Future:
+        """Runs a job in the background
+
+        Args:
+            name (str): The name of the job shown to the user, identical jobs have the same name.
+            job (Callable[[], None]): The job, it sends its own result notifications.
+            lane (str, optional): LANE_FAST or LANE_SLOW. Defaults to LANE_SLOW.
+            coalesce (bool, optional): Reuse the same job if it is still queued or running
+                (disable for jobs where every click counts, e.g. tracking). Defaults to True.
+            announce (bool, optional): Notify when the job starts and finishes. Defaults to False.
+
+        Returns:
+            Future: The future of the job (the pending one if coalesced).
+        """
+        with self.__lock:
+            pending = self.__pending.get(name) if coalesce else None
+            if pending is not None:
+                self.logger.info(f'Job "{name}" is already pending, coalescing')
+                metrics.count("coalesced_jobs")
+                self.coalesced_jobs += 1
+                return pending
+            future = self.__executors[lane].submit(
+                self.__run, name, job, coalesce, announce
+            )
+            if coalesce:
+                self.__pending[name] = future
+        return future
+
+    def __run(
+        self, name: str, job: Callable[[], None], coalesce: bool, announce: bool
+    ) -> None:
+        start = time.perf_counter()
+        if announce:
+            self.notify(f"{name} started ...")
+        try:
+            with metrics.timer(f"job:{name}"):
+                job()
+            duration = time.perf_counter() - start
+            self.logger.info(f'Job "{name}" finished in {duration * 1000:.0f}ms')
+            if announce:
+                self.notify(f"{name} finished after {duration:.1f}s")
+        except Exception as e:
+            self.logger.exception(f'Job "{name}" failed')
+            self.notify(f"{name} failed: {e}")
+        finally:
+            if coalesce:
+                with self.__lock:
+                    self.__pending.pop(name, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops all lanes, queued jobs are cancelled"""
+        for executor in self.__executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,25 +1,39 @@
 import logging
+import os
 import sys
-from typing import Final
+import threading
+import time
+from typing import TYPE_CHECKING, Final, Tuple
 from pystray import Icon, Menu, MenuItem
 from PIL import Image
+from model.today_state import TodayState
 from report.filehandler import MonthlyFileHandler, StatsExportFileHandler
+from report.storage_backend import JsonStorageBackend, create_storage_backend
 from tracking.tracker import TimeTracker
+from ui.job_executor import JobExecutor
 from validation.plausibility_checker import PlausibilityChecker
-from statistics.stats_generator import StatsGenerator
-from statistics.stats_visualization import StatsVisualization
 from util.datetimehandler import DateTimeHandler
 
+# The analytics stack (pandas, numpy, seaborn, matplotlib) is imported on first use
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from statistics.export_pipeline import ExportPipeline
+    from statistics.overtime_ledger import OvertimeLedger
+    from statistics.stats_generator import StatsGenerator
+    from statistics.stats_visualization import StatsVisualization
+
 
 class TrayGui:
     logger = logging.getLogger(__name__)
 
     ITEM_SHOW_TODAY_NAME: Final[str] = "Show Today"
     ITEM_MONTHLY_STATS_NAME: Final[str] = "Show Month"
+    ITEM_SHOW_OVERTIME_NAME: Final[str] = "Show Overtime"
     ITEM_STARTSTOP_WORK_NAME: Final[str] = "Start/Stop Work"
     ITEM_STARTSTOP_BREAK_NAME: Final[str] = "Start/Stop Break"
     ITEM_STATS_EXPORT: Final[str] = "Statistics Export"
     ITEM_EXIT_NAME: Final[str] = "Exit"
+    TITLE: Final[str] = "PyTimeTrack"
 
     LOGO_PATHS: Final[list] = [
         # dist
@@ -28,17 +42,91 @@ class TrayGui:
         "src/assets/logo/logo_64px.png",
     ]
 
-    def __init__(self, config) -> None:
+    def __init__(self, config, startup_time: float = None) -> None:
         self.config = config
-        self.fh = MonthlyFileHandler(self.config)
+        # perf_counter() at the start of the process to measure the time to icon
+        self.startup_time = startup_time
+        # The JSON reports are only tracked into with the "json" backend
+        self.fh = MonthlyFileHandler(
+            self.config,
+            prepare_current_report=self.config["storage"]["backend"] == "json",
+        )
+        # Tracked days are read and written through the configured backend
+        self.storage = create_storage_backend(self.config, self.fh)
         self.efh = StatsExportFileHandler(self.config)
-        self.tt = TimeTracker()
-        self.pc = PlausibilityChecker()
-        self.statsgen = StatsGenerator(
-            default_break_after_6h=self.config["work"]["default_break_after_6h"],
-            default_break_after_9h=self.config["work"]["default_break_after_9h"],
+        # Today's work in memory, shown as tooltip without reading the report
+        self.today_state = TodayState(
+            allow_overnight_shifts=self.config["work"]["allow_overnight_shifts"]
+        )
+        self.tt = TimeTracker(today_state=self.today_state)
+        self.live_status_seconds = self.config["ui"]["live_status_seconds"]
+        self.__live_status_stop = threading.Event()
+        self.pc = PlausibilityChecker(
+            allow_overnight_shifts=self.config["work"]["allow_overnight_shifts"]
         )
         self.dth = DateTimeHandler()
+        self.__statsgen = None
+        self.__export_pipeline = None
+        self.__overtime_ledger = None
+        self.__statsvis = None
+        self.__analytics_lock = threading.Lock()
+        self.__icon: Icon = None
+        # Menu actions run in the background, tracking never waits for e.g. an export
+        self.jobs = JobExecutor(
+            slow_workers=self.config["ui"]["slow_job_workers"],
+            notify=lambda msg: self.__send_notification(self.__icon, msg),
+        )
+
+    def __load_analytics(self) -> None:
+        """Imports the analytics stack and creates its instances once"""
+        with self.__analytics_lock:
+            if self.__export_pipeline is not None:
+                return
+            load_start = time.perf_counter()
+            from statistics.export_pipeline import ExportPipeline
+            from statistics.overtime_ledger import OvertimeLedger
+            from statistics.stats_generator import StatsGenerator
+            from statistics.stats_visualization import StatsVisualization
+
+            self.__statsgen = StatsGenerator(
+                default_break_after_6h=self.config["work"]["default_break_after_6h"],
+                default_break_after_9h=self.config["work"]["default_break_after_9h"],
+                default_break_rules=self.config["work"]["default_break_rules"],
+                cache_months=self.config["storage"]["report_cache_size"],
+            )
+            self.__statsvis = StatsVisualization(
+                headless=self.config["ui"]["chart_mode"] == "headless",
+                cache_dir=os.path.join(self.config["paths"]["reports"], "charts"),
+            )
+            self.__overtime_ledger = OvertimeLedger(
+                self.config, self.fh, self.pc, self.__statsgen, storage=self.storage
+            )
+            self.__export_pipeline = ExportPipeline(
+                self.config, self.fh, self.pc, self.__statsgen
+            )
+            self.logger.info(
+                f"Loaded analytics in {(time.perf_counter() - load_start) * 1000:.0f}ms"
+            )
+
+    @property
+    def statsgen(self) -> "StatsGenerator":
+        self.__load_analytics()
+        return self.__statsgen
+
+    @property
+    def export_pipeline(self) -> "ExportPipeline":
+        self.__load_analytics()
+        return self.__export_pipeline
+
+    @property
+    def statsvis(self) -> "StatsVisualization":
+        self.__load_analytics()
+        return self.__statsvis
+
+    @property
+    def overtime_ledger(self) -> "OvertimeLedger":
+        self.__load_analytics()
+        return self.__overtime_ledger
 
     def __get_logo_image(self) -> Image:
         for path in self.LOGO_PATHS:
@@ -49,30 +137,71 @@ class TrayGui:
         self.logger.warn(f"Could not find logo in given paths: {self.LOGO_PATHS}")
         sys.exit(1)
 
+    def __job(self, name: str, action, lane: str, **kwargs) -> MenuItem:
+        """Creates a menu item that submits its action as a background job (see JobExecutor.submit)"""
+        return MenuItem(
+            name,
+            action=lambda icon, item: self.jobs.submit(
+                name, lambda: action(icon, item), lane=lane, **kwargs
+            ),
+        )
+
+    def __on_exit_clicked(self, icon: Icon, item: str) -> None:
+        self.__live_status_stop.set()
+        # Running jobs (e.g. a tracking) may still use the backend
+        self.jobs.shutdown(wait=True)
+        self.storage.close()
+        icon.stop()
+
+    def __monthly_stats_item(self, lane: str) -> MenuItem:
+        if self.config["ui"]["chart_mode"] == "headless":
+            return self.__job(
+                self.ITEM_MONTHLY_STATS_NAME, self.__on_monthly_stats_clicked, lane
+            )
+        # A matplotlib window only works on the thread of the tray (which calls the
+        # menu actions) and blocks it until closed, so it never runs as a job
+        return MenuItem(
+            self.ITEM_MONTHLY_STATS_NAME, action=self.__on_monthly_chart_clicked
+        )
+
     def __create_menu(self) -> Menu:
+        fast, slow = JobExecutor.LANE_FAST, JobExecutor.LANE_SLOW
         menu_items = [
-            MenuItem(self.ITEM_SHOW_TODAY_NAME, action=self.__on_show_today_clicked),
-            MenuItem(
-                self.ITEM_MONTHLY_STATS_NAME, action=self.__on_monthly_stats_clicked
+            self.__job(self.ITEM_SHOW_TODAY_NAME, self.__on_show_today_clicked, fast),
+            self.__monthly_stats_item(slow),
+            self.__job(
+                self.ITEM_SHOW_OVERTIME_NAME, self.__on_show_overtime_clicked, slow
             ),
             Menu.SEPARATOR,
-            MenuItem(
-                self.ITEM_STARTSTOP_WORK_NAME, action=self.__on_startstop_work_clicked
+            # Every click counts, so tracking is never coalesced
+            self.__job(
+                self.ITEM_STARTSTOP_WORK_NAME,
+                self.__on_startstop_work_clicked,
+                fast,
+                coalesce=False,
             ),
-            MenuItem(
-                self.ITEM_STARTSTOP_BREAK_NAME, action=self.__on_workbreak_clicked
+            self.__job(
+                self.ITEM_STARTSTOP_BREAK_NAME,
+                self.__on_workbreak_clicked,
+                fast,
+                coalesce=False,
             ),
             Menu.SEPARATOR,
-            MenuItem(self.ITEM_STATS_EXPORT, action=self.__on_stats_export_clicked),
+            self.__job(
+                self.ITEM_STATS_EXPORT,
+                self.__on_stats_export_clicked,
+                slow,
+                announce=True,
+            ),
             Menu.SEPARATOR,
-            MenuItem(self.ITEM_EXIT_NAME, action=lambda icon, item: icon.stop()),
+            MenuItem(self.ITEM_EXIT_NAME, action=self.__on_exit_clicked),
         ]
         menu = Menu(*menu_items)
 
         return menu
 
     def __send_notification(self, icon: Icon, msg: str) -> None:
-        if icon.HAS_NOTIFICATION:
+        if icon is not None and icon.HAS_NOTIFICATION:
             icon.notify(msg)
 
     def __send_validation_error_notification(self, icon: Icon, errors: list) -> None:
@@ -83,102 +212,225 @@ class TrayGui:
                 f"Your report file is broken, please fix it:\n{first_error['day']}: {first_error['error']}"
             )
 
+    def __send_reports_validation_errors_notification(
+        self, icon: Icon, reports_errors: list
+    ) -> None:
+        # One notification for all broken reports, showing the first error of each
+        if icon.HAS_NOTIFICATION and len(reports_errors) > 0:
+            broken_reports = "\n".join(
+                f"{os.path.basename(report_errors['report'])} ({report_errors['errors'][0]['day']}): {report_errors['errors'][0]['error']}"
+                for report_errors in reports_errors
+            )
+            icon.notify(
+                f"{len(reports_errors)} report file(s) are broken, please fix them:\n{broken_reports}"
+            )
+
+    def __live_status(self) -> str:
+        """Returns the work of today so far (e.g. "Work: 5h 12min") from memory only"""
+        work_minutes, break_start = self.today_state.status(
+            self.dth.today_str(), self.dth.now_minutes()
+        )
+        if work_minutes is None:
+            return f"{self.TITLE}\nNo work tracked today"
+        live_status = f"{self.TITLE}\nWork: {self.dth.minutes_to_full_hours(work_minutes)}h {self.dth.minutes_mod_hour(work_minutes)}min"
+        if break_start is not None:
+            live_status += f"\nBreak since {self.dth.minutes_to_time_str(break_start)}"
+        return live_status
+
+    def __refresh_live_status(self) -> None:
+        if self.__icon is not None and self.live_status_seconds > 0:
+            self.__icon.title = self.__live_status()
+
+    def __run_live_status(self) -> None:
+        # Every tick only reads the in-memory state, it never touches the reports
+        while not self.__live_status_stop.wait(self.live_status_seconds):
+            self.__refresh_live_status()
+
+    def __on_icon_ready(self, icon: Icon) -> None:
+        icon.visible = True
+        if self.live_status_seconds > 0:
+            # The only read of today, every tracking updates the state afterwards
+            today_str = self.dth.today_str()
+            today_data = self.storage.read_day(today_str)
+            if today_data is None and self.today_state.allow_overnight_shifts:
+                # A shift started yesterday may still be running
+                yesterday_str = self.dth.ordinal_to_date_str(
+                    self.dth.date_str_to_ordinal(today_str) - 1
+                )
+                self.today_state.reset(
+                    yesterday_str, self.storage.read_day(yesterday_str)
+                )
+            else:
+                self.today_state.reset(today_str, today_data)
+            self.__refresh_live_status()
+            threading.Thread(
+                target=self.__run_live_status, name="live-status", daemon=True
+            ).start()
+        if self.startup_time is not None:
+            self.logger.info(
+                f"Startup: time to icon {(time.perf_counter() - self.startup_time) * 1000:.0f}ms"
+            )
+        if self.config["ui"]["warmup_analytics"]:
+            # Stats and exports are fast on first use without delaying the icon
+            threading.Thread(
+                target=self.__load_analytics, name="warmup", daemon=True
+            ).start()
+
     def start(self):
         icon = Icon(
-            "PyTimeTrack",
+            self.TITLE,
             icon=self.__get_logo_image(),
             menu=self.__create_menu(),
         )
+        self.__icon = icon
 
-        icon.run()
+        icon.run(setup=self.__on_icon_ready)
+
+    def __read_current_month(self) -> dict:
+        today = self.dth.today()
+        return self.storage.read_month(today.year, today.month)
+
+    def __upsert_today(self, current_report: dict) -> None:
+        # Only today changed, e.g. a single row of the SQLite backend
+        today_str, today_data = self.tt.get_today(current_report)
+        self.storage.upsert_day(today_str, today_data)
 
     def __on_startstop_work_clicked(self, icon: Icon, item: str) -> None:
-        current_report = self.fh.read_current_report()
-        self.logger.info(f"Validating report {self.fh.current_report_filename()}")
-        report_is_valid, errors = self.pc.validate(current_report)
+        # Other instances (e.g. a tray of another session) wait until it is written
+        with self.storage.lock(self.dth.today_str()):
+            current_report = self.__read_current_month()
+            self.logger.info(f"Validating report {self.fh.current_report_filename()}")
+            report_is_valid, errors = self.pc.validate(current_report)
+            if report_is_valid:
+                self.logger.info("Tracking time")
+                current_report, result_msg = self.tt.track(current_report)
+                self.__upsert_today(current_report)
+        self.__refresh_live_status()
         if len(errors) > 0:
             self.__send_validation_error_notification(icon, errors)
         if report_is_valid:
-            self.logger.info("Tracking time")
-            current_report, result_msg = self.tt.track(current_report)
-            self.fh.write_current_report(current_report)
             self.__send_notification(icon, result_msg)
 
     def __on_workbreak_clicked(self, icon: Icon, item: str) -> None:
-        current_report = self.fh.read_current_report()
-        self.logger.info(f"Validating report {self.fh.current_report_filename()}")
-        report_is_valid, errors = self.pc.validate(current_report, check_breaks=False)
+        with self.storage.lock(self.dth.today_str()):
+            current_report = self.__read_current_month()
+            self.logger.info(f"Validating report {self.fh.current_report_filename()}")
+            report_is_valid, errors = self.pc.validate(
+                current_report, check_breaks=False
+            )
+            if report_is_valid:
+                self.logger.info("Tracking work break")
+                current_report, result_msg = self.tt.work_break(current_report)
+                self.__upsert_today(current_report)
+        self.__refresh_live_status()
         if len(errors) > 0:
             self.__send_validation_error_notification(icon, errors)
         if report_is_valid:
-            self.logger.info("Tracking work break")
-            current_report, result_msg = self.tt.work_break(current_report)
-            self.fh.write_current_report(current_report)
-
             self.__send_notification(icon, result_msg)
 
-    def __on_monthly_stats_clicked(self, icon: Icon, item: str) -> None:
+    def __monthly_stats(self, icon: Icon) -> Tuple[str, "DataFrame"] | None:
+        """Returns the title and the daily worked minutes of the current month or
+        None if the report is broken"""
         report_filename = self.fh.current_report_filename()
-        current_report = self.fh.read_current_report()
+        current_report = self.__read_current_month()
         self.logger.info(f"Validating report {report_filename}")
-        report_is_valid, errors = self.pc.validate(
+        report_is_valid, errors, parsed_days = self.pc.parse_and_validate(
             current_report, check_start_end=False
         )
         if len(errors) > 0:
             self.__send_validation_error_notification(icon, errors)
-        if report_is_valid:
-            self.logger.info(f"Creating stats for {report_filename}")
-            statsvis = StatsVisualization()
-            df_stats_daily_worked_minutes = self.statsgen.daily_worked_minutes(
-                report=current_report,
-                target_daily_work_minutes=self.config["work"][
-                    "target_daily_work_minutes"
-                ],
+        if not report_is_valid:
+            return None
+        self.logger.info(f"Creating stats for {report_filename}")
+        df_stats_daily_worked_minutes = self.statsgen.daily_worked_minutes_from_columns(
+            self.statsgen.parsed_columns(parsed_days),
+            target_daily_work_minutes=self.config["work"]["target_daily_work_minutes"],
+        )
+        return (
+            f"Daily Worked Minutes ({report_filename})",
+            df_stats_daily_worked_minutes,
+        )
+
+    def __on_monthly_stats_clicked(self, icon: Icon, item: str) -> None:
+        monthly_stats = self.__monthly_stats(icon)
+        if monthly_stats is not None:
+            title, df_stats_daily_worked_minutes = monthly_stats
+            # Unchanged statistics are not rendered again
+            image_path = self.statsvis.render_daily_worked_minutes(
+                title=title,
+                stats=df_stats_daily_worked_minutes,
+                image_format=self.config["ui"]["chart_format"],
             )
-            statsvis.bar_daily_worked_minutes(
-                title=f"Daily Worked Minutes ({report_filename})",
+            self.__open_chart(image_path)
+
+    def __on_monthly_chart_clicked(self, icon: Icon, item: str) -> None:
+        monthly_stats = self.__monthly_stats(icon)
+        if monthly_stats is not None:
+            title, df_stats_daily_worked_minutes = monthly_stats
+            self.statsvis.bar_daily_worked_minutes(
+                title=title,
                 stats=df_stats_daily_worked_minutes,
             )
 
+    def __open_chart(self, image_path: str) -> None:
+        if image_path.endswith(".png"):
+            Image.open(image_path).show()
+        else:
+            import webbrowser
+
+            webbrowser.open(f"file://{os.path.abspath(image_path)}")
+
     def __on_stats_export_clicked(self, icon: Icon, item: str) -> None:
-        reports_paths = self.fh.list_reports_paths()
-        reports_df_stats = []
-        for report_path in reports_paths:
-            report = self.fh.read_report(report_path)
-            self.logger.info(f"Validating report {report_path}")
-            self.logger.info(report)
-            report_is_valid, errors = self.pc.validate(report, check_start_end=False)
-            if len(errors) > 0:
-                self.__send_validation_error_notification(icon, errors)
-            if report_is_valid:
-                df_stats = self.statsgen.stats_export(
-                    report=report,
-                    target_daily_work_minutes=self.config["work"][
-                        "target_daily_work_minutes"
-                    ],
-                )
-                reports_df_stats.append(df_stats)
-        self.efh.write_stats_export(reports_df_stats)
+        reports_errors = []
+        # Every month is written as soon as it is ready instead of collecting all of them
+        self.efh.stream_stats_export(
+            self.export_pipeline.stream_storage(self.storage, reports_errors)
+        )
+        if len(reports_errors) > 0:
+            self.__send_reports_validation_errors_notification(icon, reports_errors)
 
     def __on_show_today_clicked(self, icon: Icon, item: str) -> None:
-        current_report = self.fh.read_current_report()
+        current_report = self.__read_current_month()
         today_str, today_data = self.tt.get_today(current_report)
         if today_data is None:
             self.__send_notification(
                 icon, "Could not find data for today. Start tracking first."
             )
         else:
-            dt_start = self.dth.datetime_str_to_datetime(
-                f"{today_str} {today_data['start']}"
-            )
-            dt_end = self.dth.now()
+            start = self.dth.time_str_to_minutes(today_data["start"])
+            end = self.dth.now_minutes()
             if today_data["end"] != "":
-                dt_end = self.dth.datetime_str_to_datetime(
-                    f"{today_str} {today_data['end']}"
-                )
-            working_time = self.dth.datetime_diff_in_minutes(dt_start, dt_end)
+                end = self.dth.time_str_to_minutes(today_data["end"])
+            working_time = (end - start) % self.dth.MINUTES_PER_DAY
             working_time_h = self.dth.minutes_to_full_hours(working_time)
             working_time_min = self.dth.minutes_mod_hour(working_time)
             today_info = f"Start: {today_data['start']}\nEnd: {today_data['end']}\nBreaks: {today_data['breaks']}\nWorking Time: {working_time_h}h {working_time_min}min"
 
             self.__send_notification(icon, today_info)
+
+    def __format_overtime(self, minutes: int) -> str:
+        sign = "-" if minutes < 0 else "+"
+        return f"{sign}{self.dth.minutes_to_full_hours(abs(minutes))}h {self.dth.minutes_mod_hour(abs(minutes))}min"
+
+    def __on_show_overtime_clicked(self, icon: Icon, item: str) -> None:
+        ledger = self.overtime_ledger
+        # Only new or changed reports are read, every balance below is O(1)
+        ledger.refresh()
+        today = self.dth.today().date()
+        overtime_info = "\n".join(
+            [
+                f"Week: {self.__format_overtime(ledger.to_date(today, 'week'))}",
+                f"Month: {self.__format_overtime(ledger.to_date(today, 'month'))}",
+                f"Year: {self.__format_overtime(ledger.to_date(today, 'year'))}",
+                f"Total: {self.__format_overtime(ledger.total())}",
+            ]
+        )
+        if isinstance(self.storage, JsonStorageBackend):
+            # Unchanged reports are summed up from the manifest without reading them
+            total_work_minutes, _ = self.export_pipeline.manifest.totals()
+            overtime_info += f"\nWorked in total: {self.dth.minutes_to_full_hours(total_work_minutes)}h {self.dth.minutes_mod_hour(total_work_minutes)}min"
+        if len(ledger.invalid_reports) > 0:
+            overtime_info += (
+                f"\nIgnored {len(ledger.invalid_reports)} broken report file(s)"
+            )
+        self.__send_notification(icon, overtime_info)
@@ -1,13 +1,58 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Final
 import calendar
 
+# Bounded amount of distinct time and date strings kept by the parse caches
+PARSE_CACHE_SIZE: Final[int] = 4096
+
+
+def _parse_number(value: str, min_digits: int, max_digits: int) -> int:
+    if not (min_digits <= len(value) <= max_digits) or not (
+        value.isascii() and value.isdigit()
+    ):
+        raise ValueError(f"'{value}' is not a number with {max_digits} digits")
+    return int(value)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_time_minutes(time_str: str) -> int:
+    """Parses "HH:MM" into the minutes of the day without using strptime"""
+    hours, separator, minutes = time_str.partition(":")
+    if separator != ":":
+        raise ValueError(f"time data '{time_str}' does not match format 'HH:MM'")
+    hours = _parse_number(hours, 1, 2)
+    minutes = _parse_number(minutes, 1, 2)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"time data '{time_str}' is out of range")
+    return hours * 60 + minutes
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_ordinal(date_str: str) -> int:
+    """Parses "DD.MM.YYYY" into the proleptic Gregorian ordinal without using strptime"""
+    parts = date_str.split(".")
+    if len(parts) != 3:
+        raise ValueError(f"date data '{date_str}' does not match format 'DD.MM.YYYY'")
+    day = _parse_number(parts[0], 1, 2)
+    month = _parse_number(parts[1], 1, 2)
+    year = _parse_number(parts[2], 4, 4)
+    # Raises a ValueError for dates that do not exist
+    return date(year, month, day).toordinal()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _format_date_ordinal(ordinal: int) -> str:
+    day = date.fromordinal(ordinal)
+    return f"{day.day:02d}.{day.month:02d}.{day.year:04d}"
+
 
 class DateTimeHandler:
     DATE_FORMAT: Final[str] = "%d.%m.%Y"
     DATETIME_FORMAT: Final[str] = "%d.%m.%Y %H:%M"
     TIME_FORMAT: Final[str] = "%H:%M"
     DATE_FILE_FORMAT: Final[str] = "%Y%m%d%H%M%S"
+    MINUTES_PER_DAY: Final[int] = 24 * 60
 
     def today(self) -> datetime:
         return datetime.today()
@@ -28,7 +73,8 @@ class DateTimeHandler:
         return self.__datetime_to_str(self.now(), self.DATE_FILE_FORMAT)
 
     def datetime_diff_in_minutes(self, start: datetime, end: datetime) -> int:
-        return (end - start).seconds / 60
+        # timedelta.seconds drops the days, so an end after midnight would wrap
+        return (end - start).total_seconds() / 60
 
     def datetime_str_to_datetime(self, datetime_str: str) -> datetime:
         return datetime.strptime(datetime_str, self.DATETIME_FORMAT)
@@ -36,6 +82,54 @@ class DateTimeHandler:
     def date_str_to_datetime(self, date_str: str) -> datetime:
         return datetime.strptime(date_str, self.DATE_FORMAT)
 
+    def time_str_to_minutes(self, time_str: str) -> int:
+        """Converts a time string (e.g. "07:11") into the minutes of the day"""
+        return _parse_time_minutes(time_str)
+
+    def date_str_to_ordinal(self, date_str: str) -> int:
+        """Converts a date string (e.g. "01.02.2023") into its ordinal (see date.toordinal)"""
+        return _parse_date_ordinal(date_str)
+
+    def any_date_str_to_ordinal(self, date_str: str) -> int:
+        """Converts a date string as "01.02.2023" or as ISO "2023-02-01" into its ordinal"""
+        date_str = date_str.strip()
+        if "-" in date_str:
+            return date.fromisoformat(date_str).toordinal()
+        return _parse_date_ordinal(date_str)
+
+    def ordinal_to_datetime(self, ordinal: int) -> datetime:
+        return datetime.fromordinal(ordinal)
+
+    def ordinal_to_date_str(self, ordinal: int) -> str:
+        return _format_date_ordinal(ordinal)
+
+    def minutes_to_time_str(self, minutes: int) -> str:
+        """Converts minutes of the day into a time string (e.g. "07:11")"""
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def now_minutes(self) -> int:
+        now = self.now()
+        return now.hour * 60 + now.minute
+
+    def parse_cache_info(self) -> dict:
+        """Returns the hit/miss counters of the time and date parse caches"""
+        return {
+            name: {
+                "hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+            }
+            for name, info in (
+                ("time", _parse_time_minutes.cache_info()),
+                ("date", _parse_date_ordinal.cache_info()),
+            )
+        }
+
+    def clear_parse_cache(self) -> None:
+        _parse_time_minutes.cache_clear()
+        _parse_date_ordinal.cache_clear()
+
     def minutes_to_full_hours(self, mins: float) -> int:
         return int(mins / 60)
 
@@ -0,0 +1,180 @@
+from typing import TYPE_CHECKING, Final, NamedTuple, Tuple
+
+# numpy is imported on first use, so the validation does not load it (e.g. on
+# startup of the tray)
+if TYPE_CHECKING:
+    import numpy as np
+
+MINUTES_PER_DAY: Final[int] = 24 * 60
+
+Interval = Tuple[int, int]
+
+
+def unwrap(reference: int, minutes: int) -> int:
+    """Places a minute of the day at or after the reference minute, so times
+    after midnight (e.g. 01:00 after a start at 22:00) continue the day.
+
+    Args:
+        reference (int): The minute of the day it follows (e.g. the start of work).
+        minutes (int): The minute of the day.
+
+    Returns:
+        int: The minutes since 00:00 of the day of the reference (can exceed a day).
+    """
+    return reference + (minutes - reference) % MINUTES_PER_DAY
+
+
+def merge(intervals: list[Interval]) -> list[Interval]:
+    """Merges overlapping or touching intervals
+
+    Args:
+        intervals (list[Interval]): The (start, end) intervals in any order.
+
+    Returns:
+        list[Interval]: The sorted union of the intervals.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def overlaps(intervals: list[Interval]) -> list[Tuple[Interval, Interval]]:
+    """Finds the intervals that overlap another one with a single sweep over the
+    sorted intervals (O(n log n)). Touching intervals (e.g. 10:00-10:30 and
+    10:30-11:00) do not overlap.
+
+    Args:
+        intervals (list[Interval]): The (start, end) intervals in any order.
+
+    Returns:
+        list[Tuple[Interval, Interval]]: Pairs of an earlier interval and the
+            interval overlapping it (contained in it if it ends first).
+    """
+    return _sweep_overlaps(sorted(intervals))
+
+
+def _sweep_overlaps(intervals: list[Interval]) -> list[Tuple[Interval, Interval]]:
+    found = []
+    # The interval reaching furthest so far
+    furthest = None
+    for interval in intervals:
+        if furthest is not None and interval[0] < furthest[1]:
+            found.append((furthest, interval))
+        if furthest is None or interval[1] > furthest[1]:
+            furthest = interval
+    return found
+
+
+class DayIntervals(NamedTuple):
+    """The work span and the breaks of a day as sorted intervals in minutes since
+    00:00 of the day. Times before the start of work belong to the next day, so
+    work and breaks can span midnight (e.g. work 22:00-06:00 is (1320, 1800)).
+    """
+
+    work: Interval
+    breaks: tuple
+
+    @classmethod
+    def from_minutes(cls, start: int, end: int, breaks: tuple) -> "DayIntervals":
+        """Creates the intervals of a day
+
+        Args:
+            start (int): The start of work in minutes of the day.
+            end (int): The end of work in minutes of the day.
+            breaks (tuple): The start and end of every break in minutes of the day.
+
+        Returns:
+            DayIntervals: The intervals, breaks sorted by their start.
+        """
+        return cls(
+            work=(start, unwrap(start, end)),
+            breaks=tuple(
+                sorted(
+                    (
+                        unwrap(start, break_start),
+                        unwrap(unwrap(start, break_start), break_end),
+                    )
+                    for break_start, break_end in zip(breaks[::2], breaks[1::2])
+                )
+            ),
+        )
+
+    def overlapping_breaks(self) -> list[Tuple[Interval, Interval]]:
+        """Returns the pairs of breaks that overlap (see overlaps)"""
+        return _sweep_overlaps(self.breaks)
+
+    def breaks_outside_work(self) -> list[Interval]:
+        """Returns the breaks that do not lie within the work span"""
+        return [
+            (break_start, break_end)
+            for break_start, break_end in self.breaks
+            if break_start < self.work[0] or break_end > self.work[1]
+        ]
+
+    def break_minutes(self) -> int:
+        """Returns the minutes of all breaks within the work span, counting overlaps once"""
+        return sum(
+            max(min(break_end, self.work[1]) - max(break_start, self.work[0]), 0)
+            for break_start, break_end in merge(list(self.breaks))
+        )
+
+    def net_work_minutes(self) -> int:
+        """Returns the minutes of work without the breaks"""
+        return self.work[1] - self.work[0] - self.break_minutes()
+
+
+def merged_break_minutes(
+    owners: "np.ndarray",
+    break_starts: "np.ndarray",
+    break_ends: "np.ndarray",
+    work_starts: "np.ndarray",
+    work_ends: "np.ndarray",
+) -> "np.ndarray":
+    """Vectorized DayIntervals.break_minutes of many days: the breaks are clipped
+    to the work span of their day and merged by a sweep over the breaks sorted
+    by day and start.
+
+    Args:
+        owners (np.ndarray): The index of the day of every break.
+        break_starts (np.ndarray): The start of every break in minutes of the day.
+        break_ends (np.ndarray): The end of every break in minutes of the day.
+        work_starts (np.ndarray): The start of work of every day in minutes of the day.
+        work_ends (np.ndarray): The end of work of every day in minutes of the day.
+
+    Returns:
+        np.ndarray: The minutes of the breaks of every day.
+    """
+    import numpy as np
+
+    day_count = len(work_starts)
+    if len(owners) == 0:
+        return np.zeros(day_count, dtype=np.float64)
+    owner_starts = work_starts[owners]
+    # Minutes since the start of work of the day of the break
+    starts = (break_starts - owner_starts) % MINUTES_PER_DAY
+    ends = starts + (break_ends - break_starts) % MINUTES_PER_DAY
+    work_minutes = ((work_ends - work_starts) % MINUTES_PER_DAY)[owners]
+    starts = np.minimum(starts, work_minutes)
+    ends = np.minimum(ends, work_minutes)
+
+    # Offsetting every day by more than two days keeps the running maximum per day
+    offsets = owners.astype(np.int64) * (3 * MINUTES_PER_DAY)
+    # Breaks are usually tracked in order, then sorting is skipped
+    if np.any(np.diff(starts + offsets) < 0):
+        order = np.lexsort((starts, owners))
+        owners, starts, ends = owners[order], starts[order], ends[order]
+        offsets = offsets[order]
+    furthest_end = np.maximum.accumulate(ends + offsets) - offsets
+    previous_end = np.empty_like(furthest_end)
+    previous_end[0] = 0
+    previous_end[1:] = furthest_end[:-1]
+    # The first break of a day does not continue the breaks of the day before
+    first_of_day = np.ones(len(owners), dtype=bool)
+    first_of_day[1:] = owners[1:] != owners[:-1]
+    previous_end[first_of_day] = 0
+    lengths = np.maximum(ends - np.maximum(starts, previous_end), 0)
+    return np.bincount(owners, weights=lengths, minlength=day_count).astype(np.float64)
@@ -0,0 +1,137 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import ContextManager, Final
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.record(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Timers per stage (e.g. read_report, validate), counters (e.g. files and
+    bytes read) and a histogram of the durations of every stage, written as JSON
+    lines (e.g. metrics.jsonl next to output.log).
+
+    While disabled, timer() returns a shared no-op context manager and count()
+    returns immediately, so instrumented code pays (almost) nothing.
+    """
+
+    logger = logging.getLogger(__name__)
+    PERCENTILES: Final[tuple] = (50, 95, 99)
+    # Durations kept per stage for the histogram
+    HISTOGRAM_SIZE: Final[int] = 1024
+    __DISABLED_TIMER: Final[ContextManager] = nullcontext()
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: str = None
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__durations = {}
+
+    def configure(self, enabled: bool, path: str = None) -> None:
+        """Enables or disables the metrics
+
+        Args:
+            enabled (bool): Whether to collect metrics.
+            path (str, optional): The JSON lines file to append the metrics to. Defaults to None (not written).
+        """
+        with self.__lock:
+            self.enabled = enabled
+            self.path = path
+            self.__counters = {}
+            self.__durations = {}
+
+    def timer(self, stage: str) -> ContextManager:
+        """Measures the duration of a stage, use as "with metrics.timer(stage):" """
+        if not self.enabled:
+            return self.__DISABLED_TIMER
+        return _Timer(self, stage)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increases a counter (e.g. files_read or bytes_written)"""
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Adds a duration of a stage to its histogram and writes it"""
+        if not self.enabled:
+            return
+        with self.__lock:
+            durations = self.__durations.get(stage)
+            if durations is None:
+                durations = deque(maxlen=self.HISTOGRAM_SIZE)
+                self.__durations[stage] = durations
+            durations.append(seconds)
+        self.__write({"type": "timer", "stage": stage, "ms": seconds * 1000})
+
+    def __percentile(self, sorted_durations: list, percentile: int) -> float:
+        # Nearest rank
+        rank = max(math.ceil(percentile / 100 * len(sorted_durations)), 1)
+        return sorted_durations[rank - 1]
+
+    def histogram(self, stage: str) -> dict | None:
+        """Returns the amount of measurements and the percentiles (e.g. "p95") in milliseconds of a stage
+
+        Returns:
+            dict | None: The histogram or None if the stage was never measured.
+        """
+        with self.__lock:
+            durations = sorted(self.__durations.get(stage, []))
+        if len(durations) == 0:
+            return None
+        histogram = {"count": len(durations)}
+        for percentile in self.PERCENTILES:
+            histogram[f"p{percentile}"] = (
+                self.__percentile(durations, percentile) * 1000
+            )
+        return histogram
+
+    def snapshot(self) -> dict:
+        """Returns all counters and the histograms of all stages"""
+        with self.__lock:
+            counters = dict(self.__counters)
+            stages = list(self.__durations.keys())
+        return {
+            "counters": counters,
+            "histograms": {stage: self.histogram(stage) for stage in stages},
+        }
+
+    def write_summary(self) -> None:
+        """Writes the snapshot (e.g. when the app exits)"""
+        if not self.enabled:
+            return
+        self.__write({"type": "summary", **self.snapshot()})
+
+    def __write(self, event: dict) -> None:
+        if self.path is None:
+            return
+        line = json.dumps({"ts": time.time(), **event})
+        with self.__lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(f"{line}\n")
+            except OSError as e:
+                self.logger.warning(f"Could not write metrics to {self.path}: {e}")
+
+
+# Shared by all modules of the process, configured once at startup
+metrics = Metrics()
@@ -1,44 +1,149 @@
 import logging
 from typing import Tuple
+from model.month_report import MonthReport
+from model.parsed_day import ParsedDay
 from util.datetimehandler import DateTimeHandler
+from util.intervals import DayIntervals, Interval
+from util.metrics import metrics
 
 
 class PlausibilityChecker:
     logger = logging.getLogger(__name__)
 
-    def __init__(self) -> None:
+    def __init__(self, allow_overnight_shifts: bool = False) -> None:
+        """
+        Args:
+            allow_overnight_shifts (bool, optional): Accept days ending after midnight
+                (end before start). Defaults to False.
+        """
+        self.allow_overnight_shifts = allow_overnight_shifts
         self.dth = DateTimeHandler()
 
     def __create_error(self, day: str, error: str):
         return {"day": day, "error": error}
 
+    def __parsed(self, value: int | None, parse, raw: str) -> int:
+        """Returns an already parsed value or raises the ValueError of parsing it"""
+        return value if value is not None else parse(raw)
+
+    def __interval_str(self, interval: Interval) -> str:
+        start, end = interval
+        return f"{self.dth.minutes_to_time_str(start % self.dth.MINUTES_PER_DAY)}-{self.dth.minutes_to_time_str(end % self.dth.MINUTES_PER_DAY)}"
+
+    def __interval_errors(
+        self, day: str, start: int | None, end: int | None, breaks: list
+    ) -> list:
+        """Checks the breaks against each other and against the work of the day"""
+        errors = []
+        # Without a start (e.g. check_start_end=False) the breaks are placed after the first one
+        intervals = DayIntervals.from_minutes(
+            start if start is not None else breaks[0],
+            end if end is not None else breaks[0],
+            breaks,
+        )
+        for earlier, overlapping in intervals.overlapping_breaks():
+            if overlapping[1] <= earlier[1]:
+                error = f"Break {self.__interval_str(overlapping)} lies within break {self.__interval_str(earlier)}."
+            else:
+                error = f"Breaks {self.__interval_str(earlier)} and {self.__interval_str(overlapping)} overlap."
+            errors.append(self.__create_error(day, error))
+        if start is not None and end is not None:
+            for outside in intervals.breaks_outside_work():
+                errors.append(
+                    self.__create_error(
+                        day,
+                        f"Break {self.__interval_str(outside)} is not within the work from {self.__interval_str(intervals.work)}.",
+                    )
+                )
+        return errors
+
     def validate(
         self,
-        report: dict,
+        report: dict | MonthReport,
         check_start_end: bool = True,
         check_breaks: bool = True,
     ) -> Tuple[bool, list]:
+        report_is_valid, errors, _ = self.parse_and_validate(
+            report, check_start_end, check_breaks
+        )
+        return report_is_valid, errors
+
+    def parse_and_validate(
+        self,
+        report: dict | MonthReport,
+        check_start_end: bool = True,
+        check_breaks: bool = True,
+    ) -> Tuple[bool, list, list[ParsedDay]]:
+        """Parses every day of the report exactly once and validates it. The parsed
+        days can be passed to the statistics (see StatsGenerator.parsed_columns).
+
+        Args:
+            report (dict | MonthReport): The report to validate.
+            check_start_end (bool, optional): Validate start and end. Defaults to True.
+            check_breaks (bool, optional): Validate the breaks. Defaults to True.
+
+        Returns:
+            Tuple[bool, list, list[ParsedDay]]: Whether the report is valid, the
+                errors (each as {"day", "error"}) and the parsed days.
+        """
+        with metrics.timer("validate"):
+            return self.__parse_and_validate(report, check_start_end, check_breaks)
+
+    def __parse_and_validate(
+        self,
+        report: dict | MonthReport,
+        check_start_end: bool,
+        check_breaks: bool,
+    ) -> Tuple[bool, list, list[ParsedDay]]:
         errors = []
+        parsed_days = []
+
+        if isinstance(report, MonthReport):
+            # Days of a MonthReport are already stored as integers
+            days = zip(report.items(), report.parsed_days())
+        else:
+            days = (
+                ((day, data), ParsedDay.parse(day, data, self.dth))
+                for day, data in report.items()
+            )
+
+        for (day, data), parsed_day in days:
+            parsed_days.append(parsed_day)
+            # Start and end of finished days with plausible start and end
+            work_start, work_end = None, None
 
-        for day in report.keys():
-            if report[day]["end"] != "" and check_start_end:
-                dt_start = self.dth.datetime_str_to_datetime(
-                    f"{day} {report[day]['start']}"
+            if data["end"] != "" and check_start_end:
+                self.__parsed(parsed_day.ordinal, self.dth.date_str_to_ordinal, day)
+                start = self.__parsed(
+                    parsed_day.start, self.dth.time_str_to_minutes, data["start"]
                 )
-                dt_end = self.dth.datetime_str_to_datetime(
-                    f"{day} {report[day]['end']}"
+                end = self.__parsed(
+                    parsed_day.end, self.dth.time_str_to_minutes, data["end"]
                 )
 
-                if dt_start > dt_end:
+                if start <= end or self.allow_overnight_shifts:
+                    work_start, work_end = start, end
+                else:
+                    dt_start = self.dth.datetime_str_to_datetime(
+                        f"{day} {data['start']}"
+                    )
+                    dt_end = self.dth.datetime_str_to_datetime(f"{day} {data['end']}")
                     errors.append(
                         self.__create_error(
                             day,
                             f"Start time {dt_start} has to be before end time {dt_end}.",
                         )
                     )
+            elif (
+                parsed_day.start is not None
+                and parsed_day.end is not None
+                and (parsed_day.start <= parsed_day.end or self.allow_overnight_shifts)
+            ):
+                # Start and end are not validated, but the breaks still have to lie within them
+                work_start, work_end = parsed_day.start, parsed_day.end
 
             if check_breaks:
-                breaks = report[day]["breaks"]
+                breaks = data["breaks"]
                 valid_breaks = True
                 if (len(breaks) % 2) != 0:
                     valid_breaks = False
@@ -49,17 +154,38 @@ class PlausibilityChecker:
                         )
                     )
 
+                # A break may only span midnight if the work does
+                overnight = self.allow_overnight_shifts and (
+                    parsed_day.end is None
+                    or parsed_day.start is None
+                    or parsed_day.start > parsed_day.end
+                )
+                break_values = []
                 if valid_breaks:
                     for i in range(0, len(breaks), 2):
-                        breaks_chunk = breaks[i : i + 2]
-                        dt_break_start = self.dth.datetime_str_to_datetime(
-                            f"{day} {breaks_chunk[0]}"
+                        self.__parsed(
+                            parsed_day.ordinal, self.dth.date_str_to_ordinal, day
+                        )
+                        break_start = self.__parsed(
+                            parsed_day.breaks[i],
+                            self.dth.time_str_to_minutes,
+                            breaks[i],
                         )
-                        dt_break_end = self.dth.datetime_str_to_datetime(
-                            f"{day} {breaks_chunk[1]}"
+                        break_end = self.__parsed(
+                            parsed_day.breaks[i + 1],
+                            self.dth.time_str_to_minutes,
+                            breaks[i + 1],
                         )
 
-                        if dt_break_start > dt_break_end:
+                        break_values.extend((break_start, break_end))
+                        if break_start > break_end and not overnight:
+                            valid_breaks = False
+                            dt_break_start = self.dth.datetime_str_to_datetime(
+                                f"{day} {breaks[i]}"
+                            )
+                            dt_break_end = self.dth.datetime_str_to_datetime(
+                                f"{day} {breaks[i + 1]}"
+                            )
                             errors.append(
                                 self.__create_error(
                                     day,
@@ -67,10 +193,25 @@ class PlausibilityChecker:
                                 )
                             )
 
+                if valid_breaks and len(break_values) > 0:
+                    sequence = (
+                        [work_start, *break_values, work_end]
+                        if work_start is not None
+                        else break_values
+                    )
+                    # Breaks in order within start and end can not overlap, the
+                    # interval engine only runs for the others (e.g. overnight)
+                    if sequence != sorted(sequence):
+                        errors.extend(
+                            self.__interval_errors(
+                                day, work_start, work_end, break_values
+                            )
+                        )
+
         if len(errors) == 0:
             self.logger.info("Report is valid.")
-            return True, []
+            return True, [], parsed_days
         error_msg = f"Report has the following errors:\n{errors}"
         self.logger.error(error_msg)
 
-        return False, errors
+        return False, errors, parsed_days
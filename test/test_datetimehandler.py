@@ -0,0 +1,62 @@
+import unittest
+import datetime
+from src.util.datetimehandler import DateTimeHandler
+
+
+class TestDateTimeHandler(unittest.TestCase):
+    def setUp(self):
+        self.dth = DateTimeHandler()
+        self.dth.clear_parse_cache()
+
+    def test_time_str_to_minutes(self):
+        self.assertEqual(self.dth.time_str_to_minutes("00:00"), 0)
+        self.assertEqual(self.dth.time_str_to_minutes("07:11"), 431)
+        self.assertEqual(self.dth.time_str_to_minutes("23:59"), 1439)
+
+    def test_time_str_to_minutes_invalid(self):
+        for time_str in ["", "7", "24:00", "12:60", "ab:cd", "12:345", "12.30"]:
+            with self.assertRaises(ValueError):
+                self.dth.time_str_to_minutes(time_str)
+
+    def test_date_str_to_ordinal(self):
+        self.assertEqual(
+            self.dth.date_str_to_ordinal("01.02.2023"),
+            datetime.date(2023, 2, 1).toordinal(),
+        )
+        self.assertEqual(
+            self.dth.ordinal_to_datetime(self.dth.date_str_to_ordinal("29.02.2024")),
+            datetime.datetime(2024, 2, 29),
+        )
+
+    def test_date_str_to_ordinal_invalid(self):
+        for date_str in ["", "01.02", "29.02.2023", "01.13.2023", "01.02.23"]:
+            with self.assertRaises(ValueError):
+                self.dth.date_str_to_ordinal(date_str)
+
+    def test_datetime_diff_in_minutes(self):
+        start = datetime.datetime(2023, 2, 1, 22, 0)
+        self.assertEqual(
+            self.dth.datetime_diff_in_minutes(
+                start, datetime.datetime(2023, 2, 2, 6, 30)
+            ),
+            510,
+        )
+        # Not wrapped around a day
+        self.assertEqual(
+            self.dth.datetime_diff_in_minutes(
+                start, datetime.datetime(2023, 2, 1, 21, 0)
+            ),
+            -60,
+        )
+
+    def test_parse_cache_info(self):
+        for _ in range(3):
+            self.dth.time_str_to_minutes("08:15")
+        info = self.dth.parse_cache_info()["time"]
+        self.assertEqual(info["misses"], 1)
+        self.assertEqual(info["hits"], 2)
+        self.assertEqual(info["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import json
+import os
+import tempfile
+from glob import glob
+import pandas as pd
+from src.report.filehandler import MonthlyFileHandler, StatsExportFileHandler
+from src.report.storage_backend import (
+    JsonStorageBackend,
+    SqliteStorageBackend,
+    migrate,
+)
+from src.statistics.export_pipeline import ExportPipeline
+from src.statistics.stats_generator import StatsGenerator
+from src.validation.plausibility_checker import PlausibilityChecker
+
+
+class TestExportPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "work": {
+                "target_daily_work_minutes": 480,
+                "default_break_after_6h": 30,
+                "default_break_after_9h": 15,
+            },
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+                "archive_closed_months": True,
+                "manifest": True,
+            },
+            "export": {"executor": "thread", "max_workers": 0},
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        for month in range(1, 13):
+            self.__write_report(
+                f"{month}_2022.json",
+                {
+                    f"01.{month:02d}.2022": {
+                        "start": "08:00",
+                        "end": "16:00",
+                        "breaks": ["12:00", "12:30"] if month != 5 else ["12:00"],
+                        "comment": "",
+                    }
+                },
+            )
+        self.reports_paths = self.fh.sort_reports_paths(self.fh.list_reports_paths())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __write_report(self, filename: str, report: dict) -> None:
+        with open(self.fh.report_path_by_filename(filename), "w") as file:
+            file.write(json.dumps(report))
+
+    def __pipeline(
+        self, executor: str, allow_overnight_shifts: bool = False
+    ) -> ExportPipeline:
+        self.config["export"]["executor"] = executor
+        return ExportPipeline(
+            self.config,
+            self.fh,
+            PlausibilityChecker(allow_overnight_shifts=allow_overnight_shifts),
+            StatsGenerator(default_break_after_6h=30, default_break_after_9h=15),
+        )
+
+    def __run(self, executor: str):
+        return self.__pipeline(executor).run(self.reports_paths)
+
+    def test_sort_reports_paths(self):
+        self.assertEqual(
+            [self.fh.report_month(path) for path in self.reports_paths[:3]],
+            [(2022, 1), (2022, 2), (2022, 3)],
+        )
+
+    def test_run_keeps_order_and_collects_errors(self):
+        for executor in ["thread", "process"]:
+            reports_df_stats, reports_errors = self.__run(executor)
+            # Only the report of May has an uneven number of breaks
+            self.assertEqual(len(reports_df_stats), 11)
+            self.assertEqual(
+                [df_stats.iloc[0]["day"].month for df_stats in reports_df_stats],
+                [1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12],
+            )
+            self.assertEqual(len(reports_errors), 1)
+            self.assertTrue(reports_errors[0]["report"].endswith("5_2022.json"))
+
+    def test_run_refreshes_manifest(self):
+        pipeline = self.__pipeline("thread")
+        pipeline.run(self.reports_paths)
+        self.assertTrue(os.path.exists(pipeline.manifest.manifest_path))
+        # 12 months of 2022 and the (empty) current month
+        self.assertEqual(pipeline.manifest.last_summarized_reports, 13)
+
+        # The invalid month is answered by the manifest from now on
+        _, reports_errors = pipeline.run(self.reports_paths)
+        self.assertEqual(pipeline.manifest.last_summarized_reports, 0)
+        self.assertEqual(len(reports_errors), 1)
+        self.assertIsNotNone(
+            pipeline.manifest.fresh_entry(
+                self.fh.report_path_by_filename("5_2022.json")
+            )
+        )
+
+    def test_run_uses_archives_of_closed_months(self):
+        reports_df_stats, _ = self.__run("thread")
+        archives = glob(f"{self.tmp_dir.name}/*.npy")
+        # Every valid closed month got an archive
+        self.assertEqual(len(archives), 11)
+
+        # The archives are used ...
+        archived_df_stats, _ = self.__run("process")
+        for df_stats, archived in zip(reports_df_stats, archived_df_stats):
+            pd.testing.assert_frame_equal(df_stats, archived)
+
+        # ... until the JSON changes
+        self.__write_report(
+            "1_2022.json",
+            {
+                "03.01.2022": {
+                    "start": "08:00",
+                    "end": "09:00",
+                    "breaks": [],
+                    "comment": "",
+                }
+            },
+        )
+        reports_df_stats, _ = self.__run("thread")
+        self.assertEqual(reports_df_stats[0].iloc[0]["total_work_without_break"], 60)
+        self.assertEqual(len(glob(f"{self.tmp_dir.name}/*.npy")), 11)
+
+    def test_archives_are_regenerated_for_other_break_rules(self):
+        self.__run("thread")
+        archives = set(glob(f"{self.tmp_dir.name}/*.npy"))
+        self.assertEqual(len(archives), 11)
+
+        pipeline = ExportPipeline(
+            self.config,
+            self.fh,
+            PlausibilityChecker(),
+            StatsGenerator(default_break_after_6h=45, default_break_after_9h=15),
+        )
+        pipeline.run(self.reports_paths)
+        regenerated = set(glob(f"{self.tmp_dir.name}/*.npy"))
+        # The archives of the old rules are replaced
+        self.assertEqual(len(regenerated), 11)
+        self.assertTrue(archives.isdisjoint(regenerated))
+
+    def test_archives_are_regenerated_for_other_validation(self):
+        # Only valid if overnight shifts are allowed
+        self.__write_report(
+            "5_2022.json",
+            {
+                "01.05.2022": {
+                    "start": "22:00",
+                    "end": "06:00",
+                    "breaks": ["23:50", "00:10"],
+                    "comment": "",
+                }
+            },
+        )
+        pipeline = self.__pipeline("thread", allow_overnight_shifts=True)
+        _, reports_errors = pipeline.run(self.reports_paths)
+        self.assertEqual(reports_errors, [])
+        self.assertEqual(len(glob(f"{self.tmp_dir.name}/*.npy")), 12)
+
+        _, reports_errors = self.__run("thread")
+        self.assertEqual(len(reports_errors), 1)
+        self.assertTrue(reports_errors[0]["report"].endswith("5_2022.json"))
+
+    def test_stream_storage(self):
+        reports_df_stats, _ = self.__run("thread")
+        storage = SqliteStorageBackend(
+            os.path.join(self.tmp_dir.name, "pytimetrack.sqlite")
+        )
+        try:
+            migrate(JsonStorageBackend(self.fh), storage)
+            for executor in ["thread", "process"]:
+                reports_errors = []
+                sqlite_df_stats = list(
+                    self.__pipeline(executor).stream_storage(storage, reports_errors)
+                )
+                for df_stats, sqlite in zip(reports_df_stats, sqlite_df_stats):
+                    pd.testing.assert_frame_equal(df_stats, sqlite)
+                self.assertEqual(len(sqlite_df_stats), 11)
+                self.assertEqual(
+                    [report_errors["report"] for report_errors in reports_errors],
+                    ["5_2022.json"],
+                )
+        finally:
+            storage.close()
+
+    def test_stream_stats_export(self):
+        efh = StatsExportFileHandler(self.config)
+        reports_errors = []
+        written_before_last_month = []
+
+        def months():
+            for df_stats in self.__pipeline("thread").stream(
+                self.reports_paths, reports_errors
+            ):
+                if df_stats.iloc[0]["day"].month == 12:
+                    with open(glob(f"{self.tmp_dir.name}/*.md")[0], "r") as file:
+                        written_before_last_month.append(file.read())
+                yield df_stats
+
+        report_path = efh.stream_stats_export(months())
+        with open(report_path, "r") as file:
+            markdown = file.read()
+
+        # Earlier months are on disk while later ones are still produced
+        self.assertIn("# November 2022", written_before_last_month[0])
+        self.assertNotIn("# December 2022", written_before_last_month[0])
+        self.assertIn("|01.01.2022|7h 30min|0h 30min|", markdown)
+        self.assertNotIn("# May 2022", markdown)
+        self.assertEqual(len(reports_errors), 1)
+        # The table of contents comes last
+        self.assertTrue(
+            markdown.endswith(
+                "* [November 2022](#november-2022)\n* [December 2022](#december-2022)\n"
+            )
+        )
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            self.__run("gpu")
+
+
+if __name__ == "__main__":
+    unittest.main()
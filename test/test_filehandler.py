@@ -0,0 +1,177 @@
+import unittest
+import json
+import multiprocessing
+import os
+import tempfile
+from src.report.filehandler import MonthlyFileHandler
+
+COUNTER_DAY = "01.02.2023"
+
+
+def _increment_counter(config: dict, increments: int) -> None:
+    """Counts up the comment of a day, each time with a read-modify-write of the report"""
+    fh = MonthlyFileHandler(config)
+    for _ in range(increments):
+        with fh.lock_current_report():
+            report = fh.read_current_report()
+            day = report.setdefault(
+                COUNTER_DAY, {"start": "", "end": "", "breaks": [], "comment": "0"}
+            )
+            day["comment"] = str(int(day["comment"]) + 1)
+            fh.write_current_report(report)
+
+
+class TestMonthlyFileHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": True,
+                "journal_compact_threshold": 3,
+                "report_cache_size": 2,
+            },
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        self.report_path = self.fh.report_path_by_filename(
+            self.fh.current_report_filename()
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __read_json(self, path: str) -> dict:
+        with open(path, "r") as file:
+            return json.load(file)
+
+    def test_journal_appends_changed_days_only(self):
+        report = self.fh.read_current_report()
+        report["01.02.2023"] = {
+            "start": "07:11",
+            "end": "",
+            "breaks": [],
+            "comment": "",
+        }
+        self.fh.write_current_report(report)
+        report["01.02.2023"]["end"] = "15:47"
+        self.fh.write_current_report(report)
+
+        with open(self.fh.journal_path(self.report_path), "r") as file:
+            self.assertEqual(len(file.readlines()), 2)
+        # The monthly JSON stays untouched until compaction
+        self.assertEqual(self.__read_json(self.report_path), {})
+        self.assertEqual(self.fh.read_current_report(), report)
+
+    def test_journal_skips_torn_event(self):
+        report = {
+            "01.02.2023": {"start": "07:11", "end": "", "breaks": [], "comment": ""}
+        }
+        self.fh.write_current_report(report)
+        with open(self.fh.journal_path(self.report_path), "a") as file:
+            file.write('{"day": "01.02.2023", "data": {"sta')
+        self.assertEqual(self.fh.read_current_report(), report)
+
+    def test_journal_compaction(self):
+        report = {}
+        for day in range(1, 4):
+            report[f"0{day}.02.2023"] = {
+                "start": "07:11",
+                "end": "15:47",
+                "breaks": [],
+                "comment": "",
+            }
+            self.fh.write_current_report(report)
+
+        self.assertFalse(os.path.exists(self.fh.journal_path(self.report_path)))
+        self.assertEqual(self.__read_json(self.report_path), report)
+
+    def test_journal_compacted_on_start(self):
+        report = {
+            "01.02.2023": {"start": "07:11", "end": "", "breaks": [], "comment": ""}
+        }
+        self.fh.write_current_report(report)
+        MonthlyFileHandler(self.config)
+        self.assertFalse(os.path.exists(self.fh.journal_path(self.report_path)))
+        self.assertEqual(self.__read_json(self.report_path), report)
+
+    def test_current_report_not_prepared(self):
+        report = {
+            "01.02.2023": {"start": "07:11", "end": "", "breaks": [], "comment": ""}
+        }
+        self.fh.write_current_report(report)
+        os.remove(self.report_path)
+        MonthlyFileHandler(self.config, prepare_current_report=False)
+        # Neither created nor compacted, e.g. with the "sqlite" storage backend
+        self.assertFalse(os.path.exists(self.report_path))
+        self.assertTrue(os.path.exists(self.fh.journal_path(self.report_path)))
+
+    def test_report_cache_hit(self):
+        report = self.fh.read_current_report()
+        report["01.02.2023"] = {
+            "start": "07:11",
+            "end": "",
+            "breaks": [],
+            "comment": "",
+        }
+        # Modifying a returned report must not change the cached one
+        self.assertEqual(self.fh.read_current_report(), {})
+        self.assertEqual(self.fh.cache_hits, 1)
+
+    def test_report_cache_invalidated_by_manual_edit(self):
+        self.fh.read_current_report()
+        report = {
+            "01.02.2023": {"start": "07:11", "end": "", "breaks": [], "comment": ""}
+        }
+        with open(self.report_path, "w") as file:
+            file.write(json.dumps(report, indent=4))
+        self.assertEqual(self.fh.read_current_report(), report)
+        self.assertEqual(self.fh.cache_hits, 0)
+
+    def test_identical_write_skipped(self):
+        self.config["storage"]["journal"] = False
+        fh = MonthlyFileHandler(self.config)
+        report = {
+            COUNTER_DAY: {"start": "07:11", "end": "", "breaks": [], "comment": ""}
+        }
+        fh.write_current_report(report)
+        signature = fh.file_signature(self.report_path)
+        fh.write_current_report(report)
+        self.assertEqual(fh.file_signature(self.report_path), signature)
+        report[COUNTER_DAY]["end"] = "15:00"
+        fh.write_current_report(report)
+        self.assertNotEqual(fh.file_signature(self.report_path), signature)
+        self.assertEqual(self.__read_json(self.report_path), report)
+        # Written atomically, no temporary files remain
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.tmp_dir.name) if ".tmp" in name),
+            [],
+        )
+
+    def test_concurrent_writers(self):
+        processes, increments = 6, 20
+        for journal in (False, True):
+            with self.subTest(journal=journal):
+                with open(self.report_path, "w") as file:
+                    file.write("{}")
+                self.config["storage"]["journal"] = journal
+                workers = [
+                    multiprocessing.Process(
+                        target=_increment_counter, args=(self.config, increments)
+                    )
+                    for _ in range(processes)
+                ]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                    self.assertEqual(worker.exitcode, 0)
+
+                report = MonthlyFileHandler(self.config).read_current_report()
+                self.assertEqual(
+                    report[COUNTER_DAY]["comment"], str(processes * increments)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
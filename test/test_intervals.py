@@ -0,0 +1,78 @@
+import unittest
+import random
+import numpy as np
+from src.util.intervals import (
+    DayIntervals,
+    merge,
+    merged_break_minutes,
+    overlaps,
+    unwrap,
+)
+
+
+class TestIntervals(unittest.TestCase):
+    def test_unwrap(self):
+        self.assertEqual(unwrap(480, 720), 720)
+        # After midnight continues the day of the reference
+        self.assertEqual(unwrap(1320, 60), 1500)
+        self.assertEqual(unwrap(480, 480), 480)
+
+    def test_merge(self):
+        self.assertEqual(
+            merge([(60, 90), (0, 30), (30, 45), (70, 80)]), [(0, 45), (60, 90)]
+        )
+        self.assertEqual(merge([]), [])
+
+    def test_overlaps(self):
+        self.assertEqual(overlaps([(0, 30), (30, 60)]), [])
+        self.assertEqual(
+            overlaps([(50, 70), (0, 100), (120, 130), (90, 125)]),
+            [((0, 100), (50, 70)), ((0, 100), (90, 125)), ((90, 125), (120, 130))],
+        )
+
+    def test_day_intervals(self):
+        # 22:00-06:00 with breaks 23:30-00:15 and 02:00-02:30
+        intervals = DayIntervals.from_minutes(1320, 360, (1410, 15, 120, 150))
+        self.assertEqual(intervals.work, (1320, 1800))
+        self.assertEqual(intervals.breaks, ((1410, 1455), (1560, 1590)))
+        self.assertEqual(intervals.break_minutes(), 75)
+        self.assertEqual(intervals.net_work_minutes(), 405)
+        self.assertEqual(intervals.overlapping_breaks(), [])
+        self.assertEqual(intervals.breaks_outside_work(), [])
+
+    def test_day_intervals_overlapping_and_outside(self):
+        # 08:00-12:00, breaks 09:00-10:00, 09:30-10:30 and 11:30-12:30
+        intervals = DayIntervals.from_minutes(480, 720, (540, 600, 570, 630, 690, 750))
+        self.assertEqual(len(intervals.overlapping_breaks()), 1)
+        self.assertEqual(intervals.breaks_outside_work(), [(690, 750)])
+        # 09:00-10:30 and 11:30-12:00 within the work
+        self.assertEqual(intervals.break_minutes(), 120)
+
+    def test_merged_break_minutes_matches_day_intervals(self):
+        rnd = random.Random(7)
+        days = []
+        for _ in range(200):
+            start, end = rnd.randrange(1440), rnd.randrange(1440)
+            breaks = tuple(rnd.randrange(1440) for _ in range(2 * rnd.randrange(4)))
+            days.append((start, end, breaks))
+        owners = np.repeat(
+            np.arange(len(days)), [len(breaks) // 2 for _, _, breaks in days]
+        )
+        bounds = np.array(
+            [b for _, _, breaks in days for b in breaks], dtype=np.int64
+        ).reshape(-1, 2)
+        break_minutes = merged_break_minutes(
+            owners,
+            bounds[:, 0],
+            bounds[:, 1],
+            np.array([start for start, _, _ in days], dtype=np.int64),
+            np.array([end for _, end, _ in days], dtype=np.int64),
+        )
+        self.assertEqual(
+            list(break_minutes),
+            [DayIntervals.from_minutes(*day).break_minutes() for day in days],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import threading
+from src.ui.job_executor import JobExecutor
+
+
+class TestJobExecutor(unittest.TestCase):
+    def setUp(self):
+        self.notifications = []
+        self.jobs = JobExecutor(slow_workers=1, notify=self.notifications.append)
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+    def test_fast_lane_does_not_wait_for_slow_lane(self):
+        release_export = threading.Event()
+        export = self.jobs.submit("Export", lambda: release_export.wait(5))
+        track = self.jobs.submit(
+            "Track", lambda: None, lane=JobExecutor.LANE_FAST, coalesce=False
+        )
+        track.result(timeout=5)
+        self.assertFalse(export.done())
+        release_export.set()
+        export.result(timeout=5)
+
+    def test_identical_pending_jobs_are_coalesced(self):
+        release = threading.Event()
+        runs = []
+
+        def export():
+            release.wait(5)
+            runs.append("export")
+
+        first = self.jobs.submit("Export", export)
+        second = self.jobs.submit("Export", export)
+        self.assertIs(first, second)
+        self.assertEqual(self.jobs.coalesced_jobs, 1)
+        release.set()
+        first.result(timeout=5)
+        # Once finished, the job runs again on the next click
+        self.jobs.submit("Export", export).result(timeout=5)
+        self.assertEqual(runs, ["export", "export"])
+
+    def test_tracking_clicks_are_not_coalesced(self):
+        clicks = []
+        futures = [
+            self.jobs.submit(
+                "Track",
+                lambda i=i: clicks.append(i),
+                lane=JobExecutor.LANE_FAST,
+                coalesce=False,
+            )
+            for i in range(3)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(clicks, [0, 1, 2])
+
+    def test_notifications(self):
+        self.jobs.submit("Export", lambda: None, announce=True).result(timeout=5)
+        self.assertEqual(self.notifications[0], "Export started ...")
+        self.assertTrue(self.notifications[1].startswith("Export finished after"))
+
+        def broken():
+            raise OSError("disk full")
+
+        self.jobs.submit("Show Month", broken).result(timeout=5)
+        self.assertEqual(self.notifications[2], "Show Month failed: disk full")
+
+
+if __name__ == "__main__":
+    unittest.main()
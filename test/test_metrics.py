@@ -0,0 +1,89 @@
+import unittest
+import json
+import os
+import tempfile
+from src.report.filehandler import MonthlyFileHandler
+from src.validation.plausibility_checker import PlausibilityChecker
+
+# The instance shared with the modules under test, which import "util.metrics"
+from util.metrics import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metrics_path = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        self.config = {
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+            },
+            "development": {"devmode": False},
+        }
+
+    def tearDown(self):
+        metrics.configure(False)
+        self.tmp_dir.cleanup()
+
+    def __events(self) -> list[dict]:
+        with open(self.metrics_path, "r") as file:
+            return [json.loads(line) for line in file]
+
+    def test_stages_and_counters(self):
+        metrics.configure(True, self.metrics_path)
+        fh = MonthlyFileHandler(self.config)
+        report = {
+            "01.02.2023": {"start": "08:00", "end": "", "breaks": [], "comment": ""}
+        }
+        fh.write_current_report(report)
+        # The first read is a cache hit of the write, the second one reads the changed file
+        fh.read_current_report()
+        with open(
+            fh.report_path_by_filename(fh.current_report_filename()), "a"
+        ) as file:
+            file.write(" ")
+        PlausibilityChecker().validate(fh.read_current_report())
+        metrics.write_summary()
+
+        events = self.__events()
+        stages = [event["stage"] for event in events if event["type"] == "timer"]
+        self.assertEqual(
+            stages, ["write_report", "read_report", "read_report", "validate"]
+        )
+        summary = events[-1]
+        self.assertEqual(summary["type"], "summary")
+        self.assertEqual(summary["counters"]["files_written"], 1)
+        self.assertEqual(summary["counters"]["files_read"], 1)
+        self.assertEqual(summary["counters"]["report_cache_hits"], 1)
+        self.assertEqual(
+            summary["counters"]["bytes_read"],
+            summary["counters"]["bytes_written"] + 1,
+        )
+        self.assertEqual(summary["histograms"]["read_report"]["count"], 2)
+
+    def test_histogram_percentiles(self):
+        metrics.configure(True)
+        for ms in range(1, 101):
+            metrics.record("render", ms / 1000)
+        histogram = metrics.histogram("render")
+        self.assertEqual(histogram["count"], 100)
+        self.assertAlmostEqual(histogram["p50"], 50)
+        self.assertAlmostEqual(histogram["p95"], 95)
+        self.assertAlmostEqual(histogram["p99"], 99)
+        self.assertIsNone(metrics.histogram("unknown"))
+
+    def test_disabled(self):
+        metrics.configure(False, self.metrics_path)
+        # The same no-op timer every time, nothing is recorded or written
+        self.assertIs(metrics.timer("read_report"), metrics.timer("validate"))
+        with metrics.timer("read_report"):
+            metrics.count("files_read")
+        metrics.write_summary()
+        self.assertEqual(metrics.snapshot(), {"counters": {}, "histograms": {}})
+        self.assertFalse(os.path.exists(self.metrics_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import json
+import tempfile
+import tracemalloc
+import pandas as pd
+from benchmarks.synthetic_reports import generate_reports
+from src.report.filehandler import MonthlyFileHandler
+from src.statistics.stats_generator import StatsGenerator
+from src.tracking.tracker import TimeTracker
+from src.validation.plausibility_checker import PlausibilityChecker
+
+# The class the modules under test check with isinstance, which import "model.month_report"
+from model.month_report import MonthReport
+
+
+class TestMonthReport(unittest.TestCase):
+    def setUp(self):
+        self.report = {
+            "01.02.2023": {
+                "start": "07:11",
+                "end": "15:47",
+                "breaks": ["08:12", "09:43"],
+                "comment": "qweqwe",
+            },
+            # Manually edited, can not be stored as integers losslessly
+            "02.02.2023": {
+                "start": "7:11",
+                "end": "15:47",
+                "breaks": [],
+                "comment": "",
+            },
+            "03.02.2023": {
+                "start": "06:49",
+                "end": "",
+                "breaks": ["14:41"],
+                "comment": "",
+            },
+        }
+
+    def test_lossless_conversion(self):
+        month_report = MonthReport.from_report(self.report)
+        self.assertEqual(len(month_report.raw_days), 1)
+        self.assertEqual(month_report.to_report(), self.report)
+        self.assertEqual(
+            list(month_report.to_report().keys()), list(self.report.keys())
+        )
+
+    def test_set_day(self):
+        month_report = MonthReport.from_report(self.report)
+        data = month_report["01.02.2023"]
+        data["breaks"].extend(["10:00", "10:15"])
+        month_report["01.02.2023"] = data
+        month_report["02.02.2023"] = {
+            "start": "07:11",
+            "end": "15:47",
+            "breaks": [],
+            "comment": "",
+        }
+        self.report["01.02.2023"] = data
+        self.report["02.02.2023"]["start"] = "07:11"
+        self.assertEqual(len(month_report.raw_days), 0)
+        self.assertEqual(month_report.to_report(), self.report)
+        self.assertEqual(month_report["03.02.2023"]["breaks"], ["14:41"])
+
+    def test_accepted_by_tracker(self):
+        month_report, _ = TimeTracker().track(MonthReport.from_report(self.report))
+        today_str, today_data = TimeTracker().get_today(month_report)
+        self.assertIn(today_str, month_report)
+        self.assertNotEqual(today_data["start"], "")
+        month_report, _ = TimeTracker().work_break(month_report)
+        self.assertEqual(len(month_report[today_str]["breaks"]), 1)
+
+    def test_accepted_by_validation_and_statistics(self):
+        del self.report["03.02.2023"]
+        month_report = MonthReport.from_report(self.report)
+        pc = PlausibilityChecker()
+        self.assertEqual(pc.validate(month_report), pc.validate(self.report))
+        statsgen = StatsGenerator(default_break_after_6h=30, default_break_after_9h=15)
+        pd.testing.assert_frame_equal(
+            statsgen.daily_worked_minutes(month_report, target_daily_work_minutes=480),
+            statsgen.daily_worked_minutes(self.report, target_daily_work_minutes=480),
+        )
+
+    def test_read_and_write(self):
+        with tempfile.TemporaryDirectory() as reports_dir:
+            fh = MonthlyFileHandler(
+                {
+                    "paths": {"reports": reports_dir},
+                    "storage": {
+                        "journal": False,
+                        "journal_compact_threshold": 50,
+                        "report_cache_size": 0,
+                    },
+                    "development": {"devmode": False},
+                }
+            )
+            report_path = fh.report_path_by_filename("2_2023.json")
+            fh.write_report(report_path, MonthReport.from_report(self.report))
+            month_report = fh.read_report(report_path, as_month_report=True)
+            self.assertIsInstance(month_report, MonthReport)
+            self.assertEqual(month_report.to_report(), self.report)
+            self.assertEqual(fh.read_report(report_path), self.report)
+
+    def test_memory(self):
+        reports = list(generate_reports(years=2, breaks_per_day=2).values())
+        # Fill the (bounded) parse caches before measuring
+        month_reports = [MonthReport.from_report(r) for r in reports]
+        serialized_reports = json.dumps(reports)
+        tracemalloc.start()
+        dict_reports = json.loads(serialized_reports)
+        dict_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        month_reports = [MonthReport.from_report(r) for r in reports]
+        month_report_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.assertLess(month_report_memory * 5, dict_memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
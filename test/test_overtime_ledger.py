@@ -0,0 +1,178 @@
+import unittest
+import json
+import os
+import tempfile
+from datetime import date
+from src.report.filehandler import MonthlyFileHandler
+from src.report.storage_backend import (
+    JsonStorageBackend,
+    SqliteStorageBackend,
+    migrate,
+)
+from src.statistics.overtime_ledger import OvertimeLedger
+from src.statistics.stats_generator import StatsGenerator
+from src.validation.plausibility_checker import PlausibilityChecker
+
+
+def day(start: str, end: str, breaks: list = []) -> dict:
+    return {"start": start, "end": end, "breaks": breaks, "comment": ""}
+
+
+class TestOvertimeLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "work": {
+                "target_daily_work_minutes": 480,
+                "default_break_after_6h": 30,
+                "default_break_after_9h": 15,
+            },
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+                "archive_closed_months": True,
+                "manifest": True,
+            },
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        self.__write_report(
+            "1_2022.json",
+            {
+                # Monday to Wednesday: 0, +75 and -240 minutes (with the default breaks)
+                "03.01.2022": day("08:00", "16:30", ["12:00", "12:30"]),
+                "04.01.2022": day("08:00", "18:00"),
+                "05.01.2022": day("08:00", "12:00"),
+            },
+        )
+        self.__write_report(
+            "2_2022.json",
+            {"01.02.2022": day("08:00", "17:00", ["12:00", "12:30"])},
+        )
+        self.ledger = self.__ledger()
+        self.ledger.refresh()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __ledger(self, storage=None) -> OvertimeLedger:
+        return OvertimeLedger(
+            self.config,
+            self.fh,
+            PlausibilityChecker(),
+            StatsGenerator(default_break_after_6h=30, default_break_after_9h=15),
+            storage=storage,
+        )
+
+    def __write_report(self, filename: str, report: dict) -> None:
+        with open(self.fh.report_path_by_filename(filename), "w") as file:
+            file.write(json.dumps(report))
+
+    def test_balances(self):
+        self.assertEqual(self.ledger.total(), 75 - 240 + 15)
+        self.assertEqual(self.ledger.balance(date(2022, 1, 4), date(2022, 1, 4)), 75)
+        self.assertEqual(self.ledger.balance(date(2022, 1, 4), date(2022, 2, 28)), -150)
+        # Ranges outside of the tracked days
+        self.assertEqual(self.ledger.balance(date(2021, 1, 1), date(2030, 1, 1)), -150)
+        self.assertEqual(self.ledger.balance(date(2023, 1, 1), date(2023, 2, 1)), 0)
+        self.assertEqual(self.ledger.balance(date(2022, 1, 5), date(2022, 1, 4)), 0)
+        self.assertEqual(self.ledger.to_date(date(2022, 1, 4), "week"), 75)
+        self.assertEqual(self.ledger.to_date(date(2022, 2, 10), "month"), 15)
+        self.assertEqual(self.ledger.to_date(date(2022, 2, 10), "year"), -150)
+        self.assertEqual(
+            self.ledger.rollup("month"),
+            [(date(2022, 1, 1), -165), (date(2022, 2, 1), 15)],
+        )
+        self.assertEqual(self.ledger.rollup("year"), [(date(2022, 1, 1), -150)])
+        self.assertEqual(len(self.ledger.rollup("week")), 5)
+        with self.assertRaises(ValueError):
+            self.ledger.rollup("decade")
+
+    def test_sqlite_storage(self):
+        storage = SqliteStorageBackend(
+            os.path.join(self.tmp_dir.name, "pytimetrack.sqlite")
+        )
+        try:
+            migrate(JsonStorageBackend(self.fh), storage)
+            # The JSON reports are not used
+            os.remove(self.fh.report_path_by_filename("2_2022.json"))
+            ledger = self.__ledger(storage)
+            ledger.refresh()
+            self.assertEqual(ledger.total(), self.ledger.total())
+
+            storage.upsert_day("05.01.2022", day("08:00", "16:00"))
+            ledger.refresh()
+            self.assertEqual(ledger.total(), 75 - 30 + 15)
+        finally:
+            storage.close()
+
+    def test_incremental_update_on_write(self):
+        report_path = self.fh.report_path_by_filename("1_2022.json")
+        report = self.fh.read_report(report_path)
+        report["05.01.2022"] = day("08:00", "16:00")
+        self.fh.write_report(report_path, report)
+        # The write only marks the report stale
+        self.assertEqual(self.ledger.total(), 75 - 240 + 15)
+        self.ledger.refresh()
+        # Only the prefix sums from the changed day on are recomputed
+        self.assertEqual(
+            self.ledger.last_recomputed_days,
+            (date(2022, 2, 1) - date(2022, 1, 5)).days + 1,
+        )
+        self.assertEqual(self.ledger.total(), 75 - 30 + 15)
+
+        # Equal to building the ledger from scratch
+        ledger = self.__ledger()
+        ledger.refresh()
+        self.assertEqual(ledger.rollup("week"), self.ledger.rollup("week"))
+
+    def test_open_day_is_skipped(self):
+        today = date.today()
+        # A running break today, which is not ended yet
+        self.__write_report(
+            self.fh.report_filename(today.year, today.month),
+            {today.strftime("%d.%m.%Y"): day("08:00", "", ["12:00"])},
+        )
+        self.ledger.refresh()
+        self.assertEqual(self.ledger.total(), 75 - 240 + 15)
+        self.assertEqual(self.ledger.invalid_reports, set())
+
+    def test_refresh_detects_manual_changes(self):
+        # A new earliest month, an invalid month and an unchanged month
+        self.__write_report("12_2021.json", {"31.12.2021": day("08:00", "10:00")})
+        self.__write_report(
+            "2_2022.json", {"01.02.2022": day("08:00", "17:00", ["12:00"])}
+        )
+        self.ledger.refresh()
+        self.assertEqual(self.ledger.total(), -360 + 75 - 240)
+        self.assertEqual(self.ledger.to_date(date(2021, 12, 31), "month"), -360)
+        self.assertEqual(len(self.ledger.invalid_reports), 1)
+        self.assertTrue(list(self.ledger.invalid_reports)[0].endswith("2_2022.json"))
+
+    def test_unparsable_reports_are_skipped(self):
+        with open(self.fh.report_path_by_filename("3_2022.json"), "w") as file:
+            file.write('{"01.03.2022": {"start"')
+        self.__write_report(
+            "4_2022.json", {"01.04.2022": day("08:00", "17:00", ["12 Uhr", "13:00"])}
+        )
+        self.ledger.refresh()
+        # Only the valid months count
+        self.assertEqual(self.ledger.total(), 75 - 240 + 15)
+        self.assertEqual(len(self.ledger.invalid_reports), 2)
+        self.assertEqual(
+            sorted(len(errors) for errors in self.ledger.report_errors.values()),
+            [1, 1],
+        )
+
+        # Fixed manually
+        self.__write_report("3_2022.json", {})
+        os.remove(self.fh.report_path_by_filename("4_2022.json"))
+        self.ledger.refresh()
+        self.assertEqual(self.ledger.invalid_reports, set())
+        self.assertEqual(self.ledger.report_errors, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
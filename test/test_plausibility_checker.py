@@ -58,6 +58,74 @@ class TestStatsGenerator(unittest.TestCase):
         self.assertFalse(result)
         self.assertEqual(len(errors), 1)
 
+    def test_validate_overlapping_breaks(self):
+        report = {
+            "01.02.2023": {
+                "start": "07:00",
+                "end": "16:00",
+                "breaks": ["12:00", "12:30", "09:00", "11:00", "10:00", "10:15"],
+                "comment": "",
+            },
+            "02.02.2023": {
+                "start": "07:00",
+                "end": "16:00",
+                "breaks": ["12:00", "12:30", "12:20", "12:40"],
+                "comment": "",
+            },
+        }
+        result, errors = self.pc.validate(report)
+        self.assertFalse(result)
+        self.assertEqual(
+            [error["error"] for error in errors],
+            [
+                "Break 10:00-10:15 lies within break 09:00-11:00.",
+                "Breaks 12:00-12:30 and 12:20-12:40 overlap.",
+            ],
+        )
+
+    def test_validate_break_outside_work(self):
+        report = {
+            "01.02.2023": {
+                "start": "07:00",
+                "end": "12:00",
+                "breaks": ["06:30", "07:10", "11:50", "12:00"],
+                "comment": "",
+            }
+        }
+        result, errors = self.pc.validate(report)
+        self.assertFalse(result)
+        self.assertEqual(len(errors), 1)
+        self.assertIn("06:30-07:10", errors[0]["error"])
+        # Also without validating start and end themselves
+        result, errors = self.pc.validate(report, check_start_end=False)
+        self.assertFalse(result)
+        self.assertEqual(len(errors), 1)
+
+    def test_validate_overnight_shift(self):
+        report = {
+            "01.02.2023": {
+                "start": "22:00",
+                "end": "06:00",
+                "breaks": ["23:45", "00:15", "02:00", "02:30"],
+                "comment": "",
+            }
+        }
+        result, errors = self.pc.validate(report)
+        self.assertFalse(result)
+        # Start after end and the break over midnight
+        self.assertEqual(len(errors), 2)
+
+        result, errors = PlausibilityChecker(allow_overnight_shifts=True).validate(
+            report
+        )
+        self.assertTrue(result)
+        report["01.02.2023"]["breaks"] = ["05:45", "06:30"]
+        result, errors = PlausibilityChecker(allow_overnight_shifts=True).validate(
+            report
+        )
+        self.assertFalse(result)
+        self.assertEqual(len(errors), 1)
+
     def test_skip_check_start_end(self):
         report = {
             "01.02.2023": {
@@ -84,6 +152,23 @@ class TestStatsGenerator(unittest.TestCase):
         self.assertTrue(result)
         self.assertEqual(len(errors), 0)
 
+    def test_parse_and_validate(self):
+        report = {
+            "01.02.2023": {
+                "start": "07:11",
+                "end": "",
+                "breaks": ["08:12", "09:43"],
+                "comment": "",
+            }
+        }
+        result, errors, parsed_days = self.pc.parse_and_validate(report)
+        self.assertTrue(result)
+        self.assertEqual(len(errors), 0)
+        self.assertEqual(parsed_days[0].day, "01.02.2023")
+        self.assertEqual(parsed_days[0].start, 431)
+        self.assertIsNone(parsed_days[0].end)
+        self.assertEqual(parsed_days[0].breaks, (492, 583))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+import os
+import tempfile
+from src.report.filehandler import MonthlyFileHandler
+from src.report.report_importer import ReportImporter
+from src.validation.plausibility_checker import PlausibilityChecker
+
+
+class TestReportImporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+            },
+            "importer": {"chunk_rows": 2},
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        self.importer = ReportImporter(self.config, self.fh, PlausibilityChecker())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __write_input(self, filename: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir.name, filename)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def __report(self, year: int, month: int) -> dict:
+        return self.fh.read_report(
+            self.fh.report_path_by_filename(self.fh.report_filename(year, month))
+        )
+
+    def test_import_csv(self):
+        path = self.__write_input(
+            "import.csv",
+            "date;start;end;breaks;comment\n"
+            "01.02.2023;08:00;16:30;12:00-12:30;\n"
+            "2023-02-02;07:45:10;12:00;;Office\n"
+            "02.02.2023;13:00;17:10;15:00-15:10;Office\n"
+            "03.02.2023;17:00;08:00;;\n"
+            "broken;08:00;16:00;;\n"
+            "01.03.2023;09:00;17:00;;\n",
+        )
+        writes = []
+        self.fh.write_listeners.append(lambda path, report: writes.append(path))
+
+        summary = self.importer.import_file(path)
+
+        self.assertEqual(summary["rows"], 6)
+        self.assertEqual(summary["broken_rows"], 1)
+        self.assertEqual(summary["invalid_days"], 1)
+        self.assertEqual(summary["days"], 3)
+        self.assertEqual(summary["months"], 2)
+        self.assertGreater(summary["rows_per_second"], 0)
+        # The broken row and the invalid day in the same shape
+        self.assertEqual(
+            [error["day"] for error in summary["errors"]], [None, "03.02.2023"]
+        )
+        self.assertTrue(summary["errors"][0]["error"].startswith("Line 6: "))
+        # One write per month
+        self.assertEqual(len(writes), 2)
+        february = self.__report(2023, 2)
+        self.assertEqual(list(february.keys()), ["01.02.2023", "02.02.2023"])
+        self.assertEqual(
+            february["02.02.2023"],
+            {
+                "start": "07:45",
+                "end": "17:10",
+                "breaks": ["12:00", "13:00", "15:00", "15:10"],
+                "comment": "Office",
+            },
+        )
+        self.assertEqual(self.__report(2023, 3)["01.03.2023"]["end"], "17:00")
+
+    def test_import_overnight_csv(self):
+        importer = ReportImporter(
+            self.config, self.fh, PlausibilityChecker(allow_overnight_shifts=True)
+        )
+        path = self.__write_input(
+            "import.csv",
+            "date,start,end,breaks,comment\n"
+            "01.02.2023,22:00,02:00,,\n"
+            "02.02.2023,20:00,22:00,,\n"
+            "02.02.2023,22:30,01:30,00:00-00:15,\n",
+        )
+
+        summary = importer.import_file(path)
+
+        self.assertEqual(summary["invalid_days"], 0)
+        self.assertEqual(summary["days"], 2)
+        february = self.__report(2023, 2)
+        self.assertEqual(
+            february["01.02.2023"],
+            {"start": "22:00", "end": "02:00", "breaks": [], "comment": ""},
+        )
+        self.assertEqual(
+            february["02.02.2023"],
+            {
+                "start": "20:00",
+                "end": "01:30",
+                "breaks": ["22:00", "22:30", "00:00", "00:15"],
+                "comment": "",
+            },
+        )
+
+    def test_existing_days_are_kept(self):
+        existing = {
+            "02.02.2023": {"start": "09:00", "end": "", "breaks": [], "comment": ""}
+        }
+        self.fh.write_report(
+            self.fh.report_path_by_filename(self.fh.report_filename(2023, 2)),
+            existing,
+        )
+        path = self.__write_input(
+            "import.csv",
+            "date,start,end\n02.02.2023,08:00,16:00\n01.02.2023,08:00,16:00\n",
+        )
+
+        summary = self.importer.import_file(path)
+        self.assertEqual(summary["conflicting_days"], 1)
+        february = self.__report(2023, 2)
+        self.assertEqual(list(february.keys()), ["01.02.2023", "02.02.2023"])
+        self.assertEqual(february["02.02.2023"]["start"], "09:00")
+
+        self.importer.import_file(path, overwrite=True)
+        self.assertEqual(self.__report(2023, 2)["02.02.2023"]["end"], "16:00")
+
+    def test_import_ics(self):
+        path = self.__write_input(
+            "calendar.ics",
+            "BEGIN:VCALENDAR\r\n"
+            "BEGIN:VEVENT\r\n"
+            "DTSTART;TZID=Europe/Berlin:20230206T080000\r\n"
+            "DTEND;TZID=Europe/Berlin:20230206T120000\r\n"
+            "SUMMARY:Planning\\, part 1\r\n"
+            "END:VEVENT\r\n"
+            "BEGIN:VEVENT\r\n"
+            "DTSTART:20230206T123000\r\n"
+            "DTEND:20230206T163000\r\n"
+            "SUMMARY:Review of a very long\r\n"
+            "  summary\r\n"
+            "END:VEVENT\r\n"
+            "BEGIN:VEVENT\r\n"
+            "DTSTART;VALUE=DATE:20230207\r\n"
+            "END:VEVENT\r\n"
+            "END:VCALENDAR\r\n",
+        )
+
+        summary = self.importer.import_file(path)
+        self.assertEqual(summary["rows"], 3)
+        self.assertEqual(summary["broken_rows"], 1)
+        self.assertEqual(
+            self.__report(2023, 2)["06.02.2023"],
+            {
+                "start": "08:00",
+                "end": "16:30",
+                "breaks": ["12:00", "12:30"],
+                "comment": "Planning, part 1; Review of a very long summary",
+            },
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.importer.import_file("import.xlsx")
+
+
+if __name__ == "__main__":
+    unittest.main()
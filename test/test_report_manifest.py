@@ -0,0 +1,150 @@
+import unittest
+import json
+import os
+import tempfile
+from src.report.filehandler import MonthlyFileHandler
+from src.statistics.report_manifest import ReportManifest
+from src.statistics.stats_generator import StatsGenerator
+from src.validation.plausibility_checker import PlausibilityChecker
+
+
+class TestReportManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+                "manifest": True,
+            },
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        for month in range(1, 4):
+            self.__write_report(
+                f"{month}_2022.json",
+                {
+                    f"01.{month:02d}.2022": {
+                        "start": "08:00",
+                        "end": "16:00",
+                        "breaks": ["12:00", "12:30"] if month != 2 else ["12:00"],
+                        "comment": "",
+                    }
+                },
+            )
+        self.manifest = self.__manifest()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __manifest(self) -> ReportManifest:
+        return ReportManifest(
+            self.config,
+            self.fh,
+            PlausibilityChecker(),
+            StatsGenerator(default_break_after_6h=30, default_break_after_9h=15),
+        )
+
+    def __write_report(self, filename: str, report: dict) -> None:
+        with open(self.fh.report_path_by_filename(filename), "w") as file:
+            file.write(json.dumps(report))
+
+    def test_summaries(self):
+        entries = self.manifest.refresh()
+        # 3 months of 2022 and the (empty) current month
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(self.manifest.last_summarized_reports, 4)
+        self.assertEqual(entries[0]["days"], 1)
+        self.assertEqual(entries[0]["total_work_minutes"], 450)
+        self.assertEqual(entries[0]["total_break_minutes"], 30)
+        self.assertTrue(entries[0]["valid"])
+        self.assertFalse(entries[1]["valid"])
+        self.assertEqual(len(entries[1]["errors"]), 1)
+        self.assertEqual(self.manifest.totals(), (900, 60))
+
+    def test_unchanged_reports_are_not_read(self):
+        self.manifest.refresh()
+        # A new instance (e.g. after a restart) uses the stored manifest
+        manifest = self.__manifest()
+        self.assertEqual(len(manifest.refresh()), 4)
+        self.assertEqual(manifest.last_summarized_reports, 0)
+        self.assertIsNotNone(
+            manifest.fresh_entry(self.fh.report_path_by_filename("1_2022.json"))
+        )
+
+    def test_rebuilds_on_other_default_breaks(self):
+        self.manifest.refresh()
+        manifest = ReportManifest(
+            self.config,
+            self.fh,
+            PlausibilityChecker(),
+            StatsGenerator(default_break_after_6h=45, default_break_after_9h=15),
+        )
+        entries = manifest.refresh()
+        self.assertEqual(manifest.last_summarized_reports, 4)
+        self.assertEqual(entries[0]["total_break_minutes"], 45)
+
+    def test_updated_on_write(self):
+        self.manifest.refresh()
+        report_path = self.fh.report_path_by_filename("3_2022.json")
+        report = self.fh.read_report(report_path)
+        report["02.03.2022"] = {
+            "start": "08:00",
+            "end": "18:00",
+            "breaks": [],
+            "comment": "",
+        }
+        manifest_mtime = os.stat(self.manifest.manifest_path).st_mtime_ns
+        self.fh.write_report(report_path, report)
+        # A write only marks the entry, neither summarizing nor writing the manifest
+        self.assertIsNone(self.manifest.fresh_entry(report_path))
+        self.assertEqual(
+            os.stat(self.manifest.manifest_path).st_mtime_ns, manifest_mtime
+        )
+
+        entries = self.manifest.refresh()
+        self.assertEqual(self.manifest.last_summarized_reports, 1)
+        self.assertEqual(entries[2]["days"], 2)
+        # 10h with the default breaks of 30min and 15min
+        self.assertEqual(entries[2]["total_work_minutes"], 450 + 555)
+        self.assertEqual(self.manifest.fresh_entry(report_path), entries[2])
+        self.manifest.refresh()
+        self.assertEqual(self.manifest.last_summarized_reports, 0)
+
+    def test_rebuilds_stale_entries(self):
+        self.manifest.refresh()
+        # Manually fixed and removed reports
+        self.__write_report(
+            "2_2022.json",
+            {
+                "01.02.2022": {
+                    "start": "08:00",
+                    "end": "16:00",
+                    "breaks": ["12:00", "12:30"],
+                    "comment": "",
+                }
+            },
+        )
+        os.remove(self.fh.report_path_by_filename("3_2022.json"))
+        manifest = self.__manifest()
+        entries = manifest.refresh()
+        self.assertEqual(manifest.last_summarized_reports, 1)
+        self.assertEqual(len(entries), 3)
+        self.assertTrue(entries[1]["valid"])
+        self.assertEqual(manifest.totals(), (900, 60))
+
+    def test_rebuilds_broken_manifest(self):
+        self.manifest.refresh()
+        with open(self.manifest.manifest_path, "w") as file:
+            file.write('{"version": 1, "repo')
+        manifest = self.__manifest()
+        self.assertEqual(len(manifest.refresh()), 4)
+        self.assertEqual(manifest.last_summarized_reports, 4)
+        with open(manifest.manifest_path, "r") as file:
+            self.assertEqual(len(json.load(file)["reports"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+ANALYTICS_MODULES = ["numpy", "pandas", "matplotlib", "seaborn"]
+
+
+class TestStartupImports(unittest.TestCase):
+    def __loaded_analytics_modules(self, module: str) -> list:
+        # A fresh interpreter, as the tests themselves already imported e.g. numpy
+        script = (
+            "import json, sys\n"
+            f"sys.path.insert(0, {SRC_PATH!r})\n"
+            f"import {module}\n"
+            f"print(json.dumps([m for m in {ANALYTICS_MODULES!r} if m in sys.modules]))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout)
+
+    def test_tracking_does_not_load_analytics(self):
+        # Everything the tray imports besides pystray
+        for module in [
+            "tracking.tracker",
+            "validation.plausibility_checker",
+            "report.storage_backend",
+            "ui.job_executor",
+        ]:
+            with self.subTest(module=module):
+                self.assertEqual(self.__loaded_analytics_modules(module), [])
+
+    @unittest.skipIf(
+        importlib.util.find_spec("pystray") is None, "pystray is not installed"
+    )
+    def test_tray_does_not_load_analytics(self):
+        self.assertEqual(self.__loaded_analytics_modules("ui.tray_gui"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import datetime
+import pandas as pd
 from src.statistics.stats_generator import StatsGenerator
+from src.validation.plausibility_checker import PlausibilityChecker
 
 
 class TestStatsGenerator(unittest.TestCase):
@@ -73,6 +75,43 @@ class TestStatsGenerator(unittest.TestCase):
         self.assertEqual(df_result.loc[3]["total_break_minutes"], 0)
         self.assertEqual(df_result.loc[3]["total_work_without_break"], 250)
 
+    def test_daily_worked_minutes_default_break_rules(self):
+        statsgen = StatsGenerator(
+            default_break_after_6h=30,
+            default_break_after_9h=15,
+            default_break_rules=[
+                {"after_minutes": 540, "break_minutes": 45},
+                {"after_minutes": 360, "break_minutes": 30},
+                # Saturdays and sundays require a break after 4h and never less
+                {"after_minutes": 240, "break_minutes": 30, "weekdays": ["sat", "sun"]},
+            ],
+        )
+        df_result = statsgen.daily_worked_minutes(
+            report=self.test_report, target_daily_work_minutes=480
+        )
+        # Wednesday 8:36h, thursday 12:23h (longer breaks), friday 12:23h, saturday 4:10h
+        self.assertEqual(list(df_result["default_break_minutes"]), [30, 45, 45, 30])
+        self.assertEqual(list(df_result["total_break_minutes"]), [30, 96, 45, 30])
+
+        # The default rules are the ones of default_break_after_6h/9h
+        self.assertEqual(
+            list(
+                self.statsgen.daily_worked_minutes(
+                    report=self.test_report, target_daily_work_minutes=480
+                )["default_break_minutes"]
+            ),
+            [30, 45, 45, 0],
+        )
+
+        with self.assertRaises(ValueError):
+            StatsGenerator(
+                default_break_after_6h=30,
+                default_break_after_9h=15,
+                default_break_rules=[
+                    {"after_minutes": 240, "break_minutes": 30, "weekdays": ["sa"]}
+                ],
+            )
+
     def test_daily_worked_minutes_unplausible_breaks(self):
         # There has to be an even number of breaks as otherwise a break has not ended
         report = {
@@ -88,6 +127,107 @@ class TestStatsGenerator(unittest.TestCase):
                 report=report, target_daily_work_minutes=480
             )
 
+    def test_daily_worked_minutes_skips_unfinished_days(self):
+        report = {
+            "01.01.2022": {
+                "start": "22:00",
+                "end": "02:30",
+                "breaks": ["23:50", "00:20"],
+                "comment": "",
+            },
+            "02.01.2022": {
+                "start": "08:00",
+                "end": "",
+                "breaks": [],
+                "comment": "",
+            },
+        }
+        df_result = self.statsgen.daily_worked_minutes(
+            report=report, target_daily_work_minutes=480
+        )
+        self.assertEqual(len(df_result), 1)
+        # Work and breaks past midnight wrap around
+        self.assertEqual(df_result.loc[0]["total_work_minutes"], 270)
+        self.assertEqual(df_result.loc[0]["total_break_minutes"], 30)
+        self.assertEqual(df_result.loc[0]["total_work_without_break"], 240)
+
+    def test_daily_worked_minutes_overlapping_breaks(self):
+        report = {
+            "01.01.2022": {
+                "start": "08:00",
+                "end": "17:00",
+                # Overlapping and contained breaks count once, the part after the end not at all
+                "breaks": ["12:00", "13:00", "12:30", "13:30", "12:10", "12:20"]
+                + ["16:45", "17:30"],
+                "comment": "",
+            }
+        }
+        df_result = self.statsgen.daily_worked_minutes(
+            report=report, target_daily_work_minutes=480
+        )
+        self.assertEqual(df_result.loc[0]["total_break_minutes"], 105)
+        self.assertEqual(df_result.loc[0]["total_work_without_break"], 435)
+
+    def test_daily_worked_minutes_recomputes_only_changed_days(self):
+        self.statsgen.daily_worked_minutes(
+            report=self.test_report, target_daily_work_minutes=480
+        )
+        self.assertEqual(self.statsgen.last_recomputed_days, 4)
+        self.statsgen.daily_worked_minutes(
+            report=self.test_report, target_daily_work_minutes=480
+        )
+        self.assertEqual(self.statsgen.last_recomputed_days, 0)
+
+        self.test_report["04.02.2023"]["end"] = "05:12"
+        df_result = self.statsgen.daily_worked_minutes(
+            report=self.test_report, target_daily_work_minutes=480
+        )
+        self.assertEqual(self.statsgen.last_recomputed_days, 1)
+        self.assertEqual(df_result.loc[3]["total_work_minutes"], 310)
+        self.assertEqual(df_result.loc[0]["total_work_minutes"], 516)
+
+    def test_day_cache_is_bounded(self):
+        def month_report(month: int, days: int) -> dict:
+            return {
+                f"{day:02d}.{month:02d}.2023": {
+                    "start": "08:00",
+                    "end": "16:00",
+                    "breaks": [],
+                    "comment": "",
+                }
+                for day in range(1, days + 1)
+            }
+
+        statsgen = StatsGenerator(
+            default_break_after_6h=30, default_break_after_9h=15, cache_months=1
+        )
+        statsgen.report_columns(month_report(1, 31))
+        statsgen.report_columns(month_report(2, 28))
+        statsgen.report_columns(month_report(2, 28))
+        self.assertEqual(statsgen.last_recomputed_days, 0)
+        # February evicted most of January, which in turn evicts the rest
+        statsgen.report_columns(month_report(1, 31))
+        self.assertEqual(statsgen.last_recomputed_days, 31)
+
+        statsgen = StatsGenerator(
+            default_break_after_6h=30, default_break_after_9h=15, cache_months=0
+        )
+        statsgen.report_columns(month_report(1, 31))
+        statsgen.report_columns(month_report(1, 31))
+        self.assertEqual(statsgen.last_recomputed_days, 31)
+
+    def test_daily_worked_minutes_from_parsed_days(self):
+        _, _, parsed_days = PlausibilityChecker().parse_and_validate(self.test_report)
+        pd.testing.assert_frame_equal(
+            self.statsgen.daily_worked_minutes_from_columns(
+                self.statsgen.parsed_columns(parsed_days),
+                target_daily_work_minutes=480,
+            ),
+            self.statsgen.daily_worked_minutes(
+                report=self.test_report, target_daily_work_minutes=480
+            ),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
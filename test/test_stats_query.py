@@ -0,0 +1,103 @@
+import unittest
+import json
+import os
+import tempfile
+from datetime import date
+from src.report.filehandler import MonthlyFileHandler
+from src.report.storage_backend import JsonStorageBackend, months_between
+from src.statistics.stats_generator import StatsGenerator
+from src.statistics.stats_query import StatsQuery
+from src.validation.plausibility_checker import PlausibilityChecker
+
+
+class TestStatsQuery(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "work": {"target_daily_work_minutes": 480},
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+            },
+            "development": {"devmode": False},
+        }
+        for year in (2022, 2023):
+            for month in range(1, 13):
+                self.__write_report(
+                    f"{month}_{year}.json",
+                    {
+                        f"{day:02d}.{month:02d}.{year}": {
+                            "start": "08:00",
+                            "end": "17:00",
+                            "breaks": ["12:00", "13:00"],
+                            "comment": "",
+                        }
+                        for day in (1, 15, 28)
+                    },
+                )
+        self.fh = MonthlyFileHandler(self.config)
+        self.query = StatsQuery(
+            self.config,
+            JsonStorageBackend(self.fh),
+            PlausibilityChecker(),
+            StatsGenerator(default_break_after_6h=30, default_break_after_9h=15),
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __write_report(self, filename: str, report: dict):
+        with open(os.path.join(self.tmp_dir.name, filename), "w") as file:
+            json.dump(report, file)
+
+    def test_months_between(self):
+        self.assertEqual(
+            months_between(date(2022, 11, 20), date(2023, 2, 3)),
+            [(2022, 11), (2022, 12), (2023, 1), (2023, 2)],
+        )
+
+    def test_reads_only_months_in_range(self):
+        df_stats = self.query.daily_stats(date(2022, 12, 20), date(2023, 1, 20))
+        # Only 12_2022.json and 1_2023.json were read
+        self.assertEqual(self.fh.cache_misses, 2)
+        self.assertEqual(
+            [day.strftime("%d.%m.%Y") for day in df_stats["day"]],
+            ["28.12.2022", "01.01.2023", "15.01.2023"],
+        )
+        self.assertEqual(list(df_stats.columns), list(StatsQuery.COLUMNS))
+        self.assertEqual(list(df_stats["total_work_without_break"]), [480] * 3)
+        self.assertEqual(list(df_stats["overtime_minutes"]), [0] * 3)
+
+    def test_invalid_and_open_days(self):
+        report = self.fh.read_report(self.fh.report_path_by_filename("1_2023.json"))
+        # Not ended yet, with a running break
+        report["16.01.2023"] = {
+            "start": "08:00",
+            "end": "",
+            "breaks": ["12:00"],
+            "comment": "",
+        }
+        self.__write_report("1_2023.json", report)
+        errors = []
+        df_stats = self.query.daily_stats(date(2023, 1, 1), date(2023, 1, 31), errors)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(df_stats), 3)
+
+        report["15.01.2023"]["breaks"] = ["12:00"]
+        self.__write_report("1_2023.json", report)
+        df_stats = self.query.daily_stats(date(2023, 1, 1), date(2023, 1, 31), errors)
+        self.assertEqual(len(df_stats), 0)
+        self.assertEqual([error["day"] for error in errors], ["15.01.2023"])
+
+    def test_empty_range(self):
+        df_stats = self.query.daily_stats(date(2024, 3, 1), date(2024, 3, 7))
+        self.assertEqual(len(df_stats), 0)
+        self.assertEqual(list(df_stats.columns), list(StatsQuery.COLUMNS))
+        with self.assertRaises(ValueError):
+            self.query.daily_stats(date(2023, 3, 7), date(2023, 3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
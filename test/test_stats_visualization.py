@@ -0,0 +1,69 @@
+import unittest
+import importlib.util
+import os
+import tempfile
+from src.statistics.stats_generator import StatsGenerator
+
+HAS_PLOTTING = all(
+    importlib.util.find_spec(module) is not None for module in ("matplotlib", "seaborn")
+)
+
+
+@unittest.skipUnless(HAS_PLOTTING, "matplotlib and seaborn are not installed")
+class TestStatsVisualization(unittest.TestCase):
+    def setUp(self):
+        from src.statistics.stats_visualization import StatsVisualization
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.statsvis = StatsVisualization(headless=True, cache_dir=self.tmp_dir.name)
+        self.statsgen = StatsGenerator(
+            default_break_after_6h=30, default_break_after_9h=15
+        )
+        self.report = {
+            "01.02.2023": {
+                "start": "08:00",
+                "end": "16:30",
+                "breaks": ["12:00", "12:30"],
+                "comment": "",
+            }
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __stats(self):
+        return self.statsgen.daily_worked_minutes(self.report, 480)
+
+    def test_render_is_cached_by_content(self):
+        image_path = self.statsvis.render_daily_worked_minutes("Feb", self.__stats())
+        self.assertTrue(image_path.endswith(".png"))
+        with open(image_path, "rb") as file:
+            self.assertEqual(file.read(8), b"\x89PNG\r\n\x1a\n")
+        rendered_at = os.stat(image_path).st_mtime_ns
+
+        # The same statistics return the same image without rendering it again
+        self.assertEqual(
+            self.statsvis.render_daily_worked_minutes("Feb", self.__stats()),
+            image_path,
+        )
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 1)
+
+        self.report["01.02.2023"]["end"] = "17:00"
+        changed_path = self.statsvis.render_daily_worked_minutes("Feb", self.__stats())
+        self.assertNotEqual(changed_path, image_path)
+        self.assertGreaterEqual(os.stat(image_path).st_mtime_ns, rendered_at)
+
+    def test_render_svg(self):
+        image_path = self.statsvis.render_daily_worked_minutes(
+            "Feb", self.__stats(), image_format="svg"
+        )
+        with open(image_path, "r") as file:
+            self.assertIn("<svg", file.read())
+        with self.assertRaises(ValueError):
+            self.statsvis.render_daily_worked_minutes(
+                "Feb", self.__stats(), image_format="gif"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import json
+import os
+import tempfile
+from datetime import date
+from src.report.filehandler import MonthlyFileHandler
+from src.report.storage_backend import (
+    JsonStorageBackend,
+    SqliteStorageBackend,
+    migrate,
+)
+
+
+def _day(start: str, end: str = "", breaks: list = None, comment: str = "") -> dict:
+    return {"start": start, "end": end, "breaks": breaks or [], "comment": comment}
+
+
+class TestStorageBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+            },
+            "development": {"devmode": False},
+        }
+        self.fh = MonthlyFileHandler(self.config)
+        self.backends = {
+            "json": JsonStorageBackend(self.fh),
+            "sqlite": SqliteStorageBackend(
+                os.path.join(self.tmp_dir.name, "pytimetrack.sqlite")
+            ),
+        }
+
+    def tearDown(self):
+        for backend in self.backends.values():
+            backend.close()
+        self.tmp_dir.cleanup()
+
+    def test_upsert_and_read(self):
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                self.assertIsNone(backend.read_day("01.02.2023"))
+                backend.upsert_day("01.02.2023", _day("08:00"))
+                backend.upsert_day("28.02.2023", _day("09:00", "17:00"))
+                backend.upsert_day(
+                    "01.02.2023", _day("08:00", "16:00", ["12:00", "12:30"])
+                )
+
+                self.assertEqual(
+                    backend.read_day("01.02.2023"),
+                    _day("08:00", "16:00", ["12:00", "12:30"]),
+                )
+                self.assertEqual(
+                    backend.read_month(2023, 2),
+                    {
+                        "01.02.2023": _day("08:00", "16:00", ["12:00", "12:30"]),
+                        "28.02.2023": _day("09:00", "17:00"),
+                    },
+                )
+
+    def test_days_in_range_and_months(self):
+        days = {
+            "15.03.2023": _day("08:00", "16:00"),
+            "31.01.2023": _day("08:00", "16:00"),
+            "01.02.2023": _day("07:00", "15:00"),
+            "02.05.2023": _day("07:00", "15:00"),
+        }
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                backend.upsert_days(days)
+                self.assertEqual(
+                    [
+                        day
+                        for day, _ in backend.days_in_range(
+                            date(2023, 1, 31), date(2023, 3, 15)
+                        )
+                    ],
+                    ["31.01.2023", "01.02.2023", "15.03.2023"],
+                )
+                self.assertEqual(
+                    [month for month in backend.months() if month[0] == 2023],
+                    [(2023, 1), (2023, 2), (2023, 3), (2023, 5)],
+                )
+
+    def test_json_upsert_writes_month_file(self):
+        backend = self.backends["json"]
+        backend.upsert_days({"01.02.2023": _day("08:00"), "02.02.2023": _day("08:30")})
+        with open(os.path.join(self.tmp_dir.name, "2_2023.json"), "r") as file:
+            self.assertEqual(list(json.load(file).keys()), ["01.02.2023", "02.02.2023"])
+
+    def test_migrate(self):
+        with open(os.path.join(self.tmp_dir.name, "1_2023.json"), "w") as file:
+            json.dump(
+                {
+                    "02.01.2023": _day("08:00", "16:00", ["12:00", "12:30"], "Office"),
+                    "32.01.2023": _day("08:00", "16:00"),
+                },
+                file,
+            )
+        with open(os.path.join(self.tmp_dir.name, "3_2023.json"), "w") as file:
+            json.dump({"01.03.2023": _day("09:00")}, file)
+
+        summary = migrate(self.backends["json"], self.backends["sqlite"])
+        self.assertEqual(summary["days"], 2)
+        self.assertEqual(summary["skipped_days"], ["32.01.2023"])
+        self.assertEqual(
+            self.backends["sqlite"].read_day("02.01.2023"),
+            _day("08:00", "16:00", ["12:00", "12:30"], "Office"),
+        )
+
+        # And back into the (empty) reports of another folder
+        other_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(other_dir.cleanup)
+        config = {**self.config, "paths": {"reports": other_dir.name}}
+        summary = migrate(
+            self.backends["sqlite"], JsonStorageBackend(MonthlyFileHandler(config))
+        )
+        self.assertEqual(summary["months"], 2)
+        with open(os.path.join(other_dir.name, "3_2023.json"), "r") as file:
+            self.assertEqual(json.load(file), {"01.03.2023": _day("09:00")})
+
+
+if __name__ == "__main__":
+    unittest.main()
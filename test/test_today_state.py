@@ -0,0 +1,75 @@
+import unittest
+from src.model.today_state import TodayState
+from src.tracking.tracker import TimeTracker
+from src.util.datetimehandler import DateTimeHandler
+
+
+class TestTodayState(unittest.TestCase):
+    def setUp(self):
+        self.state = TodayState()
+        self.day = "01.02.2023"
+
+    def test_status(self):
+        self.assertEqual(self.state.status(self.day, 600), (None, None))
+        self.state.reset(
+            self.day,
+            {
+                "start": "08:00",
+                "end": "",
+                "breaks": ["10:00", "10:15", "12:00"],
+                "comment": "",
+            },
+        )
+        # 5h since the start, 15min break and a running break since 12:00
+        self.assertEqual(self.state.status(self.day, 13 * 60), (3 * 60 + 45, 720))
+        self.state.track_break("12:30")
+        self.assertEqual(self.state.status(self.day, 13 * 60), (4 * 60 + 15, None))
+        self.state.track_end("16:30")
+        self.assertEqual(self.state.status(self.day, 23 * 60), (7 * 60 + 45, None))
+        # Another day is not tracked yet
+        self.assertEqual(self.state.status("02.02.2023", 600), (None, None))
+
+    def test_overnight(self):
+        self.state.reset(
+            self.day, {"start": "22:00", "end": "", "breaks": [], "comment": ""}
+        )
+        self.assertEqual(self.state.status(self.day, 60), (180, None))
+        # Only reported on the next day if overnight shifts are allowed
+        self.assertEqual(self.state.status("02.02.2023", 60), (None, None))
+
+    def test_overnight_next_day(self):
+        self.state = TodayState(allow_overnight_shifts=True)
+        self.state.reset(
+            self.day, {"start": "22:00", "end": "", "breaks": [], "comment": ""}
+        )
+        self.state.track_break("23:30")
+        self.assertEqual(self.state.status("02.02.2023", 60), (90, 1410))
+        self.state.track_break("00:30")
+        self.assertEqual(self.state.status("02.02.2023", 90), (150, None))
+        # Neither a finished shift nor a later day
+        self.assertEqual(self.state.status("03.02.2023", 90), (None, None))
+        self.state.track_end("01:30")
+        self.assertEqual(self.state.status("02.02.2023", 120), (None, None))
+
+    def test_updated_by_tracking(self):
+        dth = DateTimeHandler()
+        tt = TimeTracker(today_state=self.state)
+        report, _ = tt.track({})
+        today_str = dth.today_str()
+        self.assertTrue(self.state.is_synced(today_str, report[today_str]))
+        report, _ = tt.work_break(report)
+        self.assertTrue(self.state.is_synced(today_str, report[today_str]))
+        work_minutes, break_start = self.state.status(today_str, dth.now_minutes())
+        self.assertLessEqual(work_minutes, 1)
+        self.assertIsNotNone(break_start)
+
+        # Changed elsewhere (e.g. manual edits), so read again on the next tracking
+        report[today_str]["breaks"] = []
+        self.assertFalse(self.state.is_synced(today_str, report[today_str]))
+        report, _ = tt.work_break(report)
+        self.assertTrue(self.state.is_synced(today_str, report[today_str]))
+        self.assertEqual(self.state.break_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
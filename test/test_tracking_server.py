@@ -0,0 +1,123 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import time
+from src.tracking.tracking_server import TrackingServer
+
+
+class TestTrackingServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "work": {
+                "target_daily_work_minutes": 480,
+                "default_break_after_6h": 30,
+                "default_break_after_9h": 15,
+                "default_break_rules": [],
+                "allow_overnight_shifts": False,
+            },
+            "paths": {"reports": self.tmp_dir.name},
+            "storage": {
+                "journal": False,
+                "journal_compact_threshold": 50,
+                "report_cache_size": 24,
+                "archive_closed_months": True,
+                "manifest": True,
+            },
+            "server": {"host": "127.0.0.1", "port": 0, "flush_interval_seconds": 60},
+            "development": {"devmode": False},
+        }
+        self.server = TrackingServer(self.config)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.tmp_dir.cleanup()
+
+    async def __request(self, reader, writer, method: str, path: str):
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        return status, json.loads(body)
+
+    async def __client(self, user: str, clicks: int) -> list:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        statuses = []
+        for i in range(clicks):
+            action = "track" if i % 4 in (0, 3) else "break"
+            status, _ = await self.__request(
+                reader, writer, "POST", f"/users/{user}/{action}"
+            )
+            statuses.append(status)
+        writer.close()
+        return statuses
+
+    async def test_track_and_today(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        status, body = await self.__request(
+            reader, writer, "POST", "/users/alice/break"
+        )
+        self.assertEqual(status, 409)
+        status, body = await self.__request(
+            reader, writer, "POST", "/users/alice/track"
+        )
+        self.assertEqual(status, 200)
+        self.assertTrue(body["message"].startswith("Tracked work start time"))
+        status, body = await self.__request(reader, writer, "GET", "/users/alice/today")
+        self.assertEqual(status, 200)
+        self.assertNotEqual(body["data"]["start"], "")
+        status, _ = await self.__request(reader, writer, "GET", "/users/alice/nope")
+        self.assertEqual(status, 404)
+        status, _ = await self.__request(reader, writer, "GET", "/users/alice/track")
+        self.assertEqual(status, 405)
+        writer.close()
+
+    async def test_load(self):
+        users = 20
+        clicks_per_user = 40
+        results = await asyncio.gather(
+            *[self.__client(f"user{i}", clicks_per_user) for i in range(users)]
+        )
+        self.assertTrue(
+            all(status == 200 for statuses in results for status in statuses)
+        )
+
+        # Clicks are only written by the batched flush
+        await self.server.flush()
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        _, today = await self.__request(reader, writer, "GET", "/users/user0/today")
+        writer.close()
+        report_path = f"{self.tmp_dir.name}/user0/{self.__current_report_filename()}"
+        with open(report_path, "r") as file:
+            self.assertEqual(json.load(file)[today["day"]], today["data"])
+
+    async def test_failed_write_is_retried(self):
+        self.assertEqual(await self.__client("alice", 1), [200])
+        report_path = f"{self.tmp_dir.name}/alice/{self.__current_report_filename()}"
+        # A folder in place of the report makes the write fail
+        os.remove(report_path)
+        os.mkdir(report_path)
+        self.assertEqual(await self.server.flush(), ["alice"])
+
+        os.rmdir(report_path)
+        self.assertEqual(await self.server.flush(), [])
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        _, today = await self.__request(reader, writer, "GET", "/users/alice/today")
+        writer.close()
+        with open(report_path, "r") as file:
+            self.assertEqual(json.load(file)[today["day"]], today["data"])
+
+    def __current_report_filename(self) -> str:
+        today = time.localtime()
+        return f"{today.tm_mon}_{today.tm_year}.json"
+
+
+if __name__ == "__main__":
+    unittest.main()